@@ -1,14 +1,27 @@
-from typing import Annotated, Literal, Optional, List
+from typing import Annotated, Literal, Optional, List, Tuple
 from typing_extensions import TypedDict, Dict, Any
 import json
+import re
+import time
+import asyncio
+import threading
 import operator
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph, START
 from langgraph.constants import Send
+from langgraph.config import get_stream_writer
 from ..Utils.Model import Model
 from ..Tools.GoogleSearch import GoogleSearchAutomator
 from ..Tools.Scraper import Scrapy
+from ..Tools.ScrapePool import ScrapePool, get_scrape_pool
 from ..Types.Types import Website
 from ..Utils.Retriever import FaissRetriever, GraphRetriever
+from ..Utils.Chunker import TokenChunker
+from ..Utils.EmbeddingCache import get_cached_embeddings
+from ..Utils.Corpus import get_web_corpus, content_hash
+from ..Utils.ContextAssembler import ContextAssembler, ContextSource
+from .Profiles import FINAL_RESERVE_SHARE, PipelineProfile, get_profile
 from langchain_core.documents import Document
 import os 
 import logging
@@ -30,12 +43,26 @@ logging.basicConfig(
 )
 
 
+def _merge_stages(left: list, right: list) -> list:
+    """Union of stage names in first-seen order, so mapped nodes report a stage once"""
+    return list(dict.fromkeys(left + right))
+
+
+def _merge_ranked(left: list, right: list) -> list:
+    """Concatenate websites and keep them in search rank order whatever order the branches finished in"""
+    return sorted(left + right, key=lambda site: (site.rank is None, site.rank or (0, 0)))
+
+
 class OverallState(TypedDict):
     topic: str
+    session_id: str
+    deadline: Optional[float]
+    time_budget: Optional[float]
+    truncated_stages: Annotated[list[str], _merge_stages]
     refined_topic: dict
     search_queries: list
-    search_results: Annotated[list[Website], operator.add]
-    scraped_contents: Annotated[list[Website], operator.add]
+    search_results: Annotated[list[Website], _merge_ranked]
+    scraped_contents: Annotated[list[Website], _merge_ranked]
     final_response: dict
     retriever_type: str  
     vector_retriever: Any  
@@ -45,6 +72,46 @@ class OverallState(TypedDict):
 class SearchState(TypedDict):
     query: str
 
+class UrlClaims:
+    """Urls already handed to a scrape branch during one run, shared by all search branches"""
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self._urls = set()
+        self._lock = threading.Lock()
+
+    def claim(self, url: str) -> bool:
+        with self._lock:
+            if url in self._urls:
+                return False
+            if self.limit is not None and len(self._urls) >= self.limit:
+                return False
+            self._urls.add(url)
+            return True
+
+class SearchBranchState(TypedDict):
+    query: str
+    query_index: int
+    refined_query: str
+    claims: UrlClaims
+    deadline: Optional[float]
+    time_budget: Optional[float]
+    search_results: Annotated[list[Website], _merge_ranked]
+    scraped_contents: Annotated[list[Website], _merge_ranked]
+    truncated_stages: Annotated[list[str], _merge_stages]
+
+class SearchBranchOutput(TypedDict):
+    search_results: Annotated[list[Website], _merge_ranked]
+    scraped_contents: Annotated[list[Website], _merge_ranked]
+    truncated_stages: Annotated[list[str], _merge_stages]
+
+class ScrapeState(TypedDict):
+    url: str
+    rank: Optional[tuple]
+    refined_query: str
+    deadline: Optional[float]
+    time_budget: Optional[float]
+
 def parse_json_response(response: str) -> Dict[str, Any]:
     try:
         start_idx = response.find('{')
@@ -59,19 +126,169 @@ def parse_json_response(response: str) -> Dict[str, Any]:
         logging.debug(f"Agent Log: Original response: {response[:200]}...")
         return {"error": "Failed to parse response"}
 
+def _partial_summary(response: str) -> str:
+    """Summary text recovered from a generation that was cut off before its JSON was complete"""
+    match = re.search(r'"summary"\s*:\s*"((?:[^"\\]|\\.)*)', response)
+    if not match:
+        return ""
+    try:
+        return json.loads(f'"{match.group(1)}"')
+    except ValueError:
+        return match.group(1)
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until an absolute deadline, None when there is no deadline"""
+    return None if deadline is None else deadline - time.time()
+
+def _expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.time() >= deadline
+
+def _get_stream_writer():
+    """Writer for custom stream events, or None when the node is not running inside a streamed graph"""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return None
+
+async def stream_progress(workflow, state, tokens: bool = True):
+    """Run a compiled deep search graph, yielding ("node", name, update) as each node finishes and
+    ("token", name, event) for streamed answer tokens.
+    Subgraphs are streamed too, so the execute_search and scrape_page nodes inside every search branch
+    are reported individually rather than as one search_branch update per query."""
+    modes = ["updates", "custom"] if tokens else ["updates"]
+    async for _namespace, mode, chunk in workflow.astream(state, stream_mode=modes, subgraphs=True):
+        if mode == "custom":
+            yield "token", chunk.get("node"), chunk
+            continue
+        for node, update in chunk.items():
+            yield "node", node, update
+
+EMBEDDING_MODEL_ID = "ollama:llama3.2:1b"
+
 class DeepSearchAgent:
-    def __init__(self, model: Model, retriever_type: str = "vector"):
+    def __init__(self, model: Model, retriever_type: Optional[str] = None,
+                 scrape_pool: Optional[ScrapePool] = None, scrape_timeout: Optional[float] = None,
+                 chunk_size: int = 512, chunk_overlap: int = 64, ingest_batch_size: int = 64,
+                 corpus_related_k: int = 5, profile: Optional[PipelineProfile] = None,
+                 output_reserve: int = 1024):
+        """
+        profile : Pipeline profile deciding fan-out, LLM stages and budgets, the default profile when None.
+                  retriever_type and scrape_timeout override the profile's values when given.
+        scrape_pool : Pool bounding concurrent scrapes, the process-wide one when None
+        output_reserve : Tokens of the model's context window kept free for the summary and RAG answers
+        """
         self.model = model
-        self.retriever_type = retriever_type
-        logging.info(f"Agent Log: Initializing DeepSearchAgent with retriever type: {retriever_type}")
+        self.profile = profile or get_profile()
+        self.retriever_type = retriever_type or self.profile.retriever_type
+        self.chunker = TokenChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.ingest_batch_size = ingest_batch_size
+        self.scrape_timeout = scrape_timeout or self.profile.scrape_timeout
+        # Shared by every agent, so the global and per-host caps hold across concurrent deep searches
+        self.scrape_pool = scrape_pool or get_scrape_pool()
+        # Fanned-out search branches share one automator and, through it, the warm driver pool
+        self.search_tool = GoogleSearchAutomator()
+        # Pages and embedded chunks persisted across sessions so repeat topics skip scraping
+        self.corpus = get_web_corpus()
+        self.corpus_related_k = corpus_related_k
+        # Prompts are sized to the model's context window instead of being truncated by the server
+        self.context_assembler = ContextAssembler.for_model(model, output_reserve=output_reserve)
+        logging.info(f"Agent Log: Initializing DeepSearchAgent with profile {self.profile.name} "
+                     f"and retriever type: {self.retriever_type}")
+    
+    def _deadline(self, state: dict, final: bool = False) -> Optional[float]:
+        """Absolute time a node has to finish by; stages before the summary leave it the profile's final_reserve,
+        capped to a share of the run's time_budget so short budgets still leave time for the earlier stages"""
+        deadline = state.get("deadline")
+        if deadline is None or final:
+            return deadline
+        reserve = self.profile.final_reserve
+        if state.get("time_budget") is not None:
+            reserve = min(reserve, FINAL_RESERVE_SHARE * state["time_budget"])
+        return deadline - reserve
+    
+    def _generate(self, prompt: str, node: Optional[str] = None, deadline: Optional[float] = None) -> Tuple[str, bool]:
+        """Run the model, forwarding tokens as custom stream events for node when the graph is streamed.
+        Generation stops at the deadline, returning the text so far and whether it was cut short."""
+        writer = _get_stream_writer() if node else None
+        if writer is None and deadline is None:
+            return self.model._run(prompt), False
+        if _expired(deadline):
+            return "", True
+        
+        chunks = []
+        stream = self.model._stream(prompt)
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                if writer is not None:
+                    writer({"type": "token", "node": node, "content": chunk})
+                if _expired(deadline):
+                    return "".join(chunks), True
+        finally:
+            stream.close()
+        return "".join(chunks), False
+    
+    async def _agenerate(self, prompt: str, node: Optional[str] = None, deadline: Optional[float] = None) -> Tuple[str, bool]:
+        writer = _get_stream_writer() if node else None
+        if writer is None and deadline is None:
+            return await self.model._arun(prompt), False
+        if _expired(deadline):
+            return "", True
+        
+        chunks = []
+        stream = self.model._astream(prompt)
+        
+        async def consume():
+            async for chunk in stream:
+                chunks.append(chunk)
+                if writer is not None:
+                    writer({"type": "token", "node": node, "content": chunk})
+        
+        # wait_for rather than asyncio.timeout, which needs Python 3.11; chunks read before the deadline are kept
+        try:
+            await asyncio.wait_for(consume(), _remaining(deadline))
+        except asyncio.TimeoutError:
+            return "".join(chunks), True
+        finally:
+            await stream.aclose()
+        return "".join(chunks), False
     
     def refine_user_prompt(self, state: OverallState):
         """Analyze and refine the user's original query to better understand their intent"""
+        if not self.profile.refine_prompt:
+            logging.info(f"Agent Log: Prompt refinement skipped by the {self.profile.name} profile")
+            return self._unrefined_topic(state)
+        prompt = self._refinement_prompt(state)
+        response, truncated = self._generate(prompt, deadline=self._deadline(state))
+        return self._refinement_result(state, response, truncated)
+    
+    async def arefine_user_prompt(self, state: OverallState):
+        if not self.profile.refine_prompt:
+            logging.info(f"Agent Log: Prompt refinement skipped by the {self.profile.name} profile")
+            return self._unrefined_topic(state)
+        prompt = self._refinement_prompt(state)
+        response, truncated = await self._agenerate(prompt, deadline=self._deadline(state))
+        return self._refinement_result(state, response, truncated)
+    
+    def _unrefined_topic(self, state: OverallState):
+        return {
+            "refined_topic": {
+                "refined_query": state["topic"],
+                "understanding": "",
+                "search_aspects": []
+            }
+        }
+    
+    def _refinement_prompt(self, state: OverallState) -> str:
         logging.info(f"Agent Log: Refining user prompt: {state['topic']}")
         prompt = prompt_refinement_template.format(topic=state["topic"])
         logging.debug(f"Agent Log: Prompt refinement template: {prompt[:200]}...")
-        
-        response = self.model._run(prompt)
+        return prompt
+    
+    def _refinement_result(self, state: OverallState, response: str, truncated: bool = False):
+        if truncated:
+            logging.warning("Agent Log: Deadline reached while refining the prompt, searching with the topic as-is")
+            return {**self._unrefined_topic(state), "truncated_stages": ["refine_prompt"]}
         logging.debug(f"Agent Log: Model response for prompt refinement: {response[:200]}...")
         
         parsed = parse_json_response(response)
@@ -88,7 +305,23 @@ class DeepSearchAgent:
             "refined_topic": refined_topic
         }
         
-    def generate_search_queries(self, state: OverallState, num_queries: int = 3):
+    def generate_search_queries(self, state: OverallState, num_queries: Optional[int] = None):
+        num_queries = num_queries or self.profile.num_queries
+        if not self.profile.generate_queries:
+            return self._queries_result(state, None, num_queries)
+        prompt = self._queries_prompt(state, num_queries)
+        response, truncated = self._generate(prompt, deadline=self._deadline(state))
+        return self._queries_result(state, response, num_queries, truncated)
+    
+    async def agenerate_search_queries(self, state: OverallState, num_queries: Optional[int] = None):
+        num_queries = num_queries or self.profile.num_queries
+        if not self.profile.generate_queries:
+            return self._queries_result(state, None, num_queries)
+        prompt = self._queries_prompt(state, num_queries)
+        response, truncated = await self._agenerate(prompt, deadline=self._deadline(state))
+        return self._queries_result(state, response, num_queries, truncated)
+    
+    def _queries_prompt(self, state: OverallState, num_queries: int) -> str:
         logging.info(f"Agent Log: Generating search queries based on refined topic")
         
         original_topic = state["topic"]
@@ -102,89 +335,257 @@ class DeepSearchAgent:
             
         prompt = queries_prompt.format(topic=combined_topic, num_queries=num_queries)
         logging.debug(f"Agent Log: Query generation prompt: {prompt[:200]}...")
-        
-        response = self.model._run(prompt)
-        logging.debug(f"Agent Log: Model response for query generation: {response[:200]}...")
-        
-        parsed = parse_json_response(response)
-        queries = parsed.get("queries", [])
+        return prompt
+    
+    def _queries_result(self, state: OverallState, response: Optional[str], num_queries: int, truncated: bool = False):
+        """Queries parsed from the model response; None means the profile skips the LLM and searches the refined query"""
+        refined_query = state["refined_topic"]["refined_query"]
+        search_aspects = state["refined_topic"]["search_aspects"]
+        queries = []
+        if truncated:
+            logging.warning("Agent Log: Deadline reached while generating queries, using refined query as fallback")
+        elif response is not None:
+            logging.debug(f"Agent Log: Model response for query generation: {response[:200]}...")
+            parsed = parse_json_response(response)
+            queries = parsed.get("queries", [])[:num_queries]
+            if not queries:
+                logging.warning("Agent Log: No queries generated, using refined query as fallback")
         
         if not queries:
-            logging.warning("Agent Log: No queries generated, using refined query as fallback")
             queries = [refined_query]
             
             if search_aspects:
-                for aspect in search_aspects[:2]:  
+                for aspect in search_aspects[:num_queries - 1]:  
                     combined_query = f"{refined_query} {aspect}"
                     if combined_query not in queries:
                         queries.append(combined_query)
         
         logging.info(f"Agent Log: Generated {len(queries)} search queries: {queries}")
         
-        return {
+        update = {
             "search_queries": queries,
             "retriever_type": self.retriever_type
         }
+        if truncated:
+            update["truncated_stages"] = ["generate_queries"]
+        return update
 
     def execute_search(self, state: SearchState):
         logging.info(f"Agent Log: Executing search for query: {state['query']}")
-        search_tool = GoogleSearchAutomator()
-        
+        deadline = self._deadline(state)
+        if _expired(deadline):
+            logging.warning(f"Agent Log: Deadline reached, skipping search for query: {state['query']}")
+            return {"search_results": [], "truncated_stages": ["execute_search"]}
+        timeout = self._stage_timeout(self.profile.search_timeout, deadline)
+        # The browser search cannot be interrupted, so it runs in a worker thread that is abandoned on timeout
+        executor = ThreadPoolExecutor(max_workers=1)
         try:
-            results = search_tool.search_google(state["query"], pages=1)
-            logging.info(f"Agent Log: Found {len(results)} search results")
-            logging.debug(f"Agent Log: Search results: {results[:3]}")
-            
-            websites = [
-                Website(url=result["link"], title=result["title"], content=None) 
-                for result in results
-            ]
-            logging.info(f"Agent Log: Processed {len(websites)} website entries")
-            return {"search_results": websites}
-            
+            future = executor.submit(self.search_tool.search_google, state["query"], pages=self.profile.search_pages)
+            results = future.result(timeout=timeout)
+            return self._search_result(results, state.get("query_index", 0))
+        except FutureTimeoutError:
+            logging.error(f"Agent Log: Search timed out after {timeout:.1f}s: {state['query']}")
+            return {"search_results": [], "truncated_stages": ["execute_search"]}
         except Exception as e:
             logging.error(f"Agent Log: Error during search execution: {str(e)}")
             return {"search_results": []}
-
-    def scrape_content(self, state: OverallState):
-        logging.info(f"Agent Log: Starting content scraping for {len(state['search_results'])} websites")
-        scraped_sites = []
+        finally:
+            executor.shutdown(wait=False)
+    
+    async def aexecute_search(self, state: SearchState):
+        logging.info(f"Agent Log: Executing search for query: {state['query']}")
+        deadline = self._deadline(state)
+        if _expired(deadline):
+            logging.warning(f"Agent Log: Deadline reached, skipping search for query: {state['query']}")
+            return {"search_results": [], "truncated_stages": ["execute_search"]}
+        timeout = self._stage_timeout(self.profile.search_timeout, deadline)
+        try:
+            results = await asyncio.wait_for(
+                self.search_tool.asearch_google(state["query"], pages=self.profile.search_pages),
+                timeout=timeout
+            )
+            return self._search_result(results, state.get("query_index", 0))
+        except asyncio.TimeoutError:
+            logging.error(f"Agent Log: Search timed out after {timeout:.1f}s: {state['query']}")
+            return {"search_results": [], "truncated_stages": ["execute_search"]}
+        except Exception as e:
+            logging.error(f"Agent Log: Error during search execution: {str(e)}")
+            return {"search_results": []}
+    
+    def _search_result(self, results: list, query_index: int = 0):
+        logging.info(f"Agent Log: Found {len(results)} search results")
+        logging.debug(f"Agent Log: Search results: {results[:3]}")
         
-        for i, result in enumerate(state["search_results"]):
+        websites = [
+            Website(url=result["link"], title=result["title"], content=None, rank=(position, query_index))
+            for position, result in enumerate(results)
+        ]
+        logging.info(f"Agent Log: Processed {len(websites)} website entries")
+        return {"search_results": websites}
+
+    @staticmethod
+    def _stage_timeout(timeout: float, deadline: Optional[float]) -> float:
+        """A stage's own timeout, shortened to the time left before the deadline"""
+        remaining = _remaining(deadline)
+        return timeout if remaining is None else max(min(timeout, remaining), 0)
+
+    def _scrape_page(self, url: str, refined_query: str, timeout: Optional[float] = None) -> Optional[dict]:
+        scraper = Scrapy(base_url=url, model=self.model)
+        scraper.dismantle_webpage(url, user_prompt=refined_query, timeout=timeout or self.scrape_timeout)
+        if scraper.scraped_page:
+            return scraper.scraped_page[0]
+        return None
+
+    async def _ascrape_page(self, url: str, refined_query: str, timeout: Optional[float] = None) -> Optional[dict]:
+        scraper = Scrapy(base_url=url, model=self.model)
+        await scraper.adismantle_webpage(url, user_prompt=refined_query, timeout=timeout or self.scrape_timeout)
+        if scraper.scraped_page:
+            return scraper.scraped_page[0]
+        return None
+
+    def scrape_page(self, state: ScrapeState):
+        """Scrape one search result, reusing the stored page when the web corpus has a fresh copy"""
+        url = state["url"]
+        deadline = self._deadline(state)
+        page = self._stored_page(url)
+        if page is None:
+            if _expired(deadline):
+                logging.warning(f"Agent Log: Deadline reached, skipping scrape of {url}")
+                return {"scraped_contents": [], "truncated_stages": ["scrape_page"]}
+            timeout = self._stage_timeout(self.scrape_timeout, deadline)
+            # The pool's timeout covers the fetch, the deadline also covers waiting for a free slot
+            page = self.scrape_pool.run(
+                lambda url: self._scrape_page(url, state["refined_query"], timeout),
+                url,
+                timeout=timeout,
+                queue_timeout=_remaining(deadline)
+            )
+            self._store_page(page)
+        return self._scraped_result(url, page, deadline, state.get("rank"))
+
+    async def ascrape_page(self, state: ScrapeState):
+        url = state["url"]
+        deadline = self._deadline(state)
+        page = await asyncio.to_thread(self._stored_page, url)
+        if page is None:
+            if _expired(deadline):
+                logging.warning(f"Agent Log: Deadline reached, skipping scrape of {url}")
+                return {"scraped_contents": [], "truncated_stages": ["scrape_page"]}
+            timeout = self._stage_timeout(self.scrape_timeout, deadline)
             try:
-                logging.info(f"Agent Log: Scraping content from [{i+1}/{len(state['search_results'])}]: {result.url}")
-                scraper = Scrapy(base_url=result.url, model=self.model)
-                
-                refined_query = state["refined_topic"]["refined_query"]
-                scraper.dismantle_webpage(result.url, user_prompt=refined_query)
-                
-                if scraper.scraped_page:
-                    page = scraper.scraped_page[0]
-                    scraped_sites.append(
-                        Website(
-                            url=page['url'],
-                            title=page['title'],
-                            content=page['content']
-                        )
-                    )
-                    logging.info(f"Agent Log: Successfully scraped content from {result.url} ({len(page['content'])} chars)")
-                    logging.debug(f"Agent Log: Content sample: {page['content'][:200]}...")
-                else:
-                    logging.warning(f"Agent Log: No content scraped from {result.url}")
+                # The pool's timeout covers the fetch, the deadline also covers waiting for a free slot
+                page = await asyncio.wait_for(
+                    self.scrape_pool.arun(
+                        lambda url: self._ascrape_page(url, state["refined_query"], timeout),
+                        url,
+                        timeout=timeout
+                    ),
+                    timeout=_remaining(deadline)
+                )
+            except asyncio.TimeoutError:
+                page = None
+            await asyncio.to_thread(self._store_page, page)
+        return self._scraped_result(url, page, deadline, state.get("rank"))
+
+    def _stored_page(self, url: str) -> Optional[dict]:
+        if not self.corpus:
+            return None
+        try:
+            stored = self.corpus.get_pages([url])
+        except Exception as e:
+            logging.warning(f"Agent Log: Could not read {url} from the web corpus: {str(e)}")
+            return None
+        if url not in stored:
+            return None
+        logging.info(f"Agent Log: Reusing fresh page from the web corpus for {url}")
+        return {'url': url, **stored[url]}
+
+    def _store_page(self, page: Optional[dict]) -> None:
+        if not (page and page['content'] and self.corpus):
+            return
+        try:
+            self.corpus.put_page(page['url'], page['title'], page['content'])
+        except Exception as e:
+            logging.warning(f"Agent Log: Could not store {page['url']} in the web corpus: {str(e)}")
+
+    def _scraped_result(self, url: str, page: Optional[dict], deadline: Optional[float] = None,
+                        rank: Optional[tuple] = None):
+        if not page:
+            logging.warning(f"Agent Log: No content scraped from {url}")
+            if _expired(deadline):
+                return {"scraped_contents": [], "truncated_stages": ["scrape_page"]}
+            return {"scraped_contents": []}
+        logging.info(f"Agent Log: Successfully scraped content from {url} ({len(page['content'])} chars)")
+        logging.debug(f"Agent Log: Content sample: {page['content'][:200]}...")
+        return {"scraped_contents": [
+            Website(
+                url=page['url'],
+                title=page['title'],
+                content=page['content'],
+                rank=rank
+            )
+        ]}
+
+    def _get_embedding_model(self):
+        from langchain_ollama import OllamaEmbeddings
+        # Shared across requests and retrievers so identical text is only embedded once
+        return get_cached_embeddings(
+            EMBEDDING_MODEL_ID,
+            lambda: OllamaEmbeddings(model="llama3.2:1b")
+        )
+
+    def _stored_chunks(self, url: str, page_hash: str) -> list:
+        if not self.corpus:
+            return []
+        try:
+            return self.corpus.get_chunks(url, EMBEDDING_MODEL_ID, page_hash)
+        except Exception as e:
+            logging.warning(f"Agent Log: Could not read chunks of {url} from the web corpus: {str(e)}")
+            return []
+
+    def _search_corpus(self, query: str, k: int, exclude_urls: Optional[List[str]] = None,
+                       embedding_model=None) -> list:
+        """(document, vector) pairs of fresh corpus chunks related to query"""
+        if not self.corpus or k <= 0:
+            return []
+        try:
+            if embedding_model is None:
+                embedding_model = self._get_embedding_model()
+            query_vector = embedding_model.embed_query(query)
+            return self.corpus.search(EMBEDDING_MODEL_ID, query_vector, k=k, exclude_urls=exclude_urls)
+        except Exception as e:
+            logging.warning(f"Agent Log: Web corpus search failed: {str(e)}")
+            return []
+
+    def _ingest_batch(self, vector_retriever, graph_retriever, batch: List[Document], vectors: Optional[list]):
+        if vector_retriever:
+            try:
+                vector_retriever.ingest(batch, embeddings=vectors)
             except Exception as e:
-                logging.error(f"Agent Log: Error scraping {result.url}: {str(e)}")
-                continue
-        
-        logging.info(f"Agent Log: Completed scraping with {len(scraped_sites)} successful results")
-        return {"scraped_contents": scraped_sites}
+                logging.error(f"Agent Log: Error building vector retriever: {str(e)}")
+                vector_retriever = None
+        if graph_retriever:
+            try:
+                graph_retriever.ingest(batch)
+            except Exception as e:
+                logging.error(f"Agent Log: Error building graph retriever: {str(e)}")
+                graph_retriever = None
+        return vector_retriever, graph_retriever
 
     def build_knowledge_bases(self, state: OverallState):
         """Build the vector store and/or knowledge graph based on scraped content"""
         logging.info("Agent Log: Agent Log: Starting to build knowledge bases")
-        from langchain_ollama import OllamaEmbeddings
+        deadline = self._deadline(state)
+        if _expired(deadline):
+            logging.warning("Agent Log: Deadline reached, skipping knowledge base build")
+            return {
+                "vector_retriever": None,
+                "graph_retriever": None,
+                "truncated_stages": ["build_knowledge_bases"]
+            }
         
         try:
-            embedding_model = OllamaEmbeddings(model="llama3.2:1b")
+            embedding_model = self._get_embedding_model()
             logging.info("Agent Log: Successfully initialized embedding model")
         except Exception as e:
             logging.error(f"Agent Log: Failed to initialize embedding model: {str(e)}")
@@ -193,17 +594,37 @@ class DeepSearchAgent:
                 "graph_retriever": None
             }
         
-        documents = []
-        metadatas = []
-        
+        sites = {}
         for site in state["scraped_contents"]:
             if site.content:
+                sites.setdefault(site.url, site)
+        
+        # Pages already chunked and embedded by an earlier search are reused as-is
+        reused = []
+        page_hashes = {}
+        documents = []
+        metadatas = []
+        for url, site in sites.items():
+            page_hashes[url] = content_hash(site.content)
+            chunks = self._stored_chunks(url, page_hashes[url])
+            if chunks:
+                reused.extend(chunks)
+            else:
                 documents.append(site.content)
-                metadatas.append({"source": site.url, "title": site.title})
+                metadatas.append({"source": url, "title": site.title})
         
-        logging.info(f"Agent Log: Extracted {len(documents)} documents from scraped content")
+        related = self._search_corpus(
+            state["refined_topic"]["refined_query"],
+            k=self.corpus_related_k,
+            exclude_urls=list(sites),
+            embedding_model=embedding_model
+        )
+        reused.extend(related)
         
-        if not documents:
+        logging.info(f"Agent Log: Extracted {len(documents)} new documents, reusing {len(reused)} chunks "
+                     f"from the web corpus ({len(related)} from earlier searches)")
+        
+        if not documents and not reused:
             logging.warning("Agent Log: No documents to build knowledge bases from")
             return {
                 "vector_retriever": None,
@@ -215,23 +636,13 @@ class DeepSearchAgent:
         retriever_type = state["retriever_type"]
         
         if retriever_type in ["vector", "both"]:
-            try:
-                logging.info("Agent Log: Building vector retriever")
-                vector_retriever = FaissRetriever(
-                    embedding_model=embedding_model,
-                    index_name="user_query_index",
-                    persist_directory="./vector_stores"
-                )
-                vector_retriever.ingest(documents, metadatas)
-                
-                if not hasattr(vector_retriever, 'vector_store') or vector_retriever.vector_store is None:
-                    logging.error("Agent Log: Vector store was not properly initialized")
-                    vector_retriever = None
-                else:
-                    logging.info("Agent Log: Vector retriever built successfully")
-            except Exception as e:
-                logging.error(f"Agent Log: Error building vector retriever: {str(e)}")
-                vector_retriever = None
+            logging.info("Agent Log: Building vector retriever")
+            # Kept in memory only: every deep search gets a new chat, so a store persisted under it would never
+            # be read back, and the chunks worth reusing are already persisted in the web corpus
+            vector_retriever = FaissRetriever(
+                embedding_model=embedding_model,
+                index_name="user_query_index"
+            )
         
         if retriever_type in ["graph", "both"]:
             try:
@@ -240,19 +651,95 @@ class DeepSearchAgent:
                     embedding_model=embedding_model,
                     similarity_threshold=0.7
                 )
-                graph_retriever.ingest(documents, metadatas)
-                logging.info("Agent Log: Graph retriever built successfully")
             except Exception as e:
                 logging.error(f"Agent Log: Error building graph retriever: {str(e)}")
                 graph_retriever = None
         
-        return {
+        for start in range(0, len(reused), self.ingest_batch_size):
+            batch = reused[start:start + self.ingest_batch_size]
+            vector_retriever, graph_retriever = self._ingest_batch(
+                vector_retriever, graph_retriever,
+                [doc for doc, _ in batch],
+                [vector for _, vector in batch]
+            )
+        
+        chunk_count = 0
+        embedded = {}
+        failed_sources = set()
+        truncated = False
+        for batch in self.chunker.iter_batches(documents, metadatas, batch_size=self.ingest_batch_size):
+            if _expired(deadline):
+                logging.warning(f"Agent Log: Deadline reached, indexing stopped after {chunk_count} new chunks")
+                truncated = True
+                # The last page indexed may continue in the skipped batches, so it is not stored as complete
+                if embedded:
+                    failed_sources.add(next(reversed(embedded)))
+                break
+            chunk_count += len(batch)
+            try:
+                vectors = embedding_model.embed_documents([doc.page_content for doc in batch])
+            except Exception as e:
+                logging.error(f"Agent Log: Error embedding chunks: {str(e)}")
+                vectors = None
+            for i, doc in enumerate(batch):
+                source = doc.metadata["source"]
+                if vectors is None:
+                    failed_sources.add(source)
+                else:
+                    embedded.setdefault(source, []).append((doc, vectors[i]))
+            vector_retriever, graph_retriever = self._ingest_batch(vector_retriever, graph_retriever, batch, vectors)
+        
+        if self.corpus:
+            for source, chunks in embedded.items():
+                if source in failed_sources:
+                    continue
+                try:
+                    self.corpus.replace_chunks(
+                        source, EMBEDDING_MODEL_ID, page_hashes[source],
+                        [doc for doc, _ in chunks], [vector for _, vector in chunks]
+                    )
+                except Exception as e:
+                    logging.warning(f"Agent Log: Could not store chunks of {source} in the web corpus: {str(e)}")
+        
+        logging.info(f"Agent Log: Ingested {chunk_count} new chunks from {len(documents)} documents")
+        
+        if vector_retriever and vector_retriever.vector_store is None:
+            logging.error("Agent Log: Vector store was not properly initialized")
+            vector_retriever = None
+        elif vector_retriever:
+            logging.info("Agent Log: Vector retriever built successfully")
+        if graph_retriever:
+            logging.info("Agent Log: Graph retriever built successfully")
+        
+        update = {
             "vector_retriever": vector_retriever,
             "graph_retriever": graph_retriever
         }
+        if truncated:
+            update["truncated_stages"] = ["build_knowledge_bases"]
+        return update
+
+    async def abuild_knowledge_bases(self, state: OverallState):
+        # Embedding and indexing are CPU-bound or blocking client calls, so they stay off the event loop
+        return await asyncio.to_thread(self.build_knowledge_bases, state)
 
     def perform_rag_query(self, state: OverallState):
         """Perform RAG query using the built retrievers and refined understanding"""
+        rag_prompt, sources, result = self._prepare_rag(state)
+        if result is not None:
+            return result
+        response, truncated = self._generate(rag_prompt, "perform_rag_query", self._deadline(state))
+        return self._rag_result(response, sources, truncated)
+
+    async def aperform_rag_query(self, state: OverallState):
+        rag_prompt, sources, result = await asyncio.to_thread(self._prepare_rag, state)
+        if result is not None:
+            return result
+        response, truncated = await self._agenerate(rag_prompt, "perform_rag_query", self._deadline(state))
+        return self._rag_result(response, sources, truncated)
+
+    def _prepare_rag(self, state: OverallState) -> Tuple[Optional[str], List[str], Optional[dict]]:
+        """Retrieve context and build the RAG prompt, or the final result when there is nothing to ask about"""
         original_topic = state["topic"]
         refined_topic = state["refined_topic"]["refined_query"]
         understanding = state["refined_topic"]["understanding"]
@@ -265,19 +752,23 @@ class DeepSearchAgent:
         logging.info(f"Agent Log: Refined topic: {refined_topic}")
         logging.info(f"Agent Log: Using retriever type: {retriever_type}")
         
-        if not (vector_retriever or graph_retriever):
-            logging.warning("Agent Log: No retrievers available for RAG query")
-            return {"rag_response": {
-                "answer": "Unable to perform RAG query as no retrievers were successfully built.",
-                "sources": []
-            }}
-        
         retrieved_docs = []
         sources = []
         
         query_string = refined_topic
         
-        if retriever_type == "vector" and vector_retriever:
+        if not (vector_retriever or graph_retriever):
+            # Nothing new was indexed this session, but earlier searches may have covered the topic
+            retrieved_docs = [doc for doc, _ in self._search_corpus(query_string, k=5)]
+            if not retrieved_docs:
+                logging.warning("Agent Log: No retrievers available for RAG query")
+                return None, [], {"rag_response": {
+                    "answer": "Unable to perform RAG query as no retrievers were successfully built.",
+                    "sources": []
+                }}
+            logging.info(f"Agent Log: Retrieved {len(retrieved_docs)} documents from the web corpus")
+        
+        elif retriever_type == "vector" and vector_retriever:
             try:
                 logging.info(f"Agent Log: Querying vector retriever with: {query_string}")
                 retrieved_docs = vector_retriever.query(query_string, k=5)
@@ -321,23 +812,39 @@ class DeepSearchAgent:
                 except Exception as e:
                     logging.error(f"Agent Log: Error querying graph retriever: {str(e)}")
             
-            doc_urls = set()
+            seen_chunks = set()
             for doc in vector_docs + graph_docs:
-                url = doc.metadata.get("source", "")
-                if url not in doc_urls:
+                chunk_key = (doc.metadata.get("source", ""), doc.metadata.get("chunk_index"))
+                if chunk_key not in seen_chunks:
                     retrieved_docs.append(doc)
-                    doc_urls.add(url)
+                    seen_chunks.add(chunk_key)
             
             retrieved_docs = retrieved_docs[:5]
             logging.info(f"Agent Log: Combined {len(retrieved_docs)} unique documents from both retrievers")
         
+        # Retrievers return their best match first, so rank stands in for relevance
+        assembled = self.context_assembler.assemble(
+            [
+                ContextSource(
+                    text=doc.page_content,
+                    source=doc.metadata.get("source", "Unknown source"),
+                    score=1.0 / (1 + rank)
+                )
+                for rank, doc in enumerate(retrieved_docs)
+            ],
+            budget=self.context_assembler.budget(rag_prompt_template.format(
+                original_query=original_topic,
+                refined_query=understanding or refined_topic,
+                context=""
+            )),
+            query=refined_topic
+        )
+        
         context = ""
-        for i, doc in enumerate(retrieved_docs):
-            content = doc.page_content
-            source = doc.metadata.get("source", "Unknown source")
-            context += f"Source: {source}\n{content}\n\n"
-            sources.append(source)
-            logging.debug(f"Agent Log: Document {i+1}: Source={source}, Content length={len(content)}")
+        for i, item in enumerate(assembled):
+            context += f"Source: {item.source}\n{item.text}\n\n"
+            sources.append(item.source)
+            logging.debug(f"Agent Log: Document {i+1}: Source={item.source}, Content length={len(item.text)}")
         
         if context:
             rag_prompt = rag_prompt_template.format(
@@ -347,36 +854,52 @@ class DeepSearchAgent:
             )
             logging.info(f"Agent Log: Generating RAG response with {len(context)} chars of context")
             logging.debug(f"Agent Log: RAG prompt: {rag_prompt[:200]}...")
-            
-            response = self.model._run(rag_prompt)
-            logging.debug(f"Agent Log: RAG response: {response[:200]}...")
-            
-            return {"rag_response": {
-                "answer": response,
-                "sources": list(set(sources))   
-            }}
+            return rag_prompt, sources, None
         else:
             logging.warning("Agent Log: No context was extracted from retrieved documents")
-            return {"rag_response": {
+            return None, [], {"rag_response": {
                 "answer": "No relevant information found in the knowledge base.",
                 "sources": []
             }}
 
+    def _rag_result(self, response: str, sources: List[str], truncated: bool = False):
+        logging.debug(f"Agent Log: RAG response: {response[:200]}...")
+        update = {"rag_response": {
+            "answer": response,
+            "sources": list(set(sources))   
+        }}
+        if truncated:
+            logging.warning(f"Agent Log: Deadline reached during the RAG answer after {len(response)} chars")
+            update["rag_response"]["answer"] = response or "Ran out of time before answering from the knowledge base."
+            update["truncated_stages"] = ["perform_rag_query"]
+        return update
+
     def generate_final_response(self, state: OverallState):
+        prompt = self._final_prompt(state) if self.profile.summary else None
+        summary_response, truncated = (
+            self._generate(prompt, "generate_final", self._deadline(state, final=True)) if prompt else (None, False)
+        )
+        return self._final_result(state, summary_response, truncated)
+
+    async def agenerate_final_response(self, state: OverallState):
+        prompt = self._final_prompt(state) if self.profile.summary else None
+        summary_response, truncated = (
+            await self._agenerate(prompt, "generate_final", self._deadline(state, final=True)) if prompt else (None, False)
+        )
+        return self._final_result(state, summary_response, truncated)
+
+    def _final_prompt(self, state: OverallState) -> Optional[str]:
+        """Summary prompt over the scraped pages, None when nothing was scraped"""
         logging.info("Agent Log: Generating final response")
-        relevant_contents = []
-        source_urls = []
+        pages = []
         
         for item in state["scraped_contents"]:
             if not item.content:
                 continue
             logging.debug(f"Agent Log: Including content from {item.url} ({len(item.content)} chars)")
-            relevant_contents.append(item.content)
-            source_urls.append(item.url)
+            pages.append(ContextSource(text=item.content, source=item.url))
         
-        if relevant_contents:
-            logging.info(f"Agent Log: Generating summary from {len(relevant_contents)} content pieces")
-            
+        if pages:
             original_topic = state["topic"]
             refined_topic = state["refined_topic"]["refined_query"]
             understanding = state["refined_topic"]["understanding"]
@@ -387,69 +910,150 @@ Refined understanding: {understanding}
 Refined query: {refined_topic}
             """
             
+            # The URL list is appended after assembly, so its tokens are reserved for every candidate page up front
+            pages = self.context_assembler.assemble(
+                pages,
+                budget=self.context_assembler.budget(summary_prompt.format(
+                    topic=enriched_topic,
+                    contents="",
+                    urls="\n".join(page.source for page in pages)
+                )),
+                query=f"{original_topic} {refined_topic} {understanding}"
+            )
+            logging.info(f"Agent Log: Generating summary from {len(pages)} content pieces")
+            
             prompt = summary_prompt.format(
                 topic=enriched_topic,
-                contents="\n\n".join(relevant_contents),
-                urls="\n".join(source_urls)
+                contents="\n\n".join(page.text for page in pages),
+                urls="\n".join(page.source for page in pages)
             )
             logging.debug(f"Agent Log: Summary prompt: {prompt[:200]}...")
-            
-            summary_response = self.model._run(prompt)
+            return prompt
+        
+        logging.warning("Agent Log: No relevant content found for summary generation")
+        return None
+
+    def _final_result(self, state: OverallState, summary_response: Optional[str], truncated: bool = False):
+        if truncated:
+            # Whatever the summary got to before the deadline, with every scraped page as a source
+            logging.warning(f"Agent Log: Deadline reached during the summary after {len(summary_response)} chars")
+            final_summary = _partial_summary(summary_response) or "Ran out of time before the summary was generated."
+            final_sources = list(dict.fromkeys(item.url for item in state["scraped_contents"] if item.content))
+        elif summary_response is not None:
             logging.debug(f"Agent Log: Summary response: {summary_response[:200]}...")
             
             parsed_summary = parse_json_response(summary_response)
             final_summary = parsed_summary.get("summary", "No summary generated")
             final_sources = parsed_summary.get("sources", [])
+        elif not self.profile.summary:
+            logging.info(f"Agent Log: Summary skipped by the {self.profile.name} profile")
+            final_summary = ""
+            final_sources = []
         else:
-            logging.warning("Agent Log: No relevant content found for summary generation")
             final_summary = "No relevant content found from traditional search."
             final_sources = []
         
-        rag_answer = state["rag_response"].get("answer", "No RAG answer generated")
-        rag_sources = state["rag_response"].get("sources", [])
+        rag_response = state.get("rag_response") or {}
+        rag_answer = rag_response.get("answer", "No RAG answer generated")
+        rag_sources = rag_response.get("sources", [])
         
         all_sources = list(set(final_sources + rag_sources))
         
         refined_topic = state["refined_topic"]
+        truncated_stages = _merge_stages(state.get("truncated_stages") or [], ["generate_final"] if truncated else [])
         
         logging.info(f"Agent Log: Final response generated with {len(all_sources)} sources")
+        if truncated_stages:
+            logging.warning(f"Agent Log: Partial response, stages cut short by the deadline: {truncated_stages}")
+        llm_cache = getattr(self.model, "cache", None)
+        if llm_cache is not None:
+            logging.info(f"Agent Log: LLM cache stats: {llm_cache.stats()}")
         return {"final_response": {
             "original_query": state["topic"],
             "refined_understanding": refined_topic.get("understanding", ""),
             "search_aspects": refined_topic.get("search_aspects", []),
             "search_summary": final_summary,
             "rag_answer": rag_answer,
-            "sources": all_sources
+            "sources": all_sources,
+            "partial": bool(truncated_stages),
+            "truncated_stages": truncated_stages
         }}
 
     def continue_to_search(self, state: OverallState):
         queries = state["search_queries"]
         logging.info(f"Agent Log: Continuing to search with {len(queries)} queries")
-        return [Send("execute_search", {"query": q}) for q in queries]
+        claims = UrlClaims(limit=self.profile.max_urls)
+        return [
+            Send("search_branch", {
+                "query": q,
+                "query_index": i,
+                "refined_query": state["refined_topic"]["refined_query"],
+                "claims": claims,
+                "deadline": state.get("deadline"),
+                "time_budget": state.get("time_budget")
+            })
+            for i, q in enumerate(queries)
+        ]
+
+    def continue_to_scrape(self, state: SearchBranchState):
+        # Each url is scraped once per run, by whichever branch found it first
+        ranks = {}
+        for result in state["search_results"]:
+            ranks.setdefault(result.url, result.rank)
+        urls = [url for url in ranks if state["claims"].claim(url)]
+        logging.info(f"Agent Log: Scraping {len(urls)} new results for query: {state['query']}")
+        return [
+            Send("scrape_page", {
+                "url": url,
+                "rank": ranks[url],
+                "refined_query": state["refined_query"],
+                "deadline": state.get("deadline"),
+                "time_budget": state.get("time_budget")
+            })
+            for url in urls
+        ]
+
+    @staticmethod
+    def _node(func, afunc) -> RunnableLambda:
+        """Node that runs func under invoke/stream and afunc under ainvoke/astream"""
+        return RunnableLambda(func, afunc=afunc, name=func.__name__)
+
+    def create_search_branch(self):
+        """Subgraph run once per query: the search, then one mapped scrape per new result url.
+        Branches run side by side, so a query that returns early starts scraping while others still search."""
+        branch = StateGraph(SearchBranchState, output=SearchBranchOutput)
+        branch.add_node("execute_search", self._node(self.execute_search, self.aexecute_search))
+        branch.add_node("scrape_page", self._node(self.scrape_page, self.ascrape_page), input=ScrapeState)
+        branch.add_edge(START, "execute_search")
+        branch.add_conditional_edges("execute_search", self.continue_to_scrape, ["scrape_page"])
+        branch.add_edge("scrape_page", END)
+        return branch.compile()
 
     def create_graph(self):
         logging.info("Agent Log: Creating state graph for the agent workflow")
         graph = StateGraph(OverallState)
         
-        graph.add_node("refine_prompt", self.refine_user_prompt)
-        graph.add_node("generate_queries", self.generate_search_queries)
-        graph.add_node("execute_search", self.execute_search)
-        graph.add_node("scrape_content", self.scrape_content)
-        graph.add_node("build_knowledge_bases", self.build_knowledge_bases)
-        graph.add_node("perform_rag_query", self.perform_rag_query)
-        graph.add_node("generate_final", self.generate_final_response)
+        graph.add_node("refine_prompt", self._node(self.refine_user_prompt, self.arefine_user_prompt))
+        graph.add_node("generate_queries", self._node(self.generate_search_queries, self.agenerate_search_queries))
+        graph.add_node("search_branch", self.create_search_branch(), input=SearchBranchState)
+        if self.profile.rag:
+            graph.add_node("build_knowledge_bases", self._node(self.build_knowledge_bases, self.abuild_knowledge_bases))
+            graph.add_node("perform_rag_query", self._node(self.perform_rag_query, self.aperform_rag_query))
+        graph.add_node("generate_final", self._node(self.generate_final_response, self.agenerate_final_response))
         
         graph.add_edge(START, "refine_prompt")
         graph.add_edge("refine_prompt", "generate_queries")
         graph.add_conditional_edges(
             "generate_queries",
             self.continue_to_search,
-            ["execute_search"]
+            ["search_branch"]
         )
-        graph.add_edge("execute_search", "scrape_content")
-        graph.add_edge("scrape_content", "build_knowledge_bases")
-        graph.add_edge("build_knowledge_bases", "perform_rag_query")
-        graph.add_edge("perform_rag_query", "generate_final")
+        if self.profile.rag:
+            graph.add_edge("search_branch", "build_knowledge_bases")
+            graph.add_edge("build_knowledge_bases", "perform_rag_query")
+            graph.add_edge("perform_rag_query", "generate_final")
+        else:
+            graph.add_edge("search_branch", "generate_final")
         graph.add_edge("generate_final", END)
         
         logging.info("Agent Log: State graph created and compiled")
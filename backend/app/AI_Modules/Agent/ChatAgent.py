@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Iterator
 import logging
 import os 
 from datetime import datetime
@@ -30,6 +30,17 @@ class ChatAgent:
             logging.error(f"Chat error: {str(e)}")
             return "Sorry, I encountered an error processing your message."
 
+    def _stream_message(self, user_message: str, history: List[Dict[str, str]]) -> Iterator[str]:
+        """Same prompt as _generate_message, yielding the reply as the model produces it.
+        Errors are raised rather than turned into an apology, so a cut-off reply is not taken for a finished one"""
+        try:
+            context = self._format_history(history, user_message)
+            for chunk in self.model._stream(context):
+                yield chunk
+        except Exception as e:
+            logging.error(f"Chat error: {str(e)}")
+            raise
+
     def _format_history(self, history: List[Dict], current_message: str) -> str:
         """Formats conversation history with clear speaker identification"""
         context = []
@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass(frozen=True)
+class PipelineProfile:
+    """How much work a deep search does: fan-out sizes, which LLM stages run and per-stage time budgets"""
+    name: str
+    num_queries: int
+    search_pages: int
+    max_urls: Optional[int]
+    retriever_type: str
+    refine_prompt: bool
+    generate_queries: bool
+    rag: bool
+    summary: bool
+    search_timeout: float
+    scrape_timeout: float
+    # Seconds the whole request may take, and the share of it held back for the final summary
+    time_budget: float
+    final_reserve: float
+
+
+# Largest share of a run's time budget held back for the summary, so short request timeouts still run the earlier stages
+FINAL_RESERVE_SHARE = 0.25
+
+
+PROFILES: Dict[str, PipelineProfile] = {
+    # One search with the user's own words, a handful of pages and a single summary call
+    "fast": PipelineProfile(
+        name="fast",
+        num_queries=1,
+        search_pages=1,
+        max_urls=3,
+        retriever_type="vector",
+        refine_prompt=False,
+        generate_queries=False,
+        rag=False,
+        summary=True,
+        search_timeout=15,
+        scrape_timeout=8,
+        time_budget=45,
+        final_reserve=15
+    ),
+    "balanced": PipelineProfile(
+        name="balanced",
+        num_queries=3,
+        search_pages=1,
+        max_urls=None,
+        retriever_type="vector",
+        refine_prompt=True,
+        generate_queries=True,
+        rag=True,
+        summary=True,
+        search_timeout=60,
+        scrape_timeout=20,
+        time_budget=240,
+        final_reserve=45
+    ),
+    "deep": PipelineProfile(
+        name="deep",
+        num_queries=5,
+        search_pages=2,
+        max_urls=40,
+        retriever_type="both",
+        refine_prompt=True,
+        generate_queries=True,
+        rag=True,
+        summary=True,
+        search_timeout=120,
+        scrape_timeout=30,
+        time_budget=600,
+        final_reserve=90
+    ),
+}
+
+DEFAULT_PROFILE = "balanced"
+
+
+def get_profile(name: Optional[str] = None) -> PipelineProfile:
+    """Named profile, the default one when name is empty"""
+    profile = PROFILES.get(name or DEFAULT_PROFILE)
+    if profile is None:
+        raise ValueError(f"Unknown deep search profile: {name}. Available profiles: {', '.join(PROFILES)}")
+    return profile
@@ -0,0 +1,142 @@
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional
+from selenium.common.exceptions import (
+    InvalidSessionIdException, NoSuchWindowException, SessionNotCreatedException, WebDriverException
+)
+from urllib3.exceptions import HTTPError as DriverConnectionError
+import queue
+import threading
+import time
+import logging
+
+
+def is_driver_error(error: BaseException) -> bool:
+    """Whether an error means the browser session itself is unusable, rather than the page or the caller failing.
+    Element lookups and waits raise WebDriverException subclasses too, so only session errors, the bare
+    WebDriverException (e.g. "chrome not reachable") and a lost connection to the driver count."""
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException, SessionNotCreatedException)):
+        return True
+    return type(error) is WebDriverException or isinstance(error, (DriverConnectionError, ConnectionError))
+
+
+class PooledDriver:
+    """A driver checked out of a DriverPool, with its usage bookkeeping"""
+
+    def __init__(self, driver: Any):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+
+
+class DriverPool:
+    """Process-wide pool of warm browser drivers shared by concurrent searches"""
+
+    def __init__(self,
+                 factory: Callable[[], Any],
+                 size: int = 2,
+                 max_uses: int = 20,
+                 checkout_timeout: float = 120):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+        self._idle: "queue.LifoQueue[PooledDriver]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        logging.info(f"Initialized DriverPool (size={size}, max_uses={max_uses}, checkout_timeout={checkout_timeout}s)")
+
+    def _is_healthy(self, entry: PooledDriver) -> bool:
+        try:
+            return entry.driver.execute_script("return 1") == 1
+        except Exception as e:
+            logging.warning(f"Pooled driver failed health check: {str(e)}")
+            return False
+
+    def _spawn(self) -> PooledDriver:
+        try:
+            driver = self.factory()
+        except Exception:
+            driver = None
+        if driver is None:
+            with self._lock:
+                self._created -= 1
+            raise RuntimeError("Driver factory failed to create a driver")
+        logging.info("DriverPool spawned a new driver")
+        return PooledDriver(driver)
+
+    def _discard(self, entry: PooledDriver) -> None:
+        with self._lock:
+            self._created -= 1
+        try:
+            entry.driver.quit()
+        except Exception:
+            logging.warning("Error closing pooled driver")
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledDriver:
+        """Check out a healthy driver, spawning one if the pool is below size"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_spawn = self._created < self.size
+                    if can_spawn:
+                        self._created += 1
+                if can_spawn:
+                    return self._spawn()
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No browser driver available within {timeout}s")
+                try:
+                    entry = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    raise TimeoutError(f"No browser driver available within {timeout}s")
+
+            if self._is_healthy(entry):
+                return entry
+            self._discard(entry)
+
+    def release(self, entry: PooledDriver, broken: bool = False) -> None:
+        """Return a driver to the pool, recycling it if it crashed or reached max_uses"""
+        entry.uses += 1
+        if broken or entry.uses >= self.max_uses:
+            logging.info(f"Recycling pooled driver after {entry.uses} uses (broken={broken})")
+            self._discard(entry)
+        else:
+            self._idle.put(entry)
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = None):
+        entry = self.acquire(timeout)
+        broken = False
+        try:
+            yield entry.driver
+        except Exception as e:
+            broken = is_driver_error(e)
+            raise
+        finally:
+            self.release(entry, broken=broken)
+
+    def warm(self, count: Optional[int] = None) -> None:
+        """Start drivers ahead of time so the first searches skip browser startup"""
+        entries: List[PooledDriver] = []
+        for _ in range(min(count or self.size, self.size)):
+            try:
+                entries.append(self.acquire(timeout=0))
+            except Exception as e:
+                logging.warning(f"Could not warm driver: {str(e)}")
+                break
+        for entry in entries:
+            self._idle.put(entry)
+
+    def close(self) -> None:
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(entry)
@@ -10,7 +10,12 @@ import logging
 import traceback
 from urllib.parse import quote_plus
 import os
+import atexit
+import threading
+import asyncio
 from datetime import datetime
+from .DriverPool import DriverPool, is_driver_error
+from .SearchCache import SearchCache, get_search_cache
 
 if not os.path.exists('logs'):
     os.makedirs('logs')
@@ -26,9 +31,31 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+
+def get_driver_pool(factory) -> DriverPool:
+    """Return the process-wide driver pool, creating it with the given factory on first use"""
+    global _driver_pool
+    if _driver_pool is None:
+        with _driver_pool_lock:
+            if _driver_pool is None:
+                _driver_pool = DriverPool(
+                    factory=factory,
+                    size=int(os.getenv('SEARCH_DRIVER_POOL_SIZE', 2)),
+                    max_uses=int(os.getenv('SEARCH_DRIVER_MAX_USES', 20)),
+                    checkout_timeout=float(os.getenv('SEARCH_DRIVER_CHECKOUT_TIMEOUT', 120))
+                )
+                atexit.register(_driver_pool.close)
+    return _driver_pool
+
+
 class GoogleSearchAutomator:
-    def __init__(self,debug=False):
+    def __init__(self,debug=False,driver_pool:DriverPool=None,cache:SearchCache=None):
         self.debug = debug
+        self.driver_pool = driver_pool or get_driver_pool(self._create_driver)
+        self.cache = cache if cache is not None else get_search_cache()
         self.html_output_dir = "html_debug"
         os.makedirs(self.html_output_dir, exist_ok=True)
         if not os.path.exists('results'):
@@ -97,16 +124,20 @@ class GoogleSearchAutomator:
 
     def search_google(self, query, pages=2, scholar=False):
         """Perform a Google search and extract all search result links"""
+        if self.cache:
+            cached = self.cache.get(query, pages, scholar)
+            if cached is not None:
+                return cached
+        
         results = []
-        driver = None
+        search_start = time.time()
         
         for attempt in range(3):
+            entry = None
+            broken = False
             try:
-                driver = self._create_driver()
-                if not driver:
-                    logging.error("Failed to create driver, retrying...")
-                    time.sleep(2)
-                    continue
+                entry = self.driver_pool.acquire()
+                driver = entry.driver
                     
                 base_url = "https://scholar.google.com/" if scholar else "https://www.google.com/"
                 
@@ -173,17 +204,22 @@ class GoogleSearchAutomator:
                 
             except Exception as e:
                 logging.error(f"Search attempt {attempt+1} failed: {str(e)}")
+                broken = is_driver_error(e)
+                if entry is None:
+                    time.sleep(2)
                 
             finally:
-                if driver:
-                    try:
-                        driver.quit()
-                        logging.info("Driver closed successfully")
-                    except:
-                        logging.warning("Error closing driver")
+                if entry:
+                    self.driver_pool.release(entry, broken=broken)
         
+        if self.cache:
+            self.cache.set(query, pages, scholar, results, elapsed=time.time() - search_start)
         return results
     
+    async def asearch_google(self, query, pages=2, scholar=False):
+        """Async search_google; the browser is driven synchronously so it runs in a worker thread"""
+        return await asyncio.to_thread(self.search_google, query, pages=pages, scholar=scholar)
+
     def _save_results_to_file(self, query, results):
         """Save search results to a text file"""
         try:
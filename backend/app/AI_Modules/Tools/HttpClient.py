@@ -0,0 +1,357 @@
+import requests
+import aiohttp
+import asyncio
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from typing import Dict, Optional, Tuple, Union
+import threading
+import atexit
+import warnings
+import time
+import os
+import logging
+
+
+# Connection-level timings are collected per thread, since a request runs entirely in the calling thread
+_timings = threading.local()
+
+
+def _record_timing(name: str, value: float) -> None:
+    current = getattr(_timings, 'current', None)
+    if current is not None:
+        current[name] = current.get(name, 0.0) + value
+
+
+class _TimedConnectionMixin:
+    """Records connection setup time, DNS resolution included, for new connections"""
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_timing('connect', time.perf_counter() - start)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+class HttpClient:
+    """Pooled keep-alive HTTP client shared by the scrapers"""
+
+    def __init__(self,
+                 connect_timeout: float = 5,
+                 read_timeout: float = 15,
+                 max_retries: int = 2,
+                 backoff_factor: float = 0.5,
+                 pool_connections: int = 32,
+                 pool_maxsize: int = 32,
+                 max_bytes: int = 5 * 1024 * 1024):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_bytes = max_bytes
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = _TimedHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # ACCEPT_ENCODING already lists br/zstd when the decoders are installed
+        self.session.headers.update({
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive'
+        })
+        logging.info(f"Initialized HttpClient (connect={connect_timeout}s, read={read_timeout}s, retries={max_retries}, pool={pool_maxsize})")
+
+    def _resolve_timeout(self, timeout: Union[None, float, Tuple[float, float]]) -> Tuple[float, float]:
+        if timeout is None:
+            return (self.connect_timeout, self.read_timeout)
+        if isinstance(timeout, tuple):
+            return timeout
+        return (min(self.connect_timeout, timeout), timeout)
+
+    def get(self,
+            url: str,
+            headers: Optional[Dict[str, str]] = None,
+            timeout: Union[None, float, Tuple[float, float]] = None) -> requests.Response:
+        """GET a url, attaching a `timings` dict (dns, connect, ttfb, download, total in seconds) to the response,
+        with DNS resolution included in connect.
+        The read timeout applies per socket read, so the whole download is also capped at connect + read seconds."""
+        connect_timeout, read_timeout = self._resolve_timeout(timeout)
+        _timings.current = {}
+        start = time.perf_counter()
+        try:
+            response = self.session.get(
+                url,
+                headers=headers,
+                timeout=(connect_timeout, read_timeout),
+                stream=True
+            )
+            headers_received = time.perf_counter()
+
+            body = bytearray()
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    body.extend(chunk)
+                    if len(body) > self.max_bytes:
+                        logging.warning(f"Response from {url} exceeded {self.max_bytes} bytes, truncating")
+                        break
+                    if time.perf_counter() - start > connect_timeout + read_timeout:
+                        raise requests.Timeout(f"Download of {url} took longer than {connect_timeout + read_timeout:.0f}s")
+            finally:
+                response.close()
+            response._content = bytes(body)
+            finished = time.perf_counter()
+        finally:
+            measured = _timings.current
+            _timings.current = None
+
+        # urllib3 resolves the host inside connect, so DNS time is counted there rather than on its own
+        connect = measured.get('connect', 0.0)
+        response.timings = {
+            'dns': 0.0,
+            'connect': connect,
+            'ttfb': max(headers_received - start - connect, 0.0),
+            'download': finished - headers_received,
+            'total': finished - start
+        }
+        return response
+
+
+_shared_client: Optional[HttpClient] = None
+_shared_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide HttpClient, creating it from the environment on first use"""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = HttpClient(
+                    connect_timeout=float(os.getenv('SCRAPER_CONNECT_TIMEOUT', 5)),
+                    read_timeout=float(os.getenv('SCRAPER_READ_TIMEOUT', 15)),
+                    max_retries=int(os.getenv('SCRAPER_MAX_RETRIES', 2)),
+                    pool_maxsize=int(os.getenv('SCRAPER_POOL_SIZE', 32))
+                )
+    return _shared_client
+
+
+
+class AsyncResponse:
+    """Fully read response from AsyncHttpClient, exposing the fields the scrapers use from requests responses"""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes, timings: Dict[str, float]):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.timings = timings
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    trace = aiohttp.TraceConfig()
+
+    async def dns_start(session, context, params):
+        context.trace_request_ctx['dns_start'] = time.perf_counter()
+
+    async def dns_end(session, context, params):
+        timings = context.trace_request_ctx
+        timings['dns'] = timings.get('dns', 0.0) + time.perf_counter() - timings.pop('dns_start', time.perf_counter())
+
+    async def connect_start(session, context, params):
+        context.trace_request_ctx['connect_start'] = time.perf_counter()
+
+    async def connect_end(session, context, params):
+        timings = context.trace_request_ctx
+        elapsed = time.perf_counter() - timings.pop('connect_start', time.perf_counter())
+        timings['connect_total'] = timings.get('connect_total', 0.0) + elapsed
+
+    trace.on_dns_resolvehost_start.append(dns_start)
+    trace.on_dns_resolvehost_end.append(dns_end)
+    trace.on_connection_create_start.append(connect_start)
+    trace.on_connection_create_end.append(connect_end)
+    return trace
+
+
+class AsyncHttpClient:
+    """aiohttp counterpart of HttpClient with the same timeouts, retries, body cap and timings"""
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self,
+                 connect_timeout: float = 5,
+                 read_timeout: float = 15,
+                 max_retries: int = 2,
+                 backoff_factor: float = 0.5,
+                 pool_size: int = 32,
+                 max_bytes: int = 5 * 1024 * 1024):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.max_bytes = max_bytes
+        # aiohttp sessions are bound to the loop they were created on. The loop itself is the key (a session keeps
+        # its loop alive anyway, so weak keys would never expire) and sessions of closed loops are discarded
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._lock = threading.Lock()
+
+    def _discard_closed_loops(self) -> None:
+        with self._lock:
+            closed = [loop for loop in self._sessions if loop.is_closed()]
+            sessions = [self._sessions.pop(loop) for loop in closed]
+        for session in sessions:
+            # Nothing can be awaited on a closed loop; closing the connector drops its pooled sockets synchronously
+            if not session.closed:
+                # The connector closes synchronously; aiohttp only warns that the awaitable it returns is dropped
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", DeprecationWarning)
+                    session.connector.close()
+
+    def _session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        self._discard_closed_loops()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            # aiohttp advertises only the encodings it can decode (gzip, deflate and br with Brotli installed)
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+                trace_configs=[_trace_config()]
+            )
+            with self._lock:
+                self._sessions[loop] = session
+        return session
+
+    def close(self, timeout: float = 5) -> None:
+        """Close every open session on its own loop, releasing pooled connections"""
+        self._discard_closed_loops()
+        with self._lock:
+            sessions = list(self._sessions.items())
+            self._sessions.clear()
+        for loop, session in sessions:
+            if session.closed:
+                continue
+            try:
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout)
+                else:
+                    loop.run_until_complete(session.close())
+            except Exception as e:
+                logging.warning(f"Could not close aiohttp session: {str(e)}")
+
+    def _resolve_timeout(self, timeout: Union[None, float, Tuple[float, float]]) -> aiohttp.ClientTimeout:
+        if timeout is None:
+            connect, read = self.connect_timeout, self.read_timeout
+        elif isinstance(timeout, tuple):
+            connect, read = timeout
+        else:
+            connect, read = min(self.connect_timeout, timeout), timeout
+        return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+    async def get(self,
+                  url: str,
+                  headers: Optional[Dict[str, str]] = None,
+                  timeout: Union[None, float, Tuple[float, float]] = None) -> AsyncResponse:
+        """GET a url with retries on connection errors and retryable statuses, reading at most max_bytes"""
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self._get_once(url, headers, timeout)
+                if response.status_code not in self.RETRY_STATUSES or last_attempt:
+                    return response
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last_attempt:
+                    raise
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    async def _get_once(self, url: str, headers: Optional[Dict[str, str]], timeout) -> AsyncResponse:
+        measured: Dict[str, float] = {}
+        start = time.perf_counter()
+        async with self._session().get(url, headers=headers, timeout=self._resolve_timeout(timeout),
+                                       trace_request_ctx=measured) as response:
+            headers_received = time.perf_counter()
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    logging.warning(f"Response from {url} exceeded {self.max_bytes} bytes, truncating")
+                    break
+            finished = time.perf_counter()
+
+        dns = measured.get('dns', 0.0)
+        connect = max(measured.get('connect_total', 0.0) - dns, 0.0)
+        return AsyncResponse(
+            url=str(response.url),
+            status_code=response.status,
+            headers=response.headers,
+            content=bytes(body),
+            timings={
+                'dns': dns,
+                'connect': connect,
+                'ttfb': max(headers_received - start - dns - connect, 0.0),
+                'download': finished - headers_received,
+                'total': finished - start
+            }
+        )
+
+
+_shared_async_client: Optional[AsyncHttpClient] = None
+
+
+def get_async_http_client() -> AsyncHttpClient:
+    """Return the process-wide AsyncHttpClient configured like get_http_client"""
+    global _shared_async_client
+    if _shared_async_client is None:
+        with _shared_client_lock:
+            if _shared_async_client is None:
+                _shared_async_client = AsyncHttpClient(
+                    connect_timeout=float(os.getenv('SCRAPER_CONNECT_TIMEOUT', 5)),
+                    read_timeout=float(os.getenv('SCRAPER_READ_TIMEOUT', 15)),
+                    max_retries=int(os.getenv('SCRAPER_MAX_RETRIES', 2)),
+                    pool_size=int(os.getenv('SCRAPER_POOL_SIZE', 32))
+                )
+                atexit.register(_shared_async_client.close)
+    return _shared_async_client
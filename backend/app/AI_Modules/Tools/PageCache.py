@@ -0,0 +1,138 @@
+from typing import Any, Dict, List, Optional
+import sqlite3
+import threading
+import json
+import time
+import os
+import logging
+from ..Utils.Urls import canonicalize_url
+from ...config import Config
+
+
+class PageCache:
+    """Persistent cache of extracted pages with HTTP validators, evicted least-recently-used by size"""
+
+    def __init__(self, path: str = "page_cache.sqlite", max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lookups = 0
+        # Hits are pages the server confirmed unchanged (304), misses are lookups with no cached entry
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                title TEXT,
+                content TEXT,
+                links TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER,
+                fetched_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, content, links, etag, last_modified, fetched_at FROM pages WHERE url = ?",
+                (canonicalize_url(url),)
+            ).fetchone()
+            self.lookups += 1
+            if row is None:
+                self.misses += 1
+        if row is None:
+            return None
+        return {
+            'title': row[0],
+            'content': row[1],
+            'links': json.loads(row[2]) if row[2] else [],
+            'etag': row[3],
+            'last_modified': row[4],
+            'fetched_at': row[5]
+        }
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, url: str) -> None:
+        """Mark a cached page as revalidated (304) so it stays at the recent end of the LRU order"""
+        with self._lock:
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE pages SET accessed_at = ? WHERE url = ?",
+                (time.time(), canonicalize_url(url))
+            )
+            self._conn.commit()
+
+    def put(self, url: str, title: str, content: str, links: List[str],
+            etag: Optional[str], last_modified: Optional[str]) -> None:
+        now = time.time()
+        size = len(content.encode('utf-8')) + len(title.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (canonicalize_url(url), title, content, json.dumps(links), etag, last_modified, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for url, size in self._conn.execute("SELECT url, size FROM pages ORDER BY accessed_at ASC"):
+            if total - freed <= self.max_bytes:
+                break
+            victims.append((url,))
+            freed += size
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", victims)
+        logging.info(f"Page cache evicted {len(victims)} pages ({freed} bytes)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+            return {
+                'pages': count,
+                'bytes': total,
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0
+            }
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Return the process-wide page cache configured by PAGE_CACHE_* environment variables"""
+    global _page_cache
+    if os.getenv('PAGE_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes'):
+        return None
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                _page_cache = PageCache(
+                    path=Config.PAGE_CACHE_PATH,
+                    max_bytes=int(float(os.getenv('PAGE_CACHE_MAX_MB', 256)) * 1024 * 1024)
+                )
+    return _page_cache
@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+import threading
+import asyncio
+import time
+import os
+import logging
+from ..Utils.Model import ConcurrencyLimit
+
+
+class ScrapePool:
+    """Runs page scraping jobs with a global and a per-host concurrency cap.
+    The caps are shared by threads and coroutines, so sync and async scrapes draw on the same slots."""
+
+    def __init__(self, max_workers: int = 8, per_host_limit: int = 2, timeout: float = 20):
+        """
+        timeout : Upper bound on a single scrape; callers may ask for less
+        """
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self._host_slots: Dict[str, ConcurrencyLimit] = {}
+        self._global_slots = ConcurrencyLimit(max_workers)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlparse(url).netloc.lower().replace('www.', '')
+
+    def _host_slot(self, url: str) -> ConcurrencyLimit:
+        host = self._host(url)
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = ConcurrencyLimit(self.per_host_limit)
+            return self._host_slots[host]
+
+    def _run(self, func: Callable[[str], Any], url: str, started: List[float], abandoned: threading.Event):
+        # Waiting for the host is not part of the scrape timeout, which starts once func does. A scrape that run
+        # gave up on keeps its slot until func returns, so func must bound its own work (HttpClient bounds the fetch)
+        slot = self._host_slot(url)
+        slot.acquire()
+        try:
+            if abandoned.is_set():
+                return None
+            started.append(time.monotonic())
+            return func(url)
+        finally:
+            slot.release()
+
+    def _worker(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scrape")
+            return self._executor
+
+    def run(self, func: Callable[[str], Any], url: str, timeout: Optional[float] = None,
+            queue_timeout: Optional[float] = None) -> Optional[Any]:
+        """Apply func to a single url under the global and per-host caps, None on failure or timeout.
+        queue_timeout bounds the wait for free slots (no bound when None) and timeout bounds func once it starts;
+        a timed out func finishes in the background and only then gives its slots back"""
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        queue_deadline = None if queue_timeout is None else time.monotonic() + max(queue_timeout, 0)
+        if not self._global_slots.acquire(timeout=None if queue_timeout is None else max(queue_timeout, 0)):
+            logging.warning(f"No free scrape slot within {queue_timeout:.1f}s for {url}")
+            return None
+
+        started: List[float] = []
+        abandoned = threading.Event()
+        try:
+            future = self._worker().submit(self._run, func, url, started, abandoned)
+        except Exception:
+            self._global_slots.release()
+            raise
+        # Holding the global slot until the work really ends keeps the executor from queueing behind abandoned scrapes
+        future.add_done_callback(lambda _: self._global_slots.release())
+
+        while True:
+            limit = started[0] + timeout if started else queue_deadline
+            now = time.monotonic()
+            if limit is not None and now >= limit:
+                abandoned.set()
+                if started:
+                    logging.warning(f"Scrape timed out after {timeout:.1f}s for {url}")
+                else:
+                    logging.warning(f"No free slot for host of {url} within {queue_timeout:.1f}s")
+                return None
+            done, _ = wait([future], timeout=0.5 if limit is None else min(limit - now, 0.5))
+            if done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    logging.error(f"Scrape failed for {url}: {str(e)}")
+                    return None
+
+    async def arun(self, func: Callable[[str], Awaitable[Any]], url: str, timeout: Optional[float] = None) -> Optional[Any]:
+        """Await func for a single url under the caps with a hard timeout, None on failure"""
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        host_slot = self._host_slot(url)
+        await self._global_slots.aacquire()
+        try:
+            await host_slot.aacquire()
+            try:
+                return await asyncio.wait_for(func(url), timeout=max(timeout, 0))
+            except asyncio.TimeoutError:
+                logging.warning(f"Scrape timed out after {timeout:.1f}s for {url}")
+            except Exception as e:
+                logging.error(f"Scrape failed for {url}: {str(e)}")
+            finally:
+                host_slot.release()
+            return None
+        finally:
+            self._global_slots.release()
+
+
+_scrape_pool = None
+_scrape_pool_lock = threading.Lock()
+
+
+def get_scrape_pool() -> ScrapePool:
+    """Return the process-wide scrape pool configured by SCRAPE_* environment variables, so its caps bound
+    the load of every deep search in the process together rather than of each one alone"""
+    global _scrape_pool
+    if _scrape_pool is None:
+        with _scrape_pool_lock:
+            if _scrape_pool is None:
+                _scrape_pool = ScrapePool(
+                    max_workers=int(os.getenv('SCRAPE_MAX_WORKERS', 8)),
+                    per_host_limit=int(os.getenv('SCRAPE_PER_HOST_LIMIT', 2)),
+                    timeout=float(os.getenv('SCRAPE_MAX_TIMEOUT', 60))
+                )
+                logging.info(f"Started scrape pool with {_scrape_pool.max_workers} workers")
+    return _scrape_pool
@@ -4,7 +4,10 @@ import pandas as pd
 import json     
 from typing import List, Dict
 from ..Utils.Model import Model    
+from .HttpClient import HttpClient, AsyncHttpClient, get_http_client, get_async_http_client
+from .PageCache import PageCache, get_page_cache
 import re
+import asyncio
 import urllib3
 from urllib.parse import urljoin, urlparse
 import os 
@@ -30,7 +33,7 @@ logging.basicConfig(
 class Scrapy:
     """AI powered scraping class"""
     
-    def __init__(self,base_url:str,model:Model):
+    def __init__(self,base_url:str,model:Model,client:HttpClient=None,page_cache:PageCache=None,async_client:AsyncHttpClient=None):
         self.header = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
@@ -40,6 +43,10 @@ class Scrapy:
         self.visited_sites = set()
         self.scraped_page = []
         self.model = model
+        self.client = client or get_http_client()
+        self.async_client = async_client or get_async_http_client()
+        self.page_cache = page_cache if page_cache is not None else get_page_cache()
+        self.fetch_timings = {}
         logging.info("Scrapy initialization complete")
         
     def _extract_content(self, soup:BeautifulSoup):
@@ -94,35 +101,78 @@ class Scrapy:
             return False
         
         
-    def dismantle_webpage(self,url:str,user_prompt:str="",get_sublinks = False):
-        """
-        user_prompt : Parameter for the user to specify the goal of the scraping the website / webpage
-        """
-        try:
-            response = requests.get(url)
-            self.visited_sites.add(url)
+    def _request_headers(self,url:str):
+        cached = self.page_cache.get(url) if self.page_cache else None
+        headers = dict(self.header)
+        if cached:
+            headers.update(self.page_cache.conditional_headers(cached))
+        return cached, headers
+    
+    def _handle_response(self,url:str,response,cached,user_prompt:str="",get_sublinks=False):
+        self.visited_sites.add(url)
+        self.fetch_timings[url] = response.timings
+        logging.info(
+            f"Fetched {url} [{response.status_code}] dns={response.timings['dns']*1000:.0f}ms "
+            f"connect={response.timings['connect']*1000:.0f}ms ttfb={response.timings['ttfb']*1000:.0f}ms "
+            f"download={response.timings['download']*1000:.0f}ms"
+        )
+        
+        if cached and response.status_code == 304:
+            logging.info(f"Page not modified, reusing cached extraction for {url}")
+            self.page_cache.touch(url)
+            title = cached['title']
+            content = cached['content']
+            page_links = cached['links']
+        else:
+            response.raise_for_status()
             body = response.content
             soup = BeautifulSoup(body,'html.parser')
             title = soup.title.string if soup.title else "No title found"
+            title = str(title) if title else "No title found"
             content = self._extract_content(soup)
-            page_data = {
-                'title': title,
-                'url' : url,
-                'content': content
-            }
-            self.scraped_page.append(page_data)
-            if get_sublinks:
-                links = []
-                for link in soup.find_all('a',href=True):
-                    full_url = urljoin(url,link['href'])
-                    if self._is_valid_url(full_url):
-                        links.append(full_url)
-                if links:
-                    links = self.sub_link_filter(links,user_prompt)
-                    for link in links:
-                        if link not in self.visited_sites:
-                            self.sub_sites.append(link)
+            page_links = [urljoin(url,link['href']) for link in soup.find_all('a',href=True)]
             
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if self.page_cache and (etag or last_modified):
+                self.page_cache.put(url, title, content, page_links, etag, last_modified)
+        
+        page_data = {
+            'title': title,
+            'url' : url,
+            'content': content
+        }
+        self.scraped_page.append(page_data)
+        if get_sublinks:
+            links = []
+            for full_url in page_links:
+                if self._is_valid_url(full_url):
+                    links.append(full_url)
+            if links:
+                links = self.sub_link_filter(links,user_prompt)
+                for link in links:
+                    if link not in self.visited_sites:
+                        self.sub_sites.append(link)
+        
+    def dismantle_webpage(self,url:str,user_prompt:str="",get_sublinks = False,timeout:float=None):
+        """
+        user_prompt : Parameter for the user to specify the goal of the scraping the website / webpage
+        timeout : Seconds to wait for the server before giving up on the page
+        """
+        try:
+            cached, headers = self._request_headers(url)
+            response = self.client.get(url,headers=headers,timeout=timeout)
+            self._handle_response(url,response,cached,user_prompt,get_sublinks)
+        except Exception as e:
+            logging.info(e)
+    
+    async def adismantle_webpage(self,url:str,user_prompt:str="",get_sublinks = False,timeout:float=None):
+        """Async variant of dismantle_webpage; the page cache lookup and the HTML parsing run in worker threads
+        to keep the event loop free"""
+        try:
+            cached, headers = await asyncio.to_thread(self._request_headers,url)
+            response = await self.async_client.get(url,headers=headers,timeout=timeout)
+            await asyncio.to_thread(self._handle_response,url,response,cached,user_prompt,get_sublinks)
         except Exception as e:
             logging.info(e)
             
@@ -0,0 +1,187 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+import logging
+from ...config import Config
+
+
+# Google only treats these as operators in upper case, so they survive lowercasing
+_OPERATORS = frozenset(('OR', 'AND'))
+
+
+def normalize_query(query: str) -> str:
+    """Fold Unicode forms, case and whitespace so trivial rephrasings share a cache entry.
+    Punctuation is kept since it changes results (c++ vs c#, site:, -term, "exact phrase")."""
+    words = unicodedata.normalize('NFKC', query).split()
+    return ' '.join(word if word in _OPERATORS else word.lower() for word in words)
+
+
+class SearchCache(ABC):
+    """TTL cache of search result lists keyed by normalized query, page count and scholar flag"""
+
+    def __init__(self, ttl: float = 6 * 3600):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.search_seconds = 0.0
+        self.searches = 0
+        self._lock = threading.Lock()
+
+    def key(self, query: str, pages: int, scholar: bool) -> str:
+        raw = json.dumps([normalize_query(query), pages, bool(scholar)])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @abstractmethod
+    def _load(self, key: str) -> Optional[Tuple[List[Dict[str, str]], float]]:
+        """Return (results, stored_at epoch seconds) or None"""
+        pass
+
+    @abstractmethod
+    def _store(self, key: str, query: str, pages: int, scholar: bool, results: List[Dict[str, str]]) -> None:
+        pass
+
+    def get(self, query: str, pages: int, scholar: bool = False) -> Optional[List[Dict[str, str]]]:
+        try:
+            record = self._load(self.key(query, pages, scholar))
+        except Exception as e:
+            logging.warning(f"Search cache lookup failed: {str(e)}")
+            record = None
+
+        hit = record is not None and time.time() - record[1] < self.ttl
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if hit:
+            logging.info(f"Search cache hit for '{query}'")
+            return [dict(result) for result in record[0]]
+        return None
+
+    def set(self, query: str, pages: int, scholar: bool, results: List[Dict[str, str]],
+            elapsed: Optional[float] = None) -> None:
+        """Store results; elapsed is the browser time the search took, used to estimate savings"""
+        if elapsed is not None:
+            with self._lock:
+                self.search_seconds += elapsed
+                self.searches += 1
+        if not results:
+            return
+        try:
+            self._store(self.key(query, pages, scholar), query, pages, scholar, results)
+        except Exception as e:
+            logging.warning(f"Search cache store failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_search = self.search_seconds / self.searches if self.searches else 0.0
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'avg_search_seconds': avg_search,
+                'estimated_seconds_saved': self.hits * avg_search
+            }
+
+
+class DiskSearchCache(SearchCache):
+    """Stores each entry as a small JSON file in a local directory"""
+
+    def __init__(self, directory: str = "search_cache", ttl: float = 6 * 3600):
+        super().__init__(ttl=ttl)
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load(self, key: str) -> Optional[Tuple[List[Dict[str, str]], float]]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        if time.time() - record['stored_at'] >= self.ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return record['results'], record['stored_at']
+
+    def _store(self, key: str, query: str, pages: int, scholar: bool, results: List[Dict[str, str]]) -> None:
+        record = {
+            'query': query,
+            'pages': pages,
+            'scholar': scholar,
+            'results': results,
+            'stored_at': time.time()
+        }
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self._path(key))
+
+
+class MongoSearchCache(SearchCache):
+    """Stores entries in a MongoDB collection with a TTL index doing the eviction"""
+
+    def __init__(self, collection, ttl: float = 6 * 3600):
+        super().__init__(ttl=ttl)
+        self.collection = collection
+        try:
+            self.collection.create_index('created_at', expireAfterSeconds=int(ttl))
+        except Exception as e:
+            logging.warning(f"Could not create TTL index for search cache: {str(e)}")
+
+    def _load(self, key: str) -> Optional[Tuple[List[Dict[str, str]], float]]:
+        record = self.collection.find_one({'_id': key})
+        if not record:
+            return None
+        # PyMongo returns naive datetimes in UTC
+        return record['results'], record['created_at'].replace(tzinfo=timezone.utc).timestamp()
+
+    def _store(self, key: str, query: str, pages: int, scholar: bool, results: List[Dict[str, str]]) -> None:
+        self.collection.replace_one(
+            {'_id': key},
+            {
+                '_id': key,
+                'query': normalize_query(query),
+                'pages': pages,
+                'scholar': scholar,
+                'results': results,
+                'created_at': datetime.now(timezone.utc)
+            },
+            upsert=True
+        )
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """Return the process-wide search cache configured by SEARCH_CACHE_* environment variables"""
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                backend = os.getenv('SEARCH_CACHE_BACKEND', 'disk').lower()
+                ttl = float(os.getenv('SEARCH_CACHE_TTL', 6 * 3600))
+                if backend == 'none':
+                    return None
+                if backend == 'mongo':
+                    from pymongo import MongoClient
+                    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/ai_chat'))
+                    _search_cache = MongoSearchCache(client.get_default_database().search_cache, ttl=ttl)
+                else:
+                    _search_cache = DiskSearchCache(Config.SEARCH_CACHE_DIR, ttl=ttl)
+                logging.info(f"Using {backend} search cache with ttl={ttl}s")
+    return _search_cache
@@ -7,6 +7,8 @@ class Website(BaseModel):
     url : str 
     title : str 
     content : str | None 
+    # (position in its query's results, query index), so results merged from parallel searches keep search order
+    rank : tuple[int, int] | None = None
 
 class SearchQueries(BaseModel):
     queries: list[str]
@@ -0,0 +1,56 @@
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional, TypeVar
+import asyncio
+import threading
+import logging
+
+T = TypeVar("T")
+
+
+class AsyncRunner:
+    """Event loop on a background thread so synchronous Flask handlers and job workers can drive async graphs"""
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-runner", daemon=True)
+        self._thread.start()
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Run coro on the shared loop and block the calling thread until it finishes"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timeouts and a caller going away must not leave the coroutine running
+            future.cancel()
+            raise
+
+    def iterate(self, agen: AsyncIterator[T]) -> Iterator[T]:
+        """Consume an async iterator from synchronous code, one item per round trip to the loop"""
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            aclose = getattr(agen, "aclose", None)
+            if aclose is not None:
+                try:
+                    self.run(aclose())
+                except Exception as e:
+                    logging.warning(f"Error closing async iterator: {str(e)}")
+
+
+_async_runner = None
+_async_runner_lock = threading.Lock()
+
+
+def get_async_runner() -> AsyncRunner:
+    """Return the process-wide async runner"""
+    global _async_runner
+    if _async_runner is None:
+        with _async_runner_lock:
+            if _async_runner is None:
+                _async_runner = AsyncRunner()
+                logging.info("Started async runner event loop")
+    return _async_runner
@@ -0,0 +1,66 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from itertools import repeat
+from langchain_core.documents import Document
+from .Tokens import token_offsets
+
+
+class TokenChunker:
+    """Splits documents into overlapping token windows that keep their source metadata and character offsets"""
+
+    def __init__(self, chunk_size: int = 512, chunk_overlap: int = 64, encoding_name: str = "cl100k_base"):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding_name = encoding_name
+
+    def split_text(self, text: str) -> List[tuple]:
+        """Return (chunk_text, start_index, end_index) windows over text"""
+        offsets = token_offsets(text, self.encoding_name)
+        if not offsets:
+            return []
+
+        windows = []
+        step = self.chunk_size - self.chunk_overlap
+        for start in range(0, len(offsets), step):
+            end = start + self.chunk_size
+            start_char = offsets[start]
+            end_char = offsets[end] if end < len(offsets) else len(text)
+            raw = text[start_char:end_char]
+            chunk = raw.strip()
+            if chunk:
+                start_char += len(raw) - len(raw.lstrip())
+                windows.append((chunk, start_char, start_char + len(chunk)))
+            if end >= len(offsets):
+                break
+        return windows
+
+    def iter_documents(self,
+                       documents: Iterable[str],
+                       metadatas: Optional[Iterable[Dict[str, Any]]] = None) -> Iterator[Document]:
+        metadatas = metadatas if metadatas is not None else repeat({})
+        for text, metadata in zip(documents, metadatas):
+            for index, (chunk, start, end) in enumerate(self.split_text(text)):
+                yield Document(
+                    page_content=chunk,
+                    metadata={
+                        **metadata,
+                        "chunk_index": index,
+                        "start_index": start,
+                        "end_index": end
+                    }
+                )
+
+    def iter_batches(self,
+                     documents: Iterable[str],
+                     metadatas: Optional[Iterable[Dict[str, Any]]] = None,
+                     batch_size: int = 64) -> Iterator[List[Document]]:
+        """Stream chunks in fixed-size batches so retrievers can ingest while later pages are still being split"""
+        batch = []
+        for chunk in self.iter_documents(documents, metadatas):
+            batch.append(chunk)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
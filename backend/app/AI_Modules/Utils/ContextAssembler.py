@@ -0,0 +1,181 @@
+from bisect import bisect_left
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Set
+import math
+import re
+import os
+import logging
+from .Tokens import count_tokens, token_offsets, truncate_to_tokens
+
+# Ollama's own default when a request does not set num_ctx
+OLLAMA_DEFAULT_NUM_CTX = 2048
+
+_WORD = re.compile(r"\w{3,}")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_STOPWORDS = frozenset(
+    "the and for are but not you all any can had her was one our out has him his how its may new now "
+    "see two who did get let say she too use with that this from they will would there their what "
+    "about which when make like into than them then some could other more these also been have were".split()
+)
+
+
+def context_window(model) -> int:
+    """Tokens the model attends to: its num_ctx parameter, else OLLAMA_NUM_CTX, else Ollama's default"""
+    params = getattr(model, "params", None) or {}
+    return int(params.get("num_ctx") or os.getenv("OLLAMA_NUM_CTX") or OLLAMA_DEFAULT_NUM_CTX)
+
+
+def query_terms(text: str) -> Set[str]:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS}
+
+
+@dataclass
+class ContextSource:
+    text: str
+    source: str
+    # Relevance given by the caller (e.g. retriever rank); lexical overlap with the query when None
+    score: Optional[float] = None
+
+
+class ContextAssembler:
+    """Fits source texts into what is left of a model's context window after the prompt and the answer"""
+
+    def __init__(self, context_window: int = OLLAMA_DEFAULT_NUM_CTX, output_reserve: int = 1024,
+                 encoding_name: str = "cl100k_base", safety_margin: float = 0.1,
+                 min_source_tokens: int = 64, source_overhead: int = 16):
+        """
+        output_reserve : Tokens kept free for the generated answer
+        safety_margin : Share of the window left unused since the model's tokenizer differs from the counting one
+        min_source_tokens : Smallest useful excerpt; sources that would get less are dropped instead
+        source_overhead : Tokens per source for its header, citation and separators
+        """
+        self.context_window = context_window
+        self.output_reserve = output_reserve
+        self.encoding_name = encoding_name
+        self.safety_margin = safety_margin
+        self.min_source_tokens = min_source_tokens
+        self.source_overhead = source_overhead
+
+    @classmethod
+    def for_model(cls, model, **kwargs) -> "ContextAssembler":
+        return cls(context_window=context_window(model), **kwargs)
+
+    def budget(self, prompt_without_context: str) -> int:
+        """Context tokens that fit next to the filled-in prompt template and the output reserve"""
+        usable = int(self.context_window * (1 - self.safety_margin)) - self.output_reserve
+        return max(usable - count_tokens(prompt_without_context, self.encoding_name), 0)
+
+    def _relevance(self, sources: List[ContextSource], terms: Set[str]) -> List[float]:
+        if all(source.score is not None for source in sources):
+            return [max(source.score, 0.0) for source in sources]
+
+        # Log-scaled term frequency weighted by how rare the term is across the sources
+        counts = []
+        for source in sources:
+            words: Dict[str, int] = {}
+            for word in _WORD.findall(source.text.lower()):
+                if word in terms:
+                    words[word] = words.get(word, 0) + 1
+            counts.append(words)
+        document_frequency = {term: sum(1 for words in counts if term in words) for term in terms}
+        lexical = [
+            sum(math.log1p(tf) * math.log1p(len(sources) / document_frequency[term]) for term, tf in words.items())
+            for words in counts
+        ]
+        return [source.score if source.score is not None else score for source, score in zip(sources, lexical)]
+
+    def _allocate(self, needs: List[int], weights: List[float], budget: int) -> List[int]:
+        """Split budget in proportion to weights, handing what short sources do not need to the others"""
+        allocation = [0] * len(needs)
+        active = set(range(len(needs)))
+        remaining = budget
+        while active:
+            total = sum(weights[i] for i in active)
+            shares = {i: remaining * weights[i] / total for i in active}
+            satisfied = [i for i in active if needs[i] <= shares[i]]
+            if not satisfied:
+                for i in active:
+                    allocation[i] = int(shares[i])
+                break
+            for i in satisfied:
+                allocation[i] = needs[i]
+                remaining -= needs[i]
+                active.discard(i)
+        return allocation
+
+    def compress(self, text: str, max_tokens: int, terms: Set[str]) -> str:
+        """Extract the sentences sharing the most terms with the query, in their original order, within max_tokens"""
+        if max_tokens <= 0:
+            return ""
+        offsets = token_offsets(text, self.encoding_name)
+        if len(offsets) <= max_tokens:
+            return text
+
+        sentences = []
+        start = 0
+        boundary = 0
+        for match in _SENTENCE_END.finditer(text + "\n"):
+            end = match.start()
+            if text[start:end].strip():
+                # Tokens carry their leading whitespace, so a sentence is counted from the end of the previous one
+                tokens = bisect_left(offsets, end) - bisect_left(offsets, boundary)
+                matches = len(terms & query_terms(text[start:end]))
+                # Earlier sentences win ties, so text without query terms degrades to its lead
+                sentences.append((matches + 0.1 / (1 + len(sentences)), start, end, tokens))
+            start = match.end()
+            boundary = end
+
+        chosen = []
+        used = 0
+        for score, start, end, tokens in sorted(sentences, key=lambda sentence: -sentence[0]):
+            if used + tokens <= max_tokens:
+                chosen.append((start, end))
+                used += tokens
+        if not chosen:
+            return truncate_to_tokens(text, max_tokens, self.encoding_name)
+        # Rejoining can merge or split a token at the seams, so the result is clipped to the allocation
+        return truncate_to_tokens(" ".join(text[start:end].strip() for start, end in sorted(chosen)),
+                                  max_tokens, self.encoding_name)
+
+    def assemble(self, sources: List[ContextSource], budget: int, query: str = "") -> List[ContextSource]:
+        """Sources that fit the budget in their original order, trimmed or compressed to their share of it"""
+        sources = [source for source in sources if source.text and source.text.strip()]
+        if not sources or budget <= 0:
+            return []
+
+        needs = [count_tokens(source.text, self.encoding_name) + self.source_overhead for source in sources]
+        if sum(needs) <= budget:
+            return sources
+
+        terms = query_terms(query)
+        relevance = self._relevance(sources, terms)
+        # Irrelevant-looking sources keep a small weight so they are trimmed rather than silently starved
+        floor = 0.1 * max(relevance) if max(relevance) > 0 else 1.0
+        weights = [score + floor for score in relevance]
+
+        kept = list(range(len(sources)))
+        while kept:
+            allocation = self._allocate([needs[i] for i in kept], [weights[i] for i in kept], budget)
+            starved = [
+                position for position, i in enumerate(kept)
+                if allocation[position] < min(needs[i], self.min_source_tokens + self.source_overhead)
+            ]
+            if not starved:
+                break
+            # Drop the least relevant starved source and share its budget among the rest
+            kept.pop(min(starved, key=lambda position: weights[kept[position]]))
+
+        assembled = []
+        for position, i in enumerate(kept):
+            if allocation[position] >= needs[i]:
+                assembled.append(sources[i])
+            else:
+                text = self.compress(sources[i].text, allocation[position] - self.source_overhead, terms)
+                assembled.append(replace(sources[i], text=text))
+
+        used = sum(count_tokens(source.text, self.encoding_name) + self.source_overhead for source in assembled)
+        logging.info(
+            f"Assembled {len(assembled)}/{len(sources)} sources into {used}/{budget} context tokens "
+            f"from {sum(needs)} available"
+        )
+        return assembled
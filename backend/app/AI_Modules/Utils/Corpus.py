@@ -0,0 +1,271 @@
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import sqlite3
+import threading
+import json
+import time
+import os
+import logging
+import numpy as np
+from langchain_core.documents import Document
+from .Urls import canonicalize_url
+from ...config import Config
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class _ChunkMatrix:
+    """Normalized chunk vectors of one embedding model, grown in place as pages are re-chunked.
+    Rows only carry their lookup key; chunk text is read from the database for the hits alone."""
+
+    def __init__(self, loaded_at: float):
+        self.loaded_at = loaded_at
+        self.size = 0
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.fetched_at = np.zeros(0)
+        self.alive = np.zeros(0, dtype=bool)
+        self.keys: List[Tuple[str, int]] = []
+        self._by_hash: Dict[str, int] = {}
+        self._by_url: Dict[str, List[int]] = {}
+
+    def _reserve(self, dim: int) -> None:
+        if self.vectors.shape[1] != dim:
+            if self.size:
+                raise ValueError(f"Embedding dimension changed from {self.vectors.shape[1]} to {dim}")
+            self.vectors = np.zeros((0, dim), dtype=np.float32)
+        if self.size < len(self.vectors):
+            return
+        # Capacity doubles so appending a page costs amortized O(rows added), not a copy of the corpus
+        capacity = max(64, 2 * len(self.vectors))
+        vectors = np.zeros((capacity, dim), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        fetched_at = np.zeros(capacity)
+        fetched_at[:self.size] = self.fetched_at[:self.size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.size] = self.alive[:self.size]
+        self.vectors, self.fetched_at, self.alive = vectors, fetched_at, alive
+
+    def append(self, url: str, chunk_index: int, chunk_hash: str, vector: np.ndarray, fetched_at: float) -> None:
+        # The same text mirrored on several pages is only indexed once, under its latest page
+        previous = self._by_hash.get(chunk_hash)
+        if previous is not None and self.alive[previous]:
+            if self.fetched_at[previous] >= fetched_at:
+                return
+            self.alive[previous] = False
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        self._reserve(len(vector))
+        row = self.size
+        self.vectors[row] = vector / norm if norm else vector
+        self.fetched_at[row] = fetched_at
+        self.alive[row] = True
+        self.keys.append((url, chunk_index))
+        self._by_hash[chunk_hash] = row
+        self._by_url.setdefault(url, []).append(row)
+        self.size += 1
+
+    def drop_url(self, url: str) -> None:
+        for row in self._by_url.pop(url, []):
+            self.alive[row] = False
+
+
+class WebCorpus:
+    """Long-lived store of scraped pages and their embedded chunks shared by every deep search"""
+
+    def __init__(self, path: str = "web_corpus.sqlite", max_age: float = 7 * 24 * 3600):
+        """
+        max_age : Seconds after which a page is stale and gets scraped again
+        """
+        self.path = path
+        self.max_age = max_age
+        self.reused_pages = 0
+        self.reused_chunks = 0
+        self._lock = threading.Lock()
+        # model_id -> vectors cached for search, kept in step with replace_chunks
+        self._matrices: Dict[str, _ChunkMatrix] = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                title TEXT,
+                content TEXT,
+                content_hash TEXT,
+                fetched_at REAL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                model_id TEXT,
+                url TEXT,
+                chunk_index INTEGER,
+                page_hash TEXT,
+                content_hash TEXT,
+                content TEXT,
+                metadata TEXT,
+                embedding BLOB,
+                fetched_at REAL,
+                PRIMARY KEY (model_id, url, chunk_index)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_fetched_at ON chunks (model_id, fetched_at)")
+        self._conn.commit()
+
+    def _fresh_after(self) -> float:
+        return time.time() - self.max_age
+
+    def get_pages(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fresh stored pages for the given urls, keyed by the url as passed in"""
+        canonical = {canonicalize_url(url): url for url in urls}
+        keys = list(canonical)
+        pages = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT url, title, content, content_hash FROM pages "
+                    f"WHERE url IN ({placeholders}) AND fetched_at >= ?",
+                    batch + [self._fresh_after()]
+                ).fetchall()
+                for url, title, content, page_hash in rows:
+                    pages[canonical[url]] = {'title': title, 'content': content, 'content_hash': page_hash}
+            self.reused_pages += len(pages)
+        return pages
+
+    def put_page(self, url: str, title: str, content: str) -> str:
+        page_hash = content_hash(content)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                (canonicalize_url(url), title, content, page_hash, time.time())
+            )
+            self._conn.commit()
+        return page_hash
+
+    def get_chunks(self, url: str, model_id: str, page_hash: str) -> List[Tuple[Document, np.ndarray]]:
+        """Stored chunks and vectors of a page, only if they were built from the same page content"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT content, metadata, embedding FROM chunks "
+                "WHERE model_id = ? AND url = ? AND page_hash = ? ORDER BY chunk_index",
+                (model_id, canonicalize_url(url), page_hash)
+            ).fetchall()
+            self.reused_chunks += len(rows)
+        return [
+            (Document(page_content=content, metadata=json.loads(metadata)), np.frombuffer(blob, dtype=np.float32))
+            for content, metadata, blob in rows
+        ]
+
+    def replace_chunks(self, url: str, model_id: str, page_hash: str,
+                       documents: List[Document], vectors: List[List[float]]) -> None:
+        now = time.time()
+        key = canonicalize_url(url)
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE model_id = ? AND url = ?", (model_id, key))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (model_id, key, doc.metadata.get('chunk_index', i), page_hash,
+                     content_hash(doc.page_content), doc.page_content, json.dumps(doc.metadata),
+                     np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for i, (doc, vector) in enumerate(zip(documents, vectors))
+                ]
+            )
+            self._conn.commit()
+            matrix = self._matrices.get(model_id)
+            if matrix is not None:
+                matrix.drop_url(key)
+                for i, (doc, vector) in enumerate(zip(documents, vectors)):
+                    matrix.append(key, doc.metadata.get('chunk_index', i), content_hash(doc.page_content),
+                                  np.asarray(vector, dtype=np.float32), now)
+
+    def _matrix(self, model_id: str) -> _ChunkMatrix:
+        cached = self._matrices.get(model_id)
+        # Writes from this process are appended as they happen; a reload every hour compacts dropped rows
+        # and picks up chunks other processes wrote
+        if cached is not None and time.time() - cached.loaded_at < 3600:
+            return cached
+
+        matrix = _ChunkMatrix(time.time())
+        for url, chunk_index, chunk_hash, blob, fetched_at in self._conn.execute(
+            "SELECT url, chunk_index, content_hash, embedding, fetched_at FROM chunks "
+            "WHERE model_id = ? AND fetched_at >= ? ORDER BY fetched_at",
+            (model_id, self._fresh_after())
+        ):
+            matrix.append(url, chunk_index, chunk_hash, np.frombuffer(blob, dtype=np.float32), fetched_at)
+        self._matrices[model_id] = matrix
+        return matrix
+
+    def search(self, model_id: str, query_vector: List[float], k: int = 5,
+               exclude_urls: Optional[List[str]] = None) -> List[Tuple[Document, np.ndarray]]:
+        """Most similar fresh chunks by cosine similarity, skipping pages the caller already has"""
+        excluded = {canonicalize_url(url) for url in exclude_urls or []}
+        if k <= 0:
+            return []
+        with self._lock:
+            matrix = self._matrix(model_id)
+            if not matrix.size:
+                return []
+            query = np.asarray(query_vector, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            scores = matrix.vectors[:matrix.size] @ (query / norm if norm else query)
+            usable = matrix.alive[:matrix.size] & (matrix.fetched_at[:matrix.size] >= self._fresh_after())
+            scores[~usable] = -np.inf
+            order = np.argsort(-scores)
+
+            results = []
+            for position in order:
+                if scores[position] == -np.inf:
+                    break
+                url, chunk_index = matrix.keys[position]
+                if url in excluded:
+                    continue
+                row = self._conn.execute(
+                    "SELECT content, metadata, embedding FROM chunks WHERE model_id = ? AND url = ? AND chunk_index = ?",
+                    (model_id, url, chunk_index)
+                ).fetchone()
+                if row is None:
+                    continue
+                content, metadata, blob = row
+                results.append((Document(page_content=content, metadata=json.loads(metadata)),
+                                np.frombuffer(blob, dtype=np.float32)))
+                if len(results) == k:
+                    break
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            chunks = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            return {
+                'pages': pages,
+                'chunks': chunks,
+                'reused_pages': self.reused_pages,
+                'reused_chunks': self.reused_chunks
+            }
+
+
+_web_corpus = None
+_web_corpus_lock = threading.Lock()
+
+
+def get_web_corpus() -> Optional[WebCorpus]:
+    """Return the process-wide web corpus configured by CORPUS_* environment variables"""
+    global _web_corpus
+    if os.getenv('CORPUS_DISABLED', '').lower() in ('1', 'true', 'yes'):
+        return None
+    if _web_corpus is None:
+        with _web_corpus_lock:
+            if _web_corpus is None:
+                _web_corpus = WebCorpus(
+                    path=Config.CORPUS_PATH,
+                    max_age=float(os.getenv('CORPUS_MAX_AGE_HOURS', 7 * 24)) * 3600
+                )
+                logging.info(f"Opened web corpus at {_web_corpus.path}")
+    return _web_corpus
@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import hashlib
+import sqlite3
+import threading
+import os
+import logging
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from ...config import Config
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps any Embeddings with an in-memory LRU tier and a persistent SQLite tier keyed by model id and content hash"""
+
+    def __init__(self,
+                 underlying: Embeddings,
+                 model_id: str,
+                 path: Optional[str] = "embedding_cache.sqlite",
+                 max_memory_mb: float = 64,
+                 batch_size: int = 64,
+                 symmetric: bool = True):
+        """
+        max_memory_mb : Size of the in-memory tier; the least recently used vectors beyond it are only kept on disk
+        symmetric : Whether the model embeds queries and documents identically, letting both share cache entries
+        """
+        self.underlying = underlying
+        self.model_id = model_id
+        # Bounded by bytes rather than entries, since a vector's size depends on the model's dimension
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self._memory_bytes = 0
+        self.batch_size = batch_size
+        self.symmetric = symmetric
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self._conn.commit()
+
+    def _key(self, text: str, kind: str) -> str:
+        if self.symmetric:
+            kind = "document"
+        return hashlib.sha256(f"{self.model_id}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self.memory_hits += len(found)
+
+            remaining = [key for key in keys if key not in found]
+            if remaining and self._conn is not None:
+                disk_found = 0
+                for start in range(0, len(remaining), 500):
+                    batch = remaining[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = vector
+                        self._remember(key, vector)
+                        disk_found += 1
+                self.disk_hits += disk_found
+        return found
+
+    def _store(self, items: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            self.misses += len(items)
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in items.items()]
+                )
+                self._conn.commit()
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        keys = [self._key(text, kind) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing[key] = text
+
+        if missing:
+            missing_keys = list(missing)
+            computed = {}
+            for start in range(0, len(missing_keys), self.batch_size):
+                batch_keys = missing_keys[start:start + self.batch_size]
+                batch_texts = [missing[key] for key in batch_keys]
+                if kind == "query" and not self.symmetric:
+                    vectors = [self.underlying.embed_query(text) for text in batch_texts]
+                else:
+                    vectors = self.underlying.embed_documents(batch_texts)
+                for key, vector in zip(batch_keys, vectors):
+                    computed[key] = np.asarray(vector, dtype=np.float32)
+            self._store(computed)
+            found.update(computed)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "document")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+
+_cached_embeddings: Dict[str, CachedEmbeddings] = {}
+_cached_embeddings_lock = threading.Lock()
+
+
+def get_cached_embeddings(model_id: str, factory: Callable[[], Embeddings]) -> CachedEmbeddings:
+    """Return the process-wide cached wrapper for model_id, building the backend with factory on first use"""
+    with _cached_embeddings_lock:
+        if model_id not in _cached_embeddings:
+            # An empty EMBEDDING_CACHE_PATH keeps the cache in memory only
+            _cached_embeddings[model_id] = CachedEmbeddings(
+                underlying=factory(),
+                model_id=model_id,
+                path=Config.EMBEDDING_CACHE_PATH or None,
+                max_memory_mb=float(os.getenv('EMBEDDING_CACHE_MEMORY_MB', 64))
+            )
+            logging.info(f"Initialized embedding cache for {model_id}")
+        return _cached_embeddings[model_id]
@@ -0,0 +1,119 @@
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class EntityIndex:
+    """Contiguous matrix of normalized entity embeddings with vectorized nearest-neighbour matching"""
+
+    def __init__(self, embedding_model: Embeddings, threshold: float = 0.75, capacity: int = 1024,
+                 max_pending: int = 4096):
+        """
+        max_pending : Vectors kept for entities that are not nodes yet; the oldest are dropped beyond it
+        """
+        self.embedding_model = embedding_model
+        self.threshold = threshold
+        self.max_pending = max_pending
+        self.names: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self._capacity = capacity
+        self._matrix: Optional[np.ndarray] = None
+        # Vectors of entities that were embedded but never became canonical nodes
+        self._pending: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, entity: str) -> bool:
+        return entity in self.positions
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix[:len(self.names)]
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def embed(self, entities: List[str]) -> np.ndarray:
+        """Return normalized vectors for entities, embedding only unseen ones in a single batch"""
+        missing = [e for e in dict.fromkeys(entities) if e not in self.positions and e not in self._pending]
+        if missing:
+            self._flush_pending(len(missing), keep=set(entities))
+            embedded = np.asarray(self.embedding_model.embed_documents(missing), dtype=np.float32)
+            for entity, vector in zip(missing, self._normalize(embedded)):
+                self._pending[entity] = vector
+
+        return np.stack([
+            self._matrix[self.positions[e]] if e in self.positions else self._pending[e]
+            for e in entities
+        ]) if entities else np.zeros((0, 0), dtype=np.float32)
+
+    def _flush_pending(self, incoming: int, keep: set) -> None:
+        # Most extracted entities are merged into existing nodes and never looked up again,
+        # so over a long ingest this would otherwise grow with every entity ever seen
+        excess = len(self._pending) + incoming - self.max_pending
+        if excess <= 0:
+            return
+        for entity in [e for e in self._pending if e not in keep][:excess]:
+            del self._pending[entity]
+
+    def add(self, entity: str) -> int:
+        if entity in self.positions:
+            return self.positions[entity]
+        vector = self.embed([entity])[0]
+
+        if self._matrix is None:
+            self._matrix = np.zeros((self._capacity, vector.shape[0]), dtype=np.float32)
+        elif len(self.names) == self._matrix.shape[0]:
+            grown = np.zeros((self._matrix.shape[0] * 2, self._matrix.shape[1]), dtype=np.float32)
+            grown[:len(self.names)] = self._matrix[:len(self.names)]
+            self._matrix = grown
+
+        position = len(self.names)
+        self._matrix[position] = vector
+        self.names.append(entity)
+        self.positions[entity] = position
+        self._pending.pop(entity, None)
+        return position
+
+    def save(self, directory: str, prefix: str = "entities") -> None:
+        np.save(os.path.join(directory, f"{prefix}_matrix.npy"), self.matrix)
+        with open(os.path.join(directory, f"{prefix}_names.json"), "w", encoding="utf-8") as f:
+            json.dump(self.names, f)
+
+    def load(self, directory: str, prefix: str = "entities", mmap: bool = True) -> None:
+        """Replace the index with a saved one; a memory-mapped matrix is copied only when it next grows"""
+        with open(os.path.join(directory, f"{prefix}_names.json"), "r", encoding="utf-8") as f:
+            self.names = json.load(f)
+        self.positions = {name: position for position, name in enumerate(self.names)}
+        self._pending = {}
+        self._matrix = np.load(os.path.join(directory, f"{prefix}_matrix.npy"), mmap_mode="r" if mmap else None) \
+            if self.names else None
+
+    def nearest(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Best matching index row and similarity for each vector (-1 when the index is empty)"""
+        if not self.names or len(vectors) == 0:
+            return np.full(len(vectors), -1), np.zeros(len(vectors), dtype=np.float32)
+        scores = vectors @ self.matrix.T
+        best = np.argmax(scores, axis=1)
+        return best, scores[np.arange(len(vectors)), best]
+
+    def canonicalize(self, entities: List[str]) -> List[str]:
+        """Map each entity to the most similar indexed entity above the threshold, or to itself"""
+        unique = list(dict.fromkeys(entities))
+        resolved = {e: e for e in unique if e in self.positions}
+        unknown = [e for e in unique if e not in resolved]
+
+        if unknown:
+            best, scores = self.nearest(self.embed(unknown))
+            for entity, index, score in zip(unknown, best, scores):
+                resolved[entity] = self.names[index] if index >= 0 and score > self.threshold else entity
+
+        return [resolved[e] for e in entities]
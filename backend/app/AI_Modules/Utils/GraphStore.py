@@ -0,0 +1,237 @@
+from array import array
+from typing import Dict, Iterable, List, Tuple
+import json
+import os
+import numpy as np
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Concatenate the CSR slices of rows without a Python loop"""
+    rows = np.asarray(rows, dtype=np.int64)
+    rows = rows[rows < len(indptr) - 1]
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=indices.dtype)
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return indices[offsets + np.arange(total)]
+
+
+def _to_csr(rows: np.ndarray, cols: np.ndarray, data: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, cols[order].astype(np.int32), data[order].astype(np.float32)
+
+
+class GraphStore:
+    """Undirected weighted graph over integer entity ids, buffered as COO edges and compacted to CSR on read"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._src = array('i')
+        self._dst = array('i')
+        self._weight = array('f')
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._data = np.zeros(0, dtype=np.float32)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
+
+    def add_node(self, name: str) -> int:
+        node_id = self.ids.get(name)
+        if node_id is None:
+            node_id = len(self.names)
+            self.names.append(name)
+            self.ids[name] = node_id
+            self._dirty = True
+        return node_id
+
+    def add_edge(self, u: int, v: int, weight: float = 1.0) -> None:
+        """Buffer an edge; repeated edges have their weights summed at compaction"""
+        if u == v:
+            return
+        self._src.append(min(u, v))
+        self._dst.append(max(u, v))
+        self._weight.append(weight)
+        self._dirty = True
+
+    def _compact(self) -> None:
+        if not self._dirty:
+            return
+        size = len(self.names)
+
+        rows = np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int64), np.diff(self._indptr))
+        upper = rows < self._indices
+        u = np.concatenate((rows[upper], np.frombuffer(self._src, dtype=np.int32).astype(np.int64)))
+        v = np.concatenate((self._indices[upper].astype(np.int64), np.frombuffer(self._dst, dtype=np.int32)))
+        w = np.concatenate((self._data[upper], np.frombuffer(self._weight, dtype=np.float32)))
+
+        keys, inverse = np.unique(u * size + v, return_inverse=True)
+        weights = np.bincount(inverse, weights=w, minlength=len(keys))
+        u, v = keys // size, keys % size
+
+        self._indptr, self._indices, self._data = _to_csr(
+            np.concatenate((u, v)), np.concatenate((v, u)), np.concatenate((weights, weights)), size
+        )
+        self._src = array('i')
+        self._dst = array('i')
+        self._weight = array('f')
+        self._dirty = False
+
+    def number_of_edges(self) -> int:
+        self._compact()
+        return len(self._indices) // 2
+
+    def neighbors(self, node_ids: Iterable[int]) -> np.ndarray:
+        """Unique neighbour ids of all given nodes"""
+        self._compact()
+        return np.unique(_gather(self._indptr, self._indices, np.fromiter(node_ids, dtype=np.int64)))
+
+    def degree(self) -> np.ndarray:
+        self._compact()
+        return np.diff(self._indptr)
+
+    def weight(self, u: int, v: int, default: float = 0.0) -> float:
+        self._compact()
+        start, end = self._indptr[u], self._indptr[u + 1]
+        position = start + np.searchsorted(self._indices[start:end], v)
+        if position < end and self._indices[position] == v:
+            return float(self._data[position])
+        return default
+
+    def edges(self, node_ids: Iterable[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(u, v, weight) arrays of each undirected edge once, optionally restricted to a node subset"""
+        self._compact()
+        rows = np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int64), np.diff(self._indptr))
+        mask = rows < self._indices
+        if node_ids is not None:
+            subset = np.zeros(len(self.names), dtype=bool)
+            subset[np.fromiter(node_ids, dtype=np.int64)] = True
+            mask &= subset[rows] & subset[self._indices]
+        return rows[mask], self._indices[mask].astype(np.int64), self._data[mask]
+
+    def save(self, directory: str, prefix: str = "graph") -> None:
+        self._compact()
+        np.save(os.path.join(directory, f"{prefix}_indptr.npy"), self._indptr)
+        np.save(os.path.join(directory, f"{prefix}_indices.npy"), self._indices)
+        np.save(os.path.join(directory, f"{prefix}_weights.npy"), self._data)
+        with open(os.path.join(directory, f"{prefix}_names.json"), "w", encoding="utf-8") as f:
+            json.dump(self.names, f)
+
+    @classmethod
+    def load(cls, directory: str, prefix: str = "graph", mmap: bool = True) -> "GraphStore":
+        """Open a saved graph; with mmap the arrays stay on disk and are shared between processes"""
+        mmap_mode = "r" if mmap else None
+        store = cls()
+        with open(os.path.join(directory, f"{prefix}_names.json"), "r", encoding="utf-8") as f:
+            store.names = json.load(f)
+        store.ids = {name: node_id for node_id, name in enumerate(store.names)}
+        store._indptr = np.load(os.path.join(directory, f"{prefix}_indptr.npy"), mmap_mode=mmap_mode)
+        store._indices = np.load(os.path.join(directory, f"{prefix}_indices.npy"), mmap_mode=mmap_mode)
+        store._data = np.load(os.path.join(directory, f"{prefix}_weights.npy"), mmap_mode=mmap_mode)
+        return store
+
+
+class Postings:
+    """Deduplicated integer key to sorted integer values lists, buffered as pairs and compacted to CSR on read"""
+
+    def __init__(self):
+        self._keys = array('i')
+        self._values = array('i')
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._dirty = False
+
+    def add(self, key: int, value: int) -> None:
+        self._keys.append(key)
+        self._values.append(value)
+        self._dirty = True
+
+    def _compact(self) -> None:
+        if not self._dirty:
+            return
+        rows = np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int64), np.diff(self._indptr))
+        keys = np.concatenate((rows, np.frombuffer(self._keys, dtype=np.int32)))
+        values = np.concatenate((self._indices.astype(np.int64), np.frombuffer(self._values, dtype=np.int32)))
+
+        width = int(values.max()) + 1
+        pairs = np.unique(keys * width + values)
+        keys, values = pairs // width, pairs % width
+        self._indptr, self._indices, _ = _to_csr(keys, values, np.zeros(len(keys)), int(keys.max()) + 1)
+        self._keys = array('i')
+        self._values = array('i')
+        self._dirty = False
+
+    def save(self, directory: str, prefix: str) -> None:
+        self._compact()
+        np.save(os.path.join(directory, f"{prefix}_indptr.npy"), self._indptr)
+        np.save(os.path.join(directory, f"{prefix}_indices.npy"), self._indices)
+
+    @classmethod
+    def load(cls, directory: str, prefix: str, mmap: bool = True) -> "Postings":
+        mmap_mode = "r" if mmap else None
+        postings = cls()
+        postings._indptr = np.load(os.path.join(directory, f"{prefix}_indptr.npy"), mmap_mode=mmap_mode)
+        postings._indices = np.load(os.path.join(directory, f"{prefix}_indices.npy"), mmap_mode=mmap_mode)
+        return postings
+
+    def get(self, key: int) -> np.ndarray:
+        return self.union([key])
+
+    def union(self, keys: Iterable[int]) -> np.ndarray:
+        """Sorted unique values posted under any of keys"""
+        self._compact()
+        return np.unique(_gather(self._indptr, self._indices, np.fromiter(keys, dtype=np.int64)))
+
+
+class TextArray:
+    """Append-only list of strings kept as one UTF-8 buffer plus row offsets, so a saved copy can be memory-mapped"""
+
+    def __init__(self):
+        self._buffer = np.zeros(0, dtype=np.uint8)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._tail: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1 + len(self._tail)
+
+    def append(self, text: str) -> None:
+        self._tail.append(text)
+
+    def __getitem__(self, index: int) -> str:
+        stored = len(self._offsets) - 1
+        if index < 0:
+            index += len(self)
+        if index >= stored:
+            return self._tail[index - stored]
+        return bytes(self._buffer[self._offsets[index]:self._offsets[index + 1]]).decode("utf-8")
+
+    def _compact(self) -> None:
+        if not self._tail:
+            return
+        encoded = [text.encode("utf-8") for text in self._tail]
+        lengths = np.fromiter((len(chunk) for chunk in encoded), dtype=np.int64, count=len(encoded))
+        self._offsets = np.concatenate((self._offsets, self._offsets[-1] + np.cumsum(lengths)))
+        self._buffer = np.concatenate((self._buffer, np.frombuffer(b"".join(encoded), dtype=np.uint8)))
+        self._tail = []
+
+    def save(self, directory: str, prefix: str) -> None:
+        self._compact()
+        np.save(os.path.join(directory, f"{prefix}_text.npy"), self._buffer)
+        np.save(os.path.join(directory, f"{prefix}_offsets.npy"), self._offsets)
+
+    @classmethod
+    def load(cls, directory: str, prefix: str, mmap: bool = True) -> "TextArray":
+        mmap_mode = "r" if mmap else None
+        texts = cls()
+        texts._buffer = np.load(os.path.join(directory, f"{prefix}_text.npy"), mmap_mode=mmap_mode)
+        texts._offsets = np.load(os.path.join(directory, f"{prefix}_offsets.npy"), mmap_mode=mmap_mode)
+        return texts
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import sqlite3
+import threading
+import json
+import time
+import os
+import logging
+from ...config import Config
+
+
+class LLMCache:
+    """Responses of deterministic generations in an in-memory LRU tier and a persistent SQLite tier, with a TTL"""
+
+    def __init__(self,
+                 path: Optional[str] = "llm_cache.sqlite",
+                 max_memory_items: int = 2000,
+                 ttl: float = 24 * 3600):
+        self.ttl = ttl
+        self.max_memory_items = max_memory_items
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, created_at REAL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+            self._conn.commit()
+
+    def key(self, model_id: str, params: Dict[str, Any], prompt: str) -> str:
+        raw = json.dumps([model_id, params], sort_keys=True, default=str)
+        return hashlib.sha256(f"{raw}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, response: str, created_at: float) -> None:
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ? AND created_at >= ?",
+                    (key, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            if self._conn is not None:
+                self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, response, now))
+                self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Return the process-wide LLM response cache configured by LLM_CACHE_* environment variables"""
+    global _llm_cache
+    if os.getenv('LLM_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes'):
+        return None
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                # An empty LLM_CACHE_PATH keeps the cache in memory only
+                _llm_cache = LLMCache(
+                    path=Config.LLM_CACHE_PATH or None,
+                    max_memory_items=int(os.getenv('LLM_CACHE_MEMORY_ITEMS', 2000)),
+                    ttl=float(os.getenv('LLM_CACHE_TTL', 24 * 3600))
+                )
+                logging.info("Initialized LLM response cache")
+    return _llm_cache
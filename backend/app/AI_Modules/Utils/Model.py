@@ -1,6 +1,24 @@
 from abc import ABC,abstractmethod
+from contextlib import contextmanager, asynccontextmanager
+from collections import deque
+from typing import AsyncIterator, Dict, Iterator, Optional
 from langchain_ollama import OllamaLLM
-from ollama import ListResponse, list
+from ollama import ListResponse, list as ollama_list
+import threading
+import asyncio
+import json
+import time
+import os
+import logging
+from .LLMCache import LLMCache, get_llm_cache
+
+DEFAULT_MODEL = "llama3.2:1b"
+
+# Generation options users may set in config.parameters; anything else would be rejected by OllamaLLM
+MODEL_PARAMETERS = frozenset({
+    "temperature", "top_k", "top_p", "num_ctx", "num_predict", "repeat_penalty", "repeat_last_n",
+    "mirostat", "mirostat_eta", "mirostat_tau", "tfs_z", "seed", "stop", "num_gpu", "num_thread"
+})
 
 class Model:
     
@@ -18,20 +36,269 @@ class Model:
     def _run(self):
         pass
 
+    def _stream(self,input:str) -> Iterator[str]:
+        """Yield the generation in chunks; models without native streaming yield it whole"""
+        yield self._run(input)
+
+    async def _arun(self,input:str) -> str:
+        """Async generation; models without a native async client run _run in a worker thread"""
+        return await asyncio.to_thread(self._run,input)
+
+    async def _astream(self,input:str) -> AsyncIterator[str]:
+        yield await self._arun(input)
+
+
+class ConcurrencyLimit:
+    """Slots shared by threads and coroutines, granted in arrival order.
+    Async waiters suspend on a future instead of holding a thread or polling, and are not starved by sync ones."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._available = limit
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a slot, at most timeout seconds when given; False if none was granted in time"""
+        with self._lock:
+            if self._available and not self._waiters:
+                self._available -= 1
+                return True
+            granted = threading.Event()
+            self._waiters.append(granted)
+        if granted.wait(timeout):
+            return True
+        with self._lock:
+            if granted in self._waiters:
+                self._waiters.remove(granted)
+                return False
+        # The slot was handed over just as the wait timed out
+        return True
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._available and not self._waiters:
+                self._available -= 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was handed over just as the wait was cancelled, so it goes to the next waiter
+            self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                if self._available >= self.limit:
+                    raise ValueError("ConcurrencyLimit released too many times")
+                self._available += 1
+                return
+            # The slot passes straight to the oldest waiter without becoming available in between
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            try:
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+            except RuntimeError:
+                # The waiter's loop is closed, nobody will take the slot there
+                self.release()
+
+    def __enter__(self) -> "ConcurrencyLimit":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class OllamaModel(Model):
 
-class OllamaModel(Model):  
-    
     @classmethod
-    def _get_model(self):
-        response: ListResponse = list()
-        result = dict()
-        for model in response.models:
-            result.update({model.model:model.size.real/1024/1024})
-        
-    def __init__(self,model="llama3.2:1b",temperature=0):
-        self.model = OllamaLLM(model=model,temperature=temperature) 
-        
-    
+    def _get_model(self, provider: str = "ollama", config: Optional[dict] = None) -> "OllamaModel":
+        """Shared model for a user's provider and config ({'model': ..., 'parameters': {...}}).
+        Without a configured model this is the default one, which callers fall back on, so it does not raise"""
+        if provider != "ollama":
+            raise ValueError(f"Unsupported model provider: {provider}")
+        config = config or {}
+        return get_model(config.get('model', DEFAULT_MODEL), validate='model' in config, **config.get('parameters', {}))
+
+    def __init__(self,model=DEFAULT_MODEL,temperature=0,keep_alive=None,semaphore=None,cache:Optional[LLMCache]=None,**params):
+        """
+        keep_alive : How long Ollama keeps the weights loaded after a request (e.g. "30m", -1 for forever)
+        semaphore : Shared ConcurrencyLimit on in-flight generations for this model, None for unlimited
+        cache : Response cache, only consulted when the settings are deterministic (temperature 0)
+        """
+        self.model_name = model
+        self.params = {"temperature": temperature, **params}
+        self.model = OllamaLLM(model=model,temperature=temperature,keep_alive=keep_alive,**params)
+        self.semaphore = semaphore
+        self.cache = cache if temperature == 0 else None
+
+    @contextmanager
+    def _slot(self):
+        if self.semaphore is None:
+            yield
+            return
+        with self.semaphore:
+            yield
+
+    @asynccontextmanager
+    async def _aslot(self):
+        if self.semaphore is None:
+            yield
+            return
+        await self.semaphore.aacquire()
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+    def _cache_key(self,input:str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.key(f"ollama:{self.model_name}", self.params, input)
+
     def _run(self,input:str) -> str:
-        return self.model.invoke(input)        
-    
\ No newline at end of file
+        key = self._cache_key(input)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        with self._slot():
+            response = self.model.invoke(input)
+        if key is not None:
+            self.cache.set(key, response)
+        return response
+
+    def _stream(self,input:str) -> Iterator[str]:
+        key = self._cache_key(input)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        chunks = []
+        with self._slot():
+            for chunk in self.model.stream(input):
+                chunks.append(chunk)
+                yield chunk
+        # Only completed generations are cached, not ones the consumer abandoned
+        if key is not None:
+            self.cache.set(key, "".join(chunks))
+
+    async def _arun(self,input:str) -> str:
+        # Cache lookups can hit SQLite, so they run in a worker thread rather than on the event loop
+        key = self._cache_key(input)
+        if key is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                return cached
+        async with self._aslot():
+            response = await self.model.ainvoke(input)
+        if key is not None:
+            await asyncio.to_thread(self.cache.set, key, response)
+        return response
+
+    async def _astream(self,input:str) -> AsyncIterator[str]:
+        key = self._cache_key(input)
+        if key is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                yield cached
+                return
+        chunks = []
+        async with self._aslot():
+            async for chunk in self.model.astream(input):
+                chunks.append(chunk)
+                yield chunk
+        if key is not None:
+            await asyncio.to_thread(self.cache.set, key, "".join(chunks))
+
+
+_catalog: Optional[Dict[str, float]] = None
+_catalog_fetched_at = 0.0
+_catalog_lock = threading.Lock()
+
+
+def get_model_catalog() -> Dict[str, float]:
+    """Locally available Ollama models and their size in MB, refreshed every OLLAMA_CATALOG_TTL seconds"""
+    global _catalog, _catalog_fetched_at
+    ttl = float(os.getenv('OLLAMA_CATALOG_TTL', 60))
+    with _catalog_lock:
+        if _catalog is None or time.monotonic() - _catalog_fetched_at >= ttl:
+            response: ListResponse = ollama_list()
+            _catalog = {model.model: model.size.real/1024/1024 for model in response.models}
+            _catalog_fetched_at = time.monotonic()
+        return dict(_catalog)
+
+
+def check_model_name(name: str) -> None:
+    """Raise ValueError if name is not in the local Ollama catalog; an unreachable catalog is only logged"""
+    try:
+        catalog = get_model_catalog()
+    except Exception as e:
+        logging.warning(f"Could not list Ollama models: {str(e)}")
+        return
+    # Ollama lists untagged models under their :latest tag
+    if name not in catalog and f"{name}:latest" not in catalog:
+        raise ValueError(f"Model {name} is not available in Ollama")
+
+
+def check_model_config(name: Optional[str], parameters: Optional[dict]) -> None:
+    """Validate a user's model name and parameters before they are stored, raising ValueError"""
+    if parameters is not None and not isinstance(parameters, dict):
+        raise ValueError("Model parameters must be an object")
+    unknown = sorted(set(parameters or {}) - MODEL_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown model parameters: {', '.join(unknown)}. "
+                         f"Accepted parameters: {', '.join(sorted(MODEL_PARAMETERS))}")
+    if name is not None:
+        check_model_name(name)
+
+
+_models: Dict[str, OllamaModel] = {}
+_model_semaphores: Dict[str, ConcurrencyLimit] = {}
+_models_lock = threading.Lock()
+
+
+def get_model(name: str = DEFAULT_MODEL, validate: bool = True, **params) -> OllamaModel:
+    """Process-wide OllamaModel for a model name and parameters, reusing its HTTP client across requests
+    validate : Check the name against the local Ollama catalog before registering it
+    """
+    check_model_config(None, params)
+    # The context window is only pinned when configured, otherwise the server's own default applies
+    if os.getenv('OLLAMA_NUM_CTX') and "num_ctx" not in params:
+        params = {"num_ctx": int(os.getenv('OLLAMA_NUM_CTX')), **params}
+    key = json.dumps([name, params], sort_keys=True, default=str)
+    with _models_lock:
+        if key in _models:
+            return _models[key]
+
+    if validate:
+        check_model_name(name)
+
+    with _models_lock:
+        if key not in _models:
+            # Every parameter variant of a model shares one concurrency limit since they share the loaded weights
+            if name not in _model_semaphores:
+                _model_semaphores[name] = ConcurrencyLimit(int(os.getenv('OLLAMA_MAX_CONCURRENCY', 2)))
+            keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+            _models[key] = OllamaModel(
+                model=name,
+                keep_alive=int(keep_alive) if keep_alive.lstrip('-').isdigit() else keep_alive,
+                semaphore=_model_semaphores[name],
+                cache=get_llm_cache(),
+                **params
+            )
+            logging.info(f"Registered Ollama model {name} with parameters {params}")
+        return _models[key]
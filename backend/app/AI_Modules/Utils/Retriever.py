@@ -3,6 +3,13 @@ from typing import List, Dict, Any, Optional, Union
 import os
 import numpy as np
 from langchain_community.vectorstores import FAISS
+import faiss
+import pickle
+import json
+import shutil
+import threading
+import time
+from array import array
 from langchain_core.embeddings import Embeddings
 from langchain_core.documents import Document
 import networkx as nx
@@ -12,6 +19,8 @@ from collections import defaultdict
 from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline, AutoModel
 import logging
 from datetime import datetime
+from .EntityIndex import EntityIndex
+from .GraphStore import GraphStore, Postings, TextArray
 
 
 if not os.path.exists('logs'):
@@ -29,6 +38,38 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
+def namespace_path(directory: str, namespace: str) -> str:
+    """Per chat/session sub-directory, safe to use as a single path component"""
+    return os.path.join(directory, re.sub(r'[^\w.-]', '_', namespace))
+
+
+_pruned_at: Dict[str, float] = {}
+_prune_lock = threading.Lock()
+
+
+def prune_namespaces(directory: str, max_age: float, interval: float = 3600) -> int:
+    """Delete namespace sub-directories untouched for max_age seconds, at most once per interval per directory.
+    Returns how many were removed."""
+    now = time.time()
+    with _prune_lock:
+        if now - _pruned_at.get(directory, 0.0) < interval:
+            return 0
+        _pruned_at[directory] = now
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for entry in os.scandir(directory):
+        try:
+            if entry.is_dir() and now - entry.stat().st_mtime >= max_age:
+                shutil.rmtree(entry.path)
+                removed += 1
+        except OSError as e:
+            logging.warning(f"Could not prune {entry.path}: {str(e)}")
+    if removed:
+        logging.info(f"Pruned {removed} namespaces older than {max_age}s from {directory}")
+    return removed
+
+
 class Retriever(ABC):
   
     @abstractmethod
@@ -53,16 +94,44 @@ class FaissRetriever(Retriever):
     def __init__(self, 
                  embedding_model: Embeddings,
                  index_name: str = "faiss_index",
-                 persist_directory: Optional[str] = None):
+                 persist_directory: Optional[str] = None,
+                 namespace: Optional[str] = None):
+        """
+        namespace : Per chat/session sub-directory of persist_directory so concurrent users never share an index
+        """
         self.embedding_model = embedding_model
         self.index_name = index_name
+        self.namespace = namespace
+        if persist_directory and namespace:
+            persist_directory = namespace_path(persist_directory, namespace)
         self.persist_directory = persist_directory
         self.vector_store = None
+        self.segments: List[FAISS] = []
         self.reranker = None
+        self._docstore_positions = None
+    
+    def _segment_names(self, directory: str) -> List[str]:
+        pattern = re.compile(rf"^{re.escape(self.index_name)}\.(\d+)\.faiss$")
+        names = []
+        if os.path.isdir(directory):
+            for file_name in os.listdir(directory):
+                match = pattern.match(file_name)
+                if match:
+                    names.append((int(match.group(1)), file_name[:-len(".faiss")]))
+        return [name for _, name in sorted(names)]
+    
+    def _persist_segment(self, segment: FAISS) -> None:
+        """Append the newly ingested documents as their own segment instead of rewriting the whole index"""
+        os.makedirs(self.persist_directory, exist_ok=True)
+        existing = self._segment_names(self.persist_directory)
+        sequence = int(existing[-1].rsplit(".", 1)[1]) + 1 if existing else 0
+        segment.save_local(self.persist_directory, index_name=f"{self.index_name}.{sequence:06d}")
     
     def ingest(self, 
                documents: List[Union[str, Document]], 
-               metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+               metadatas: Optional[List[Dict[str, Any]]] = None,
+               embeddings: Optional[List[List[float]]] = None) -> None:
+        """embeddings : Precomputed document vectors, skipping the embedding model entirely"""
         if documents and isinstance(documents[0], str):
             if metadatas:
                 docs = [Document(page_content=doc, metadata=meta) 
@@ -73,81 +142,186 @@ class FaissRetriever(Retriever):
             docs = documents
             
         
-        if self.vector_store is None:
-            self.vector_store = FAISS.from_documents(
-                documents=docs,
+        if embeddings is not None:
+            segment = FAISS.from_embeddings(
+                text_embeddings=[(doc.page_content, list(map(float, vector))) for doc, vector in zip(docs, embeddings)],
                 embedding=self.embedding_model,
+                metadatas=[doc.metadata for doc in docs]
             )
         else:
-            self.vector_store.add_documents(documents=docs)
-        
+            segment = FAISS.from_documents(
+                documents=docs,
+                embedding=self.embedding_model,
+            )
         
         if self.persist_directory:
-            os.makedirs(self.persist_directory, exist_ok=True)
-            self.vector_store.save_local(self.persist_directory)
+            self._persist_segment(segment)
+        
+        if self.vector_store is None:
+            self.vector_store = segment
+        else:
+            self.vector_store.merge_from(segment)
+        self._docstore_positions = None
+    
+    def _stores(self) -> List[FAISS]:
+        return self.segments + ([self.vector_store] if self.vector_store is not None else [])
     
     def query(self, 
               query: str, 
               k: int = 5, 
               filter: Optional[Dict[str, Any]] = None) -> List[Document]:
-        if self.vector_store is None:
+        stores = self._stores()
+        if not stores:
             raise ValueError("Vector store has not been initialized. Please ingest documents first.")
         
-        results = self.vector_store.similarity_search(
-            query=query,
-            k=k,
-            filter=filter
-        )
+        if len(stores) == 1:
+            return stores[0].similarity_search(
+                query=query,
+                k=k,
+                filter=filter
+            )
         
-        return results
+        query_embedding = self.embedding_model.embed_query(query)
+        scored = []
+        for store in stores:
+            scored.extend(store.similarity_search_with_score_by_vector(
+                embedding=query_embedding,
+                k=k,
+                filter=filter
+            ))
+        scored.sort(key=lambda item: item[1])
+        
+        return [doc for doc, _ in scored[:k]]
     
     def rerank(self, 
                query: str, 
                documents: List[Document], 
                top_k: int = 3) -> List[Document]:
         if self.reranker is None:
+            if not documents:
+                return []
             
+            query_embedding = np.asarray(self.embedding_model.embed_query(query), dtype=np.float32)
+            doc_matrix = self._document_vectors(documents)
             
+            query_norm = np.linalg.norm(query_embedding)
+            doc_norms = np.linalg.norm(doc_matrix, axis=1)
+            doc_norms[doc_norms == 0] = 1.0
+            scores = (doc_matrix @ query_embedding) / (doc_norms * (query_norm or 1.0))
             
-            query_embedding = self.embedding_model.embed_query(query)
-            
-            
-            document_scores = []
-            for doc in documents:
-                doc_embedding = self.embedding_model.embed_documents([doc.page_content])[0]
-                similarity = self._cosine_similarity(query_embedding, doc_embedding)
-                document_scores.append((doc, similarity))
-                
-            
-            document_scores.sort(key=lambda x: x[1], reverse=True)
-            
+            top_k = min(top_k, len(documents))
+            if top_k < len(documents):
+                top_indices = np.argpartition(-scores, top_k - 1)[:top_k]
+            else:
+                top_indices = np.arange(len(documents))
+            top_indices = top_indices[np.argsort(-scores[top_indices], kind="stable")]
             
-            return [doc for doc, _ in document_scores[:top_k]]
+            return [documents[i] for i in top_indices]
         else:
             
             return self.reranker.rerank(query, documents, top_k)
     
+    def _document_vectors(self, documents: List[Document]) -> np.ndarray:
+        """Reuse vectors already stored in the FAISS index and embed the remaining documents in one batch"""
+        vectors = [None] * len(documents)
+        stores = self._stores()
+        
+        if stores:
+            if self._docstore_positions is None:
+                self._docstore_positions = {
+                    doc_id: (store, position)
+                    for store in stores
+                    for position, doc_id in store.index_to_docstore_id.items()
+                }
+            for i, doc in enumerate(documents):
+                location = self._docstore_positions.get(getattr(doc, "id", None))
+                if location is None:
+                    continue
+                store, position = location
+                try:
+                    vectors[i] = store.index.reconstruct(int(position))
+                except RuntimeError:
+                    # Some index types (e.g. IVF without a direct map) cannot reconstruct vectors
+                    continue
+        
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embedded = self.embedding_model.embed_documents([documents[i].page_content for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        
+        return np.asarray(vectors, dtype=np.float32)
+    
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         vec1 = np.array(vec1)
         vec2 = np.array(vec2)
         return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
     
-    def load(self, path: Optional[str] = None) -> None:
+    def load(self, path: Optional[str] = None, mmap: bool = True) -> None:
+        """Open every persisted segment read-only, memory-mapping the FAISS indexes when mmap is set"""
         load_path = path or self.persist_directory
         if not load_path:
             raise ValueError("No path specified and no persist_directory set during initialization")
         
-        self.vector_store = FAISS.load_local(
-            folder_path=load_path,
-            embeddings=self.embedding_model,
-            index_name=self.persist_directory
-        )
+        segment_names = self._segment_names(load_path)
+        if not segment_names:
+            # A single-file store: saved under index_name, or under FAISS's default name by the old save_local(path)
+            index_name = self.index_name if os.path.exists(os.path.join(load_path, f"{self.index_name}.faiss")) else "index"
+            self.segments = [FAISS.load_local(
+                folder_path=load_path,
+                embeddings=self.embedding_model,
+                index_name=index_name,
+                allow_dangerous_deserialization=True
+            )]
+        else:
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+            self.segments = []
+            for name in segment_names:
+                index = faiss.read_index(os.path.join(load_path, f"{name}.faiss"), flags)
+                with open(os.path.join(load_path, f"{name}.pkl"), "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+                self.segments.append(FAISS(
+                    embedding_function=self.embedding_model,
+                    index=index,
+                    docstore=docstore,
+                    index_to_docstore_id=index_to_docstore_id
+                ))
+        
+        logging.info(f"Loaded {len(self.segments)} FAISS segments from {load_path}")
+        self._docstore_positions = None
     
     def set_reranker(self, reranker: Any) -> None:
         self.reranker = reranker
 
 
 
+class DocumentArray:
+    """Documents stored as two text arrays, contents and JSON metadata, read back one row at a time"""
+
+    def __init__(self, contents: Optional[TextArray] = None, metadatas: Optional[TextArray] = None):
+        self.contents = contents or TextArray()
+        self.metadatas = metadatas or TextArray()
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def __getitem__(self, index: int) -> Document:
+        return Document(page_content=self.contents[index], metadata=json.loads(self.metadatas[index]))
+
+    def append(self, doc: Document) -> None:
+        self.contents.append(doc.page_content)
+        self.metadatas.append(json.dumps(doc.metadata))
+
+    def save(self, directory: str, prefix: str = "documents") -> None:
+        self.contents.save(directory, f"{prefix}_content")
+        self.metadatas.save(directory, f"{prefix}_metadata")
+
+    @classmethod
+    def load(cls, directory: str, prefix: str = "documents", mmap: bool = True) -> "DocumentArray":
+        return cls(TextArray.load(directory, f"{prefix}_content", mmap=mmap),
+                   TextArray.load(directory, f"{prefix}_metadata", mmap=mmap))
+
+
 class GraphRetriever(Retriever):
     
     def __init__(
@@ -156,12 +330,14 @@ class GraphRetriever(Retriever):
         ner_model_name: str = "dslim/bert-base-NER", 
         min_entity_length: int = 2,
         similarity_threshold: float = 0.75,
-        window_size: int = 5
+        window_size: int = 5,
+        ner_batch_size: int = 16
     ):
-        self.G = nx.Graph()
+        self.graph = GraphStore()
         self.min_entity_length = min_entity_length
         self.similarity_threshold = similarity_threshold
         self.window_size = window_size
+        self.ner_batch_size = ner_batch_size
         self.embedding_model = embedding_model
         self.reranker = None
         
@@ -181,13 +357,27 @@ class GraphRetriever(Retriever):
             self.use_hf_ner = False
                 
         
-        self.node_sources = {}
-        
-        self.edge_weights = {}
-        
-        self.entity_embeddings = {}
-        
-        self.entity_chunks = defaultdict(list)
+        # Entity id -> ids into self.sources
+        self.sources: List[str] = []
+        self._source_ids: Dict[str, int] = {}
+        self.node_sources = Postings()
+        
+        self.entity_index = EntityIndex(embedding_model, threshold=similarity_threshold)
+        
+        # Documents are addressed by integer id; their canonical entities are computed once at ingest
+        self.documents = DocumentArray()
+        self._document_ids: Optional[Dict[str, int]] = {}
+        # Normalized document embeddings, row i belongs to document id i
+        self._document_matrix: Optional[np.ndarray] = None
+        # Canonical entity mentions as (document id, entity id) pairs, in document order
+        self._entity_names: List[str] = []
+        self._entity_ids: Dict[str, int] = {}
+        self._mention_docs = array('i')
+        self._mention_entities = array('i')
+        self._mentions = (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32))
+        
+        # Entity id -> document ids
+        self.entity_chunks = Postings()
     
     def _extract_entities_regex(self, text: str) -> List[str]:
         entities = re.findall(r'\b[A-Z][a-z]+(?: [A-Z][a-z]+)*\b', text)
@@ -196,16 +386,16 @@ class GraphRetriever(Retriever):
         return [e for e in entities if e not in stop_words and len(e) >= self.min_entity_length]
     
     def _extract_entities_hf(self, text: str) -> List[str]:
-        ner_results = self.ner_pipeline(text)
+        return self._extract_entities_hf_batch([text])[0]
+    
+    def _extract_entities_hf_batch(self, texts: List[str]) -> List[List[str]]:
+        ner_results = self.ner_pipeline(texts, batch_size=self.ner_batch_size)
         
         
-        entities = []
-        for entity in ner_results:
-            entity_text = entity["word"]
-            if len(entity_text) >= self.min_entity_length:
-                entities.append(entity_text)
-                
-        return entities
+        return [
+            [entity["word"] for entity in results if len(entity["word"]) >= self.min_entity_length]
+            for results in ner_results
+        ]
     
     def extract_entities(self, text: str) -> List[str]:
         if self.use_hf_ner:
@@ -213,6 +403,77 @@ class GraphRetriever(Retriever):
         else:
             return self._extract_entities_regex(text)
     
+    def extract_entities_batch(self, texts: List[str]) -> List[List[str]]:
+        if not texts:
+            return []
+        if self.use_hf_ner:
+            return self._extract_entities_hf_batch(texts)
+        else:
+            return [self._extract_entities_regex(text) for text in texts]
+    
+    def _document_vectors(self, documents: List[Document]) -> np.ndarray:
+        """Stored rows for ingested documents, embedding the rest in a single batch"""
+        doc_ids = [self._document_id_map().get(doc.page_content) for doc in documents]
+        unknown = [doc.page_content for doc, doc_id in zip(documents, doc_ids) if doc_id is None]
+        embedded = iter(self._embed_documents(unknown)) if unknown else iter(())
+        return np.stack([
+            self.document_matrix[doc_id] if doc_id is not None else next(embedded)
+            for doc_id in doc_ids
+        ])
+    
+    def get_document_entities(self, documents: List[Document]) -> List[List[str]]:
+        """Canonical entities of each document, read from the ingest-time cache when the document is known"""
+        doc_ids = [self._document_id_map().get(doc.page_content) for doc in documents]
+        unknown = [doc.page_content for doc, doc_id in zip(documents, doc_ids) if doc_id is None]
+        extracted = iter(self.entity_index.canonicalize(entities) for entities in self.extract_entities_batch(unknown))
+        return [
+            self.document_entities(doc_id) if doc_id is not None else next(extracted)
+            for doc_id in doc_ids
+        ]
+    
+    def document_entities(self, doc_id: int) -> List[str]:
+        """Canonical entities of an ingested document, in mention order"""
+        mention_docs, mention_entities = self._mention_arrays()
+        start, end = np.searchsorted(mention_docs, [doc_id, doc_id + 1])
+        return [self._entity_names[entity_id] for entity_id in mention_entities[start:end]]
+    
+    def _document_id_map(self) -> Dict[str, int]:
+        # A loaded store builds its content lookup on first use, so opening it reads no document text
+        if self._document_ids is None:
+            self._document_ids = {}
+            for doc_id in range(len(self.documents)):
+                self._document_ids.setdefault(self.documents.contents[doc_id], doc_id)
+        return self._document_ids
+    
+    @property
+    def document_matrix(self) -> np.ndarray:
+        if self._document_matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._document_matrix[:len(self.documents)]
+    
+    def _append_document_vectors(self, vectors: np.ndarray) -> None:
+        start = len(self.documents) - len(vectors)
+        if self._document_matrix is None:
+            self._document_matrix = np.zeros((max(1024, len(vectors)), vectors.shape[1]), dtype=np.float32)
+        elif len(self.documents) > self._document_matrix.shape[0]:
+            grown = np.zeros((max(self._document_matrix.shape[0] * 2, len(self.documents)), vectors.shape[1]), dtype=np.float32)
+            grown[:start] = self._document_matrix[:start]
+            self._document_matrix = grown
+        self._document_matrix[start:len(self.documents)] = vectors
+    
+    def _embed_documents(self, texts: List[str]) -> np.ndarray:
+        return EntityIndex._normalize(np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32))
+    
+    def _mention_arrays(self):
+        if len(self._mention_docs):
+            self._mentions = (
+                np.concatenate((self._mentions[0], np.frombuffer(self._mention_docs, dtype=np.int32))),
+                np.concatenate((self._mentions[1], np.frombuffer(self._mention_entities, dtype=np.int32)))
+            )
+            self._mention_docs = array('i')
+            self._mention_entities = array('i')
+        return self._mentions
+    
     def compute_embedding(self, text: str) -> np.ndarray:
         embedding = self.embedding_model.embed_query(text)
         
@@ -225,40 +486,33 @@ class GraphRetriever(Retriever):
         return embedding
     
     def are_similar_entities(self, entity1: str, entity2: str) -> bool: 
-        if entity1 not in self.entity_embeddings:
-            self.entity_embeddings[entity1] = self.compute_embedding(entity1)
-        if entity2 not in self.entity_embeddings:
-            self.entity_embeddings[entity2] = self.compute_embedding(entity2)
-            
-        similarity = np.dot(self.entity_embeddings[entity1], self.entity_embeddings[entity2])
+        embeddings = self.entity_index.embed([entity1, entity2])
+        similarity = np.dot(embeddings[0], embeddings[1])
         
         return similarity > self.similarity_threshold
     
     def get_canonical_entity(self, entity: str) -> str:
-        
-        for existing_entity in self.G.nodes():
-            if self.are_similar_entities(entity, existing_entity):
-                return existing_entity
-                
-        
-        return entity
+        return self.entity_index.canonicalize([entity])[0]
     
     def extract_relationships(self, text: str) -> List[tuple]:
         entities = self.extract_entities(text)
-        relationships = []
-        
         
         if len(entities) < 2:
-            return relationships
+            return []
         
+        # One batched embedding call and one matrix product for every entity in the document
+        return self._relationships(self.entity_index.canonicalize(entities))
+    
+    def _relationships(self, canonical: List[str]) -> List[tuple]:
+        relationships = []
         
-        for i in range(len(entities)):
+        for i in range(len(canonical)):
             
-            canonical_i = self.get_canonical_entity(entities[i])
+            canonical_i = canonical[i]
             
-            for j in range(i + 1, min(i + self.window_size, len(entities))):
+            for j in range(i + 1, min(i + self.window_size, len(canonical))):
                 
-                canonical_j = self.get_canonical_entity(entities[j])
+                canonical_j = canonical[j]
                 
                 
                 if canonical_i == canonical_j:
@@ -270,6 +524,11 @@ class GraphRetriever(Retriever):
                 
         return relationships
     
+    def _add_entity(self, entity: str) -> int:
+        if entity not in self.graph:
+            self.entity_index.add(entity)
+        return self.graph.add_node(entity)
+    
     def ingest(self, 
               documents: List[Union[str, Document]], 
               metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
@@ -284,51 +543,58 @@ class GraphRetriever(Retriever):
             docs = documents
             
         
-        for i, doc in enumerate(docs):
+        if not docs:
+            return
+        
+        # NER runs once over the whole batch and all new entity names are embedded in a single call
+        texts = [doc.page_content for doc in docs]
+        entities_per_doc = self.extract_entities_batch(texts)
+        self.entity_index.embed([entity for entities in entities_per_doc for entity in entities])
+        document_vectors = self._embed_documents(texts)
+        
+        for i, (doc, entities) in enumerate(zip(docs, entities_per_doc)):
             
-            relationships = self.extract_relationships(doc.page_content)
+            canonical = self.entity_index.canonicalize(entities)
+            relationships = self._relationships(canonical) if len(canonical) >= 2 else []
             
+            doc_id = len(self.documents)
+            self.documents.append(doc)
+            self._document_id_map().setdefault(doc.page_content, doc_id)
+            for entity in canonical:
+                entity_id = self._entity_ids.setdefault(entity, len(self._entity_ids))
+                if entity_id == len(self._entity_names):
+                    self._entity_names.append(entity)
+                self._mention_docs.append(doc_id)
+                self._mention_entities.append(entity_id)
             
             source_info = doc.metadata.get("source", "unknown")
             
             
+            source_id = self._source_ids.setdefault(source_info, len(self._source_ids))
+            if source_id == len(self.sources):
+                self.sources.append(source_info)
+            
+            
             for entity1, entity2, weight in relationships:
                 
-                if entity1 not in self.G:
-                    self.G.add_node(entity1)
-                    self.node_sources[entity1] = set()
-                if entity2 not in self.G:
-                    self.G.add_node(entity2)
-                    self.node_sources[entity2] = set()
-                    
+                u = self._add_entity(entity1)
+                v = self._add_entity(entity2)
                 
-                self.node_sources[entity1].add(source_info)
-                self.node_sources[entity2].add(source_info)
                 
+                self.node_sources.add(u, source_id)
+                self.node_sources.add(v, source_id)
+                self.entity_chunks.add(u, doc_id)
+                self.entity_chunks.add(v, doc_id)
                 
-                self.entity_chunks[entity1].append(doc)
-                self.entity_chunks[entity2].append(doc)
                 
-                
-                if self.G.has_edge(entity1, entity2):
-                    
-                    edge_key = tuple(sorted([entity1, entity2]))
-                    self.edge_weights[edge_key] = self.edge_weights.get(edge_key, 1.0) + weight
-                else:
-                    
-                    self.G.add_edge(entity1, entity2)
-                    edge_key = tuple(sorted([entity1, entity2]))
-                    self.edge_weights[edge_key] = weight
+                self.graph.add_edge(u, v, weight)
             
             if (i + 1) % 10 == 0:
                 logging.info(f"Processed {i+1}/{len(docs)} documents")
-                
         
-        for edge in self.G.edges():
-            sorted_edge = tuple(sorted(edge))
-            nx.set_edge_attributes(self.G, {edge: {"weight": self.edge_weights.get(sorted_edge, 1.0)}})
+        self._append_document_vectors(document_vectors)
             
-        logging.info(f"Knowledge graph built with {len(self.G.nodes())} entities and {len(self.G.edges())} relationships")
+        logging.info(f"Knowledge graph built with {len(self.graph)} entities and {self.graph.number_of_edges()} relationships")
     
     def query(self, 
              query: str, 
@@ -343,16 +609,15 @@ class GraphRetriever(Retriever):
                           if len(word) > 2]
             
             matched_nodes = []
-            for node in self.G.nodes:
+            for node in self.graph.names:
                 node_lower = node.lower()
                 if any(term in node_lower for term in query_terms):
                     matched_nodes.append(node)
         else:
             
             matched_nodes = []
-            for entity in query_entities:
-                canonical = self.get_canonical_entity(entity)
-                if canonical in self.G:
+            for canonical in self.entity_index.canonicalize(query_entities):
+                if canonical in self.graph and canonical not in matched_nodes:
                     matched_nodes.append(canonical)
         
         if not matched_nodes:
@@ -362,49 +627,41 @@ class GraphRetriever(Retriever):
         query_embedding = self.compute_embedding(query)
         
         
-        node_scores = {}
-        for node in matched_nodes:
-            if node not in self.entity_embeddings:
-                self.entity_embeddings[node] = self.compute_embedding(node)
-            similarity = np.dot(query_embedding, self.entity_embeddings[node])
-            node_scores[node] = similarity
+        node_similarities = self.entity_index.embed(matched_nodes) @ query_embedding
+        node_scores = dict(zip(matched_nodes, node_similarities))
             
         
         matched_nodes = sorted(matched_nodes, key=lambda n: node_scores.get(n, 0), reverse=True)
         
         
-        related_nodes = set()
-        for node in matched_nodes[:min(k, len(matched_nodes))]:
-            related_nodes.update(self.G.neighbors(node))
+        matched_ids = [self.graph.ids[node] for node in matched_nodes]
+        related_ids = self.graph.neighbors(matched_ids[:min(k, len(matched_ids))])
+        related_nodes = {self.graph.names[node_id] for node_id in related_ids}
             
         
-        context_docs = set()
-        for node in list(matched_nodes) + list(related_nodes):
-            for doc in self.entity_chunks.get(node, []):
-                context_docs.add(doc)
+        context_doc_ids = self.entity_chunks.union(np.concatenate((matched_ids, related_ids)))
                 
         
-        doc_scores = {}
-        entities_of_interest = set(matched_nodes).union(related_nodes)
-        for doc in context_docs:
-            score = 0
-            doc_entities = self.extract_entities(doc.page_content)
-            doc_entities = [self.get_canonical_entity(e) for e in doc_entities]
-            
-            for entity in doc_entities:
-                if entity in entities_of_interest:
-                    score += node_scores.get(entity, 0.5)
-                    
-            
-            doc_embedding = self.compute_embedding(doc.page_content)
-            query_similarity = np.dot(query_embedding, doc_embedding)
-            
-            
-            doc_scores[doc] = score + query_similarity
-            
+        if len(context_doc_ids) == 0:
+            return []
+        
         
-        result_docs = sorted(list(context_docs), key=lambda d: doc_scores.get(d, 0), reverse=True)
-        return result_docs[:k]
+        # Entity overlap for every document in one bincount over the mention pairs
+        entity_weights = np.zeros(len(self._entity_ids), dtype=np.float32)
+        for entity in set(matched_nodes).union(related_nodes):
+            entity_id = self._entity_ids.get(entity)
+            if entity_id is not None:
+                entity_weights[entity_id] = node_scores.get(entity, 0.5)
+        mention_docs, mention_entities = self._mention_arrays()
+        entity_scores = np.bincount(mention_docs, weights=entity_weights[mention_entities], minlength=len(self.documents))
+        
+        
+        doc_ids = context_doc_ids.astype(np.int64)
+        scores = entity_scores[doc_ids] + self.document_matrix[doc_ids] @ query_embedding.astype(np.float32)
+        
+        
+        result_ids = doc_ids[np.argsort(-scores, kind="stable")[:k]]
+        return [self.documents[doc_id] for doc_id in result_ids]
     
     def rerank(self, 
               query: str, 
@@ -413,37 +670,26 @@ class GraphRetriever(Retriever):
         
         if self.reranker is None:
             
-            query_entities = self.extract_entities(query)
+            canonical_queries = self.entity_index.canonicalize(self.extract_entities(query))
             query_embedding = self.compute_embedding(query)
             
             
-            document_scores = []
-            for doc in documents:
-                
-                score = 0
-                doc_entities = self.extract_entities(doc.page_content)
-                
-                
-                for query_entity in query_entities:
-                    canonical_query = self.get_canonical_entity(query_entity)
-                    for doc_entity in doc_entities:
-                        canonical_doc = self.get_canonical_entity(doc_entity)
-                        if canonical_query == canonical_doc:
-                            score += 1
-                            
-                
-                doc_embedding = self.compute_embedding(doc.page_content)
-                similarity = np.dot(query_embedding, doc_embedding)
-                
-                
-                final_score = score + similarity
-                document_scores.append((doc, final_score))
-                
+            if not documents:
+                return []
+            
+            query_counts = defaultdict(int)
+            for canonical_query in canonical_queries:
+                query_counts[canonical_query] += 1
+            overlap = np.array([
+                sum(query_counts.get(canonical_doc, 0) for canonical_doc in canonical_docs)
+                for canonical_docs in self.get_document_entities(documents)
+            ], dtype=np.float32)
             
-            document_scores.sort(key=lambda x: x[1], reverse=True)
             
+            scores = overlap + self._document_vectors(documents) @ query_embedding.astype(np.float32)
             
-            return [doc for doc, _ in document_scores[:top_k]]
+            
+            return [documents[i] for i in np.argsort(-scores, kind="stable")[:top_k]]
         else:
             
             return self.reranker.rerank(query, documents, top_k)
@@ -451,43 +697,98 @@ class GraphRetriever(Retriever):
     def set_reranker(self, reranker: Any) -> None:
        
         self.reranker = reranker
+    
+    def save(self, path: str) -> None:
+        """Write the graph, embeddings, postings and documents as .npy arrays plus a small JSON manifest,
+        replacing path atomically"""
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        
+        self.graph.save(tmp_path, "graph")
+        self.entity_index.save(tmp_path, "entities")
+        self.node_sources.save(tmp_path, "node_sources")
+        self.entity_chunks.save(tmp_path, "entity_chunks")
+        mention_docs, mention_entities = self._mention_arrays()
+        np.save(os.path.join(tmp_path, "mention_docs.npy"), mention_docs)
+        np.save(os.path.join(tmp_path, "mention_entities.npy"), mention_entities)
+        np.save(os.path.join(tmp_path, "document_matrix.npy"), self.document_matrix)
+        self.documents.save(tmp_path, "documents")
+        with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "sources": self.sources,
+                "entities": self._entity_names
+            }, f)
+        
+        old_path = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        logging.info(f"Saved knowledge graph with {len(self.graph)} entities and {len(self.documents)} documents to {path}")
+    
+    def load(self, path: str, mmap: bool = True) -> None:
+        """Open a saved graph; with mmap the arrays stay on disk and are shared read-only between processes"""
+        mmap_mode = "r" if mmap else None
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        
+        self.graph = GraphStore.load(path, "graph", mmap=mmap)
+        self.entity_index.load(path, "entities", mmap=mmap)
+        self.node_sources = Postings.load(path, "node_sources", mmap=mmap)
+        self.entity_chunks = Postings.load(path, "entity_chunks", mmap=mmap)
+        
+        self.documents = DocumentArray.load(path, "documents", mmap=mmap)
+        self._document_ids = None
+        self._document_matrix = np.load(os.path.join(path, "document_matrix.npy"), mmap_mode=mmap_mode) \
+            if self.documents else None
+        
+        self.sources = manifest["sources"]
+        self._source_ids = {source: source_id for source_id, source in enumerate(self.sources)}
+        self._entity_names = manifest["entities"]
+        self._entity_ids = {entity: entity_id for entity_id, entity in enumerate(self._entity_names)}
+        self._mention_docs = array('i')
+        self._mention_entities = array('i')
+        self._mentions = (np.load(os.path.join(path, "mention_docs.npy"), mmap_mode=mmap_mode),
+                          np.load(os.path.join(path, "mention_entities.npy"), mmap_mode=mmap_mode))
+        
+        logging.info(f"Loaded knowledge graph with {len(self.graph)} entities and {len(self.documents)} documents from {path}")
             
     def visualize_graph(self, query: Optional[str] = None, 
                        max_nodes: int = 30, save_path: Optional[str] = None) -> None:
        
-        if len(self.G) == 0:
+        if len(self.graph) == 0:
             logging.info("Graph is empty - nothing to visualize")
             return
             
         
-        if len(self.G) > max_nodes:
+        if len(self.graph) > max_nodes:
+            high_degree_nodes = np.argsort(-self.graph.degree(), kind="stable")
             if query:
                 
                 query_entities = self.extract_entities(query)
-                matched_nodes = []
-                for entity in query_entities:
-                    canonical = self.get_canonical_entity(entity)
-                    if canonical in self.G:
-                        matched_nodes.append(canonical)
+                matched_ids = [self.graph.ids[c] for c in self.entity_index.canonicalize(query_entities) if c in self.graph]
                         
                 
-                nodes_to_show = set(matched_nodes)
-                for node in matched_nodes:
-                    nodes_to_show.update(self.G.neighbors(node))
+                nodes_to_show = set(matched_ids)
+                nodes_to_show.update(self.graph.neighbors(matched_ids).tolist())
                     
                 
                 if len(nodes_to_show) < max_nodes:
-                    degree_dict = dict(self.G.degree())
-                    high_degree_nodes = sorted(degree_dict, key=degree_dict.get, reverse=True)
-                    nodes_to_show.update(high_degree_nodes[:max_nodes-len(nodes_to_show)])
+                    nodes_to_show.update(high_degree_nodes[:max_nodes-len(nodes_to_show)].tolist())
             else:
                 
-                degree_dict = dict(self.G.degree())
-                nodes_to_show = sorted(degree_dict, key=degree_dict.get, reverse=True)[:max_nodes]
+                nodes_to_show = high_degree_nodes[:max_nodes].tolist()
                 
-            viz_graph = self.G.subgraph(list(nodes_to_show)[:max_nodes])
+            node_ids = list(nodes_to_show)[:max_nodes]
         else:
-            viz_graph = self.G
+            node_ids = list(range(len(self.graph)))
+        
+        # networkx is only used to lay out and draw the small displayed subgraph
+        viz_graph = nx.Graph()
+        viz_graph.add_nodes_from(self.graph.names[node_id] for node_id in node_ids)
+        for u, v, weight in zip(*self.graph.edges(node_ids)):
+            viz_graph.add_edge(self.graph.names[u], self.graph.names[v], weight=float(weight))
             
         
         pos = nx.spring_layout(viz_graph, seed=42)
@@ -501,11 +802,7 @@ class GraphRetriever(Retriever):
         
         if query:
             query_entities = self.extract_entities(query)
-            matched_nodes = []
-            for entity in query_entities:
-                canonical = self.get_canonical_entity(entity)
-                if canonical in self.G:
-                    matched_nodes.append(canonical)
+            matched_nodes = [c for c in self.entity_index.canonicalize(query_entities) if c in viz_graph]
                     
             for node in viz_graph.nodes():
                 if node in matched_nodes:
@@ -527,8 +824,7 @@ class GraphRetriever(Retriever):
         
         
         for u, v, attrs in viz_graph.edges(data=True):
-            edge_key = tuple(sorted([u, v]))
-            width = 1 + (self.edge_weights.get(edge_key, 1.0) / 2)
+            width = 1 + (attrs.get("weight", 1.0) / 2)
             nx.draw_networkx_edges(viz_graph, pos, edgelist=[(u, v)], 
                                  width=width, alpha=0.5)
         
@@ -0,0 +1,49 @@
+from typing import List, Optional
+import re
+import threading
+import logging
+
+
+# Roughly one token per short word piece or punctuation mark, used when no BPE file is available
+_APPROX_TOKEN = re.compile(r"\s*(?:\w{1,4}|[^\w\s])|\s+$")
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def get_encoding(name: str = "cl100k_base"):
+    """Return a cached tiktoken encoding, or None when it cannot be loaded (e.g. offline hosts)"""
+    with _encodings_lock:
+        if name not in _encodings:
+            try:
+                import tiktoken
+                _encodings[name] = tiktoken.get_encoding(name)
+            except Exception as e:
+                logging.warning(f"Could not load tiktoken encoding {name}, using approximate token counts: {str(e)}")
+                _encodings[name] = None
+        return _encodings[name]
+
+
+def token_offsets(text: str, encoding_name: str = "cl100k_base") -> List[int]:
+    """Character offset at which each token of text starts"""
+    encoding = get_encoding(encoding_name)
+    if encoding is not None:
+        _, offsets = encoding.decode_with_offsets(encoding.encode(text, disallowed_special=()))
+        return offsets
+    return [match.start() for match in _APPROX_TOKEN.finditer(text)]
+
+
+def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
+    encoding = get_encoding(encoding_name)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(1 for _ in _APPROX_TOKEN.finditer(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, encoding_name: str = "cl100k_base") -> str:
+    if max_tokens <= 0:
+        return ""
+    offsets = token_offsets(text, encoding_name)
+    if len(offsets) <= max_tokens:
+        return text
+    return text[:offsets[max_tokens]]
@@ -1,11 +1,22 @@
 import os
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Local caches and the web corpus live here instead of wherever the process was started from
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(BASE_DIR, 'data'))
+
 class Config:
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/ai_chat')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'super-secret-key')
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
     CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+    DEEP_SEARCH_WORKERS = int(os.getenv('DEEP_SEARCH_WORKERS', 2))
+    DATA_DIR = DATA_DIR
+    PAGE_CACHE_PATH = os.getenv('PAGE_CACHE_PATH', os.path.join(DATA_DIR, 'page_cache.sqlite'))
+    EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', os.path.join(DATA_DIR, 'embedding_cache.sqlite'))
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join(DATA_DIR, 'llm_cache.sqlite'))
+    CORPUS_PATH = os.getenv('CORPUS_PATH', os.path.join(DATA_DIR, 'web_corpus.sqlite'))
+    SEARCH_CACHE_DIR = os.getenv('SEARCH_CACHE_DIR', os.path.join(DATA_DIR, 'search_cache'))
     JWT_TOKEN_LOCATION = ['cookies']
     JWT_COOKIE_SECURE = False
     JWT_COOKIE_SAMESITE = 'Lax'
@@ -0,0 +1,72 @@
+from datetime import datetime
+from bson import ObjectId
+from app.extensions import db
+
+class Job:
+    @classmethod
+    def create(cls, user_id, chat_id, query, kind='deep_search'):
+        job_data = {
+            'user_id': user_id,
+            'chat_id': chat_id,
+            'query': query,
+            'kind': kind,
+            'status': 'queued',
+            'progress': [],
+            'partial': {},
+            'message_id': None,
+            'error': None,
+            'owner': None,
+            'heartbeat_at': datetime.now(),
+            'created_at': datetime.now(),
+            'updated_at': datetime.now()
+        }
+        result = db.db.jobs.insert_one(job_data)
+        return cls.get_by_id(result.inserted_id)
+
+    @classmethod
+    def get_by_id(cls, job_id):
+        return db.db.jobs.find_one({'_id': ObjectId(job_id)})
+
+    @classmethod
+    def set_status(cls, job_id, status, **fields):
+        return db.db.jobs.update_one(
+            {'_id': ObjectId(job_id)},
+            {'$set': {'status': status, 'updated_at': datetime.now(), **fields}}
+        )
+
+    @classmethod
+    def claim(cls, job_id, owner):
+        return db.db.jobs.update_one(
+            {'_id': ObjectId(job_id)},
+            {'$set': {'owner': owner, 'heartbeat_at': datetime.now()}}
+        )
+
+    @classmethod
+    def heartbeat(cls, owner):
+        return db.db.jobs.update_many(
+            {'owner': owner, 'status': {'$in': ['queued', 'running']}},
+            {'$set': {'heartbeat_at': datetime.now()}}
+        ).modified_count
+
+    @classmethod
+    def fail_stale(cls, before, error):
+        return db.db.jobs.update_many(
+            {
+                'status': {'$in': ['queued', 'running']},
+                '$or': [{'heartbeat_at': {'$lt': before}}, {'heartbeat_at': {'$exists': False}}]
+            },
+            {'$set': {'status': 'failed', 'error': error, 'updated_at': datetime.now()}}
+        ).modified_count
+
+    @classmethod
+    def add_progress(cls, job_id, node, update):
+        return db.db.jobs.update_one(
+            {'_id': ObjectId(job_id)},
+            {
+                '$push': {
+                    'progress': {'node': node, 'at': datetime.now()},
+                    f'partial.{node}': update
+                },
+                '$set': {'updated_at': datetime.now()}
+            }
+        )
@@ -1,6 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.ai_service import handle_chat, handle_deep_search
+from app.services.ai_service import (
+    handle_chat,
+    handle_deep_search,
+    handle_deep_search_stream,
+    handle_submit_deep_search_job,
+    handle_get_deep_search_job,
+    handle_get_deep_search_job_result
+)
 
 ai_bp = Blueprint('ai', __name__)
 
@@ -16,4 +23,30 @@ def chat():
 def deep_search():
     user_id = get_jwt_identity()
     data = request.json
-    return handle_deep_search(user_id, data)
\ No newline at end of file
+    return handle_deep_search(user_id, data)
+
+@ai_bp.route('/deep-search/stream', methods=['POST'])
+@jwt_required()
+def deep_search_stream():
+    user_id = get_jwt_identity()
+    data = request.json
+    return handle_deep_search_stream(user_id, data)
+
+@ai_bp.route('/deep-search/jobs', methods=['POST'])
+@jwt_required()
+def submit_deep_search_job():
+    user_id = get_jwt_identity()
+    data = request.json
+    return handle_submit_deep_search_job(user_id, data)
+
+@ai_bp.route('/deep-search/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_deep_search_job(job_id):
+    user_id = get_jwt_identity()
+    return handle_get_deep_search_job(user_id, job_id)
+
+@ai_bp.route('/deep-search/jobs/<job_id>/result', methods=['GET'])
+@jwt_required()
+def get_deep_search_job_result(job_id):
+    user_id = get_jwt_identity()
+    return handle_get_deep_search_job_result(user_id, job_id)
\ No newline at end of file
@@ -7,6 +7,9 @@ from app.utils.helpers import (
     parse_json
 )
 from app.models.user import User
+from app.AI_Modules.Agent.Profiles import PROFILES, DEFAULT_PROFILE
+from app.AI_Modules.Utils.Model import check_model_config
+from dataclasses import asdict
 
 config_bp = Blueprint('config', __name__)
 
@@ -38,6 +41,19 @@ def update_ai_config():
     user_id = get_jwt_identity()
     data = request.parsed_data
     
+    # An unknown profile would make every later deep search fail, so it is rejected here
+    profile = data['config'].get('deep_search_profile')
+    if profile is not None and profile not in PROFILES:
+        return json_response(
+            message=f"Unknown deep search profile: {profile}. Available profiles: {', '.join(PROFILES)}",
+            status=400
+        )
+    # Likewise a model Ollama does not have or a parameter it does not accept
+    try:
+        check_model_config(data['config'].get('model'), data['config'].get('parameters'))
+    except ValueError as e:
+        return json_response(message=str(e), status=400)
+    
     User.update_config(
         user_id,
         providers=data['providers'],
@@ -60,6 +76,10 @@ def set_model_parameters():
     """Set model parameters for current session"""
     user_id = get_jwt_identity()
     data = request.parsed_data
+    try:
+        check_model_config(data['model_name'], data['parameters'])
+    except ValueError as e:
+        return json_response(message=str(e), status=400)
     
     User.update_model_parameters(
         user_id,
@@ -76,4 +96,14 @@ def get_available_providers():
     """Get list of available AI providers"""
     return json_response({
         'providers': ['Ollama', 'OpenAI', 'HuggingFace', 'Custom']
-    })
\ No newline at end of file
+    })
+
+@config_bp.route('/profiles', methods=['GET'])
+@jwt_required()
+@handle_errors
+def get_deep_search_profiles():
+    """Get the deep search pipeline profiles, selectable per request or with config.deep_search_profile"""
+    return json_response({
+        'profiles': {name: asdict(profile) for name, profile in PROFILES.items()},
+        'default': DEFAULT_PROFILE
+    })
@@ -1,13 +1,52 @@
-from flask import jsonify
+from flask import jsonify, Response, stream_with_context
 from app.models.message import Message
 from app.models.chat import Chat
 from app.models.user import User
-from app.AI_Modules.Agent.Agent import DeepSearchAgent
-from app.AI_Modules.Utils.Model import OllamaModel
+from app.models.job import Job
+from app.services.job_service import submit_job
+from bson.errors import InvalidId
+from app.AI_Modules.Agent.Agent import DeepSearchAgent, stream_progress
+from app.AI_Modules.Agent.Profiles import get_profile
+from app.AI_Modules.Utils.Model import OllamaModel, DEFAULT_MODEL
+from app.AI_Modules.Utils.AsyncRunner import get_async_runner
 from datetime import datetime
 import logging
+import json
+import time
 from app.AI_Modules.Agent.ChatAgent import ChatAgent
 
+# Bounds on a request's timeout: below the minimum no stage gets a useful share of it
+MIN_TIME_BUDGET = 5
+MAX_TIME_BUDGET = 1800
+
+def _get_user_model(provider, model_config):
+    """The user's configured model; one that became invalid after it was saved falls back to the default"""
+    try:
+        return OllamaModel._get_model(provider, model_config)
+    except ValueError as e:
+        logging.warning(f"Configured model cannot be used ({str(e)}), falling back to {DEFAULT_MODEL}")
+        return OllamaModel._get_model()
+
+def _prepare_chat(user_id, chat_id, message):
+    user_msg = Message.create(
+        chat_id=chat_id,
+        content=message,
+        role='user'
+    )
+    
+    user = User.find_by_id(user_id)
+    provider = user.get('providers', {}).get('default', 'ollama')
+    model_config = user.get('config', {})
+    
+    model = _get_user_model(provider, model_config)
+    
+    try:
+        history = Message.get_chat_messages(chat_id)
+    except Exception as e:
+        logging.info(f"Error {e} occured, proceeding without history")
+        history=[]
+    return user_msg, ChatAgent(model), history
+
 def handle_chat(user_id, data):
     """Handle regular chat interactions"""
     message = data.get('message')
@@ -19,29 +58,11 @@ def handle_chat(user_id, data):
             'error': 'Message and chat_id are required'
         }), 400
     
+    if data.get('stream'):
+        return handle_chat_stream(user_id, chat_id, message)
+    
     try:
-        user_msg = Message.create(
-            chat_id=chat_id,
-            content=message,
-            role='user'
-        )
-        
-        user = User.find_by_id(user_id)
-        provider = user.get('providers', {}).get('default', 'ollama')
-        model_config = user.get('config', {})
-        
-        try:
-            model = OllamaModel._get_model(provider, model_config)
-        except Exception as e:
-            logging.error(f"Model error: {str(e)}")
-            model = OllamaModel()
-        
-        try:
-            history = Message.get_chat_messages(chat_id)
-        except Exception as e:
-            logging.info(f"Error {e} occured, proceeding without history")
-            history=[]
-        chat_agent = ChatAgent(model)
+        user_msg, chat_agent, history = _prepare_chat(user_id, chat_id, message)
         
         response = chat_agent._generate_message(user_msg["content"],history)
                 
@@ -65,6 +86,143 @@ def handle_chat(user_id, data):
             'error': 'An error occurred processing your request'
         }), 500
 
+def handle_chat_stream(user_id, chat_id, message):
+    """Stream the assistant reply as server-sent token events, saving the message once it is complete.
+    A reply cut off by an error is saved flagged as partial, and the stream ends with an error event"""
+    def generate():
+        chunks = []
+        streamed = False
+        try:
+            user_msg, chat_agent, history = _prepare_chat(user_id, chat_id, message)
+            
+            for chunk in chat_agent._stream_message(user_msg["content"], history):
+                chunks.append(chunk)
+                yield _sse('token', {'content': chunk})
+            streamed = True
+            
+            ai_msg = Message.create(
+                chat_id=chat_id,
+                content="".join(chunks),
+                role='assistant'
+            )
+            yield _sse('done', {
+                'success': True,
+                'message_id': str(ai_msg['_id']),
+                'created_at': ai_msg['created_at'].isoformat()
+            })
+            
+        except Exception as e:
+            logging.error(f"Error in handle_chat_stream: {str(e)}")
+            error = {
+                'success': False,
+                'error': 'An error occurred processing your request'
+            }
+            if chunks and not streamed:
+                # The client already shows these tokens; keep them in the history, marked as incomplete
+                try:
+                    ai_msg = Message.create(
+                        chat_id=chat_id,
+                        content="".join(chunks),
+                        role='assistant',
+                        metadata={'partial': True}
+                    )
+                    error.update(partial=True, message_id=str(ai_msg['_id']))
+                except Exception as save_error:
+                    logging.error(f"Error saving partial chat reply: {str(save_error)}")
+            yield _sse('error', error)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _resolve_profile(user_id, data):
+    """Pipeline profile named in the request, else in the user's config, else the default one"""
+    name = data.get('profile')
+    if not name:
+        user = User.find_by_id(user_id)
+        name = user.get('config', {}).get('deep_search_profile')
+    return get_profile(name)
+
+def _resolve_time_budget(profile, data):
+    """Seconds the deep search may take: the request's timeout, else the profile's budget"""
+    timeout = data.get('timeout')
+    if timeout is None:
+        return profile.time_budget
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float)):
+        raise ValueError("timeout must be a number of seconds")
+    if not MIN_TIME_BUDGET <= timeout <= MAX_TIME_BUDGET:
+        raise ValueError(f"timeout must be between {MIN_TIME_BUDGET} and {MAX_TIME_BUDGET} seconds")
+    return float(timeout)
+
+def _initial_state(query, chat_id, time_budget):
+    # The deadline is fixed when the run starts, so queued jobs do not spend their budget waiting
+    return {
+        "topic": query,
+        "session_id": chat_id,
+        "deadline": time.time() + time_budget,
+        "time_budget": time_budget
+    }
+
+def _build_deep_search_agent(user_id, profile=None):
+    user = User.find_by_id(user_id)
+    provider = user.get('providers', {}).get('default', 'ollama')
+    model_config = user.get('config', {})
+
+    model = _get_user_model(provider, model_config)
+    return DeepSearchAgent(model=model, profile=profile)
+
+def _create_deep_search_chat(user_id, query):
+    chat = Chat.create(
+        user_id=user_id,
+        title=f"Deep Search: {query[:30]}{'...' if len(query) > 30 else ''}",
+        is_deep_search=True
+    )
+    
+    Message.create(
+        chat_id=str(chat['_id']),
+        content=query,
+        role='user'
+    )
+    return chat
+
+def _save_deep_search_result(chat_id, final_response, profile):
+    return Message.create(
+        chat_id=chat_id,
+        content=final_response,
+        role='assistant',
+        metadata={
+            'type': 'deep_search',
+            'profile': profile.name,
+            'partial': final_response.get('partial', False),
+            'truncated_stages': final_response.get('truncated_stages', []),
+            'sources': final_response.get('sources', [])
+        }
+    )
+
+def _serialize_update(update):
+    """Make a node's state update JSON-safe, dropping page bodies and retriever objects"""
+    serialized = {}
+    for key, value in (update or {}).items():
+        if key in ('vector_retriever', 'graph_retriever'):
+            serialized[key] = value is not None
+        elif isinstance(value, list):
+            serialized[key] = [
+                {
+                    'url': item.url,
+                    'title': item.title,
+                    'content_length': len(item.content or '')
+                } if hasattr(item, 'url') else item
+                for item in value
+            ]
+        else:
+            serialized[key] = value
+    return serialized
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 def handle_deep_search(user_id, data):
     """Handle deep search requests"""
     query = data.get('query')
@@ -76,51 +234,27 @@ def handle_deep_search(user_id, data):
         }), 400
     
     try:
-        user = User.find_by_id(user_id)
-        model_config = user.get('config', {})
-        
-        model_name = model_config.get('model', 'llama3.2:1b')
-        model_params = model_config.get('parameters', {})
-        temperature = model_params.get('temperature', 0)
-
-        try:
-            model = OllamaModel(
-                model=model_name,
-                temperature=temperature
-            )
-        except Exception as e:
-            logging.error(f"Model initialization failed: {str(e)}, using default")
-            model = OllamaModel() 
-        agent = DeepSearchAgent(model=model)
-        
-        chat = Chat.create(
-            user_id=user_id,
-            title=f"Deep Search: {query[:30]}{'...' if len(query) > 30 else ''}",
-            is_deep_search=True
-        )
-        
-        Message.create(
-            chat_id=str(chat['_id']),
-            content=query,
-            role='user'
-        )
+        profile = _resolve_profile(user_id, data)
+        time_budget = _resolve_time_budget(profile, data)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    try:
+        agent = _build_deep_search_agent(user_id, profile)
+        chat = _create_deep_search_chat(user_id, query)
         
         workflow = agent.create_graph()
-        results = workflow.invoke({"topic": query})
+        results = get_async_runner().run(workflow.ainvoke(_initial_state(query, str(chat['_id']), time_budget)))
         
-        ai_msg = Message.create(
-            chat_id=str(chat['_id']),
-            content=results['final_response'],
-            role='assistant',
-            metadata={
-                'type': 'deep_search',
-                'sources': results['final_response'].get('sources', [])
-            }
-        )
+        _save_deep_search_result(str(chat['_id']), results['final_response'], profile)
         
         return jsonify({
             'success': True,
             'chat_id': str(chat['_id']),
+            'profile': profile.name,
             'results': results['final_response']
         })
         
@@ -129,4 +263,177 @@ def handle_deep_search(user_id, data):
         return jsonify({
             'success': False,
             'error': 'An error occurred processing your deep search request'
-        }), 500
\ No newline at end of file
+        }), 500
+
+def handle_deep_search_stream(user_id, data):
+    """Handle deep search requests as a server-sent event stream of node progress and answer tokens"""
+    query = data.get('query')
+    
+    if not query:
+        return jsonify({
+            'success': False,
+            'error': 'Query is required'
+        }), 400
+    
+    try:
+        profile = _resolve_profile(user_id, data)
+        time_budget = _resolve_time_budget(profile, data)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    def generate():
+        try:
+            agent = _build_deep_search_agent(user_id, profile)
+            chat = _create_deep_search_chat(user_id, query)
+            yield _sse('chat', {'chat_id': str(chat['_id']), 'profile': profile.name})
+            
+            final_response = None
+            workflow = agent.create_graph()
+            events = stream_progress(workflow, _initial_state(query, str(chat['_id']), time_budget))
+            for kind, node, update in get_async_runner().iterate(events):
+                if kind == "token":
+                    yield _sse('token', update)
+                    continue
+                if node == 'generate_final':
+                    final_response = update['final_response']
+                yield _sse('node', {'node': node, 'update': _serialize_update(update)})
+            
+            if final_response is None:
+                raise RuntimeError("Workflow finished without a final response")
+            
+            ai_msg = _save_deep_search_result(str(chat['_id']), final_response, profile)
+            yield _sse('done', {
+                'success': True,
+                'chat_id': str(chat['_id']),
+                'message_id': str(ai_msg['_id']),
+                'results': final_response
+            })
+            
+        except Exception as e:
+            logging.error(f"Error in handle_deep_search_stream: {str(e)}")
+            yield _sse('error', {
+                'success': False,
+                'error': 'An error occurred processing your deep search request'
+            })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _run_deep_search_job(job_id, user_id, query, chat_id, profile, time_budget):
+    agent = _build_deep_search_agent(user_id, profile)
+    workflow = agent.create_graph()
+    
+    final_response = None
+    events = stream_progress(workflow, _initial_state(query, chat_id, time_budget), tokens=False)
+    for _kind, node, update in get_async_runner().iterate(events):
+        if node == 'generate_final':
+            final_response = update['final_response']
+        Job.add_progress(job_id, node, _serialize_update(update))
+    
+    if final_response is None:
+        raise RuntimeError("Workflow finished without a final response")
+    
+    ai_msg = _save_deep_search_result(chat_id, final_response, profile)
+    return str(ai_msg['_id'])
+
+def _get_user_job(user_id, job_id):
+    try:
+        job = Job.get_by_id(job_id)
+    except InvalidId:
+        return None
+    if not job or job['user_id'] != user_id:
+        return None
+    return job
+
+def handle_submit_deep_search_job(user_id, data):
+    """Queue a deep search on the worker pool and return immediately with the job id"""
+    query = data.get('query')
+    
+    if not query:
+        return jsonify({
+            'success': False,
+            'error': 'Query is required'
+        }), 400
+    
+    try:
+        profile = _resolve_profile(user_id, data)
+        time_budget = _resolve_time_budget(profile, data)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    try:
+        chat = _create_deep_search_chat(user_id, query)
+        chat_id = str(chat['_id'])
+        job = Job.create(user_id=user_id, chat_id=chat_id, query=query)
+        job_id = str(job['_id'])
+        
+        submit_job(job_id, _run_deep_search_job, user_id, query, chat_id, profile, time_budget)
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'chat_id': chat_id,
+            'profile': profile.name,
+            'status': 'queued'
+        }), 202
+        
+    except Exception as e:
+        logging.error(f"Error in handle_submit_deep_search_job: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'An error occurred submitting your deep search request'
+        }), 500
+
+def handle_get_deep_search_job(user_id, job_id):
+    """Report a job's status, the nodes completed so far and their partial results"""
+    job = _get_user_job(user_id, job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'job_id': str(job['_id']),
+        'chat_id': job['chat_id'],
+        'status': job['status'],
+        'progress': [step['node'] for step in job.get('progress', [])],
+        'partial': job.get('partial', {}),
+        'error': job.get('error')
+    })
+
+def handle_get_deep_search_job_result(user_id, job_id):
+    """Return the final deep search result, read back from the assistant message saved in the chat"""
+    job = _get_user_job(user_id, job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    if job['status'] == 'failed':
+        return jsonify({
+            'success': False,
+            'status': job['status'],
+            'error': 'The deep search failed'
+        }), 500
+    
+    if job['status'] != 'done':
+        return jsonify({
+            'success': False,
+            'status': job['status'],
+            'error': 'The deep search has not finished yet'
+        }), 202
+    
+    message = Message.get_by_id(job['message_id'])
+    return jsonify({
+        'success': True,
+        'chat_id': job['chat_id'],
+        'message_id': job['message_id'],
+        'results': message['content']
+    })
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+import threading
+import socket
+import time
+import os
+import logging
+from app.models.job import Job
+
+_executor = None
+_executor_lock = threading.Lock()
+
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_SECONDS', 30))
+# A job whose owner missed this many heartbeats in a row is taken to have died with its process
+JOB_STALE_HEARTBEATS = 4
+
+def _worker_id():
+    """Owner recorded on the jobs this process runs; read at call time so forked workers get their own"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _get_executor():
+    """Process-wide worker pool that runs deep search jobs off the request threads"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = current_app.config.get('DEEP_SEARCH_WORKERS', 2)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='deep-search')
+                threading.Thread(
+                    target=_monitor_jobs,
+                    args=(current_app._get_current_object(),),
+                    name='deep-search-heartbeat',
+                    daemon=True
+                ).start()
+                logging.info(f"Started deep search job pool with {workers} workers")
+    return _executor
+
+def _monitor_jobs(app):
+    """Keep the heartbeat of this process's unfinished jobs fresh and fail the jobs of processes that stopped"""
+    while True:
+        time.sleep(JOB_HEARTBEAT_INTERVAL)
+        with app.app_context():
+            try:
+                Job.heartbeat(_worker_id())
+                fail_interrupted_jobs()
+            except Exception as e:
+                logging.error(f"Job heartbeat failed: {str(e)}")
+
+def submit_job(job_id, task, *args):
+    """Queue task(*args) to run inside an application context and record its lifecycle on the job"""
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            Job.set_status(job_id, 'running')
+            try:
+                message_id = task(job_id, *args)
+                Job.set_status(job_id, 'done', message_id=message_id)
+            except Exception as e:
+                logging.error(f"Job {job_id} failed: {str(e)}")
+                Job.set_status(job_id, 'failed', error=str(e))
+
+    executor = _get_executor()
+    Job.claim(job_id, _worker_id())
+    return executor.submit(run)
+
+def fail_interrupted_jobs():
+    """Mark queued or running jobs as failed once their owner stopped sending heartbeats, i.e. the process
+    that ran them is gone. Jobs of live processes, including other workers, keep running."""
+    before = datetime.now() - timedelta(seconds=JOB_HEARTBEAT_INTERVAL * JOB_STALE_HEARTBEATS)
+    count = Job.fail_stale(before, 'Interrupted by a server restart')
+    if count:
+        logging.info(f"Marked {count} interrupted deep search jobs as failed")
+    return count
@@ -1,5 +1,6 @@
 from app import create_app
 from app.extensions import db
+from app.services.job_service import fail_interrupted_jobs
 import sys
 import os
 import logging
@@ -12,6 +13,7 @@ if __name__ == '__main__':
         with app.app_context():
             db.db.command('ping')
             logging.info("MongoDB connection successful")
+            fail_interrupted_jobs()
     except Exception as e:
         logging.info("MongoDB connection failed:", str(e))
     
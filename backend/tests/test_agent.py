@@ -0,0 +1,174 @@
+import unittest
+import asyncio
+from unittest.mock import patch
+import os
+import time
+from app.AI_Modules.Agent.Agent import DeepSearchAgent, UrlClaims, stream_progress
+from app.AI_Modules.Agent.Profiles import get_profile
+from app.AI_Modules.Utils.Model import Model
+from app.AI_Modules.Utils.Tokens import count_tokens
+from app.AI_Modules.Types.Types import Website
+
+class FakeModel(Model):
+    def __init__(self):
+        self.params = {"num_ctx": 4096}
+
+    def _run(self, input):
+        return '{"summary": "S", "sources": []}'
+
+class FakeSearchTool:
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    def search_google(self, query, pages=1, **kwargs):
+        self.queries.append(query)
+        return [{'title': url, 'link': url} for url in self.results[query]]
+
+    async def asearch_google(self, query, pages=1, **kwargs):
+        return self.search_google(query, pages=pages, **kwargs)
+
+class TestDeepSearchAgent(unittest.TestCase):
+    def setUp(self):
+        with patch.dict(os.environ, {'CORPUS_DISABLED': '1'}):
+            self.agent = DeepSearchAgent(FakeModel(), profile=get_profile('balanced'))
+
+    def test_deadline_keeps_final_reserve(self):
+        deadline = time.time() + 240
+        state = {'deadline': deadline, 'time_budget': 240}
+        self.assertEqual(self.agent._deadline(state), deadline - 45)
+        self.assertEqual(self.agent._deadline(state, final=True), deadline)
+
+    def test_deadline_caps_reserve_for_short_budgets(self):
+        deadline = time.time() + 5
+        state = {'deadline': deadline, 'time_budget': 5}
+        self.assertEqual(self.agent._deadline(state), deadline - 1.25)
+        self.assertGreater(self.agent._deadline(state), time.time())
+
+    def test_sync_search_stops_at_stage_timeout(self):
+        class SlowSearchTool:
+            def search_google(self, query, pages=1, **kwargs):
+                time.sleep(2)
+                return [{'title': 'late', 'link': 'http://late.com'}]
+        self.agent.search_tool = SlowSearchTool()
+        # One second of the stage deadline is left once the 45s final reserve is kept back
+        state = {'query': 'q1', 'deadline': time.time() + 46, 'time_budget': 240}
+
+        started = time.time()
+        result = self.agent.execute_search(state)
+
+        self.assertLess(time.time() - started, 1.5)
+        self.assertEqual(result, {'search_results': [], 'truncated_stages': ['execute_search']})
+
+    def test_async_generation_stops_at_deadline(self):
+        class SlowStreamingModel(FakeModel):
+            async def _astream(self, input):
+                for chunk in ['one ', 'two ', 'three']:
+                    yield chunk
+                    await asyncio.sleep(0.2)
+        self.agent.model = SlowStreamingModel()
+
+        started = time.time()
+        response, truncated = asyncio.run(self.agent._agenerate('prompt', deadline=time.time() + 0.3))
+
+        self.assertTrue(truncated)
+        self.assertEqual(response, 'one two ')
+        self.assertLess(time.time() - started, 0.5)
+        self.assertEqual(asyncio.run(self.agent._agenerate('prompt', deadline=time.time() + 5)), ('one two three', False))
+
+    def _run_branch(self, query, claims, query_index=0):
+        return self.agent.create_search_branch().invoke({
+            'query': query,
+            'query_index': query_index,
+            'refined_query': 'refined',
+            'claims': claims,
+            'deadline': None,
+            'time_budget': None
+        })
+
+    def _fake_scrape(self, url, refined_query, timeout=None):
+        self.scraped.append(url)
+        # Later results finish first, so completion order differs from rank order
+        time.sleep(0.05 * (5 - int(url.rsplit('/', 1)[1])))
+        return {'url': url, 'title': url, 'content': f'content of {url}'}
+
+    async def _afake_scrape(self, url, refined_query, timeout=None):
+        return self._fake_scrape(url, refined_query, timeout)
+
+    def _setup_branch(self, results):
+        self.scraped = []
+        self.agent.search_tool = FakeSearchTool(results)
+        self.agent._scrape_page = self._fake_scrape
+        self.agent._ascrape_page = self._afake_scrape
+
+    def test_search_branch_scrapes_each_result_in_rank_order(self):
+        urls = [f'http://site{i}.com/{i}' for i in range(5)]
+        self._setup_branch({'q1': urls + [urls[0]]})
+
+        result = self._run_branch('q1', UrlClaims())
+
+        self.assertEqual(sorted(self.scraped), urls)
+        self.assertEqual([site.url for site in result['scraped_contents']], urls)
+        self.assertEqual(len(result['search_results']), 6)
+
+    def test_search_branches_share_url_claims(self):
+        self._setup_branch({
+            'q1': ['http://a.com/0', 'http://b.com/1'],
+            'q2': ['http://b.com/1', 'http://c.com/2']
+        })
+        claims = UrlClaims()
+
+        first = self._run_branch('q1', claims)
+        second = self._run_branch('q2', claims, query_index=1)
+
+        self.assertEqual(sorted(self.scraped), ['http://a.com/0', 'http://b.com/1', 'http://c.com/2'])
+        self.assertEqual([site.url for site in second['scraped_contents']], ['http://c.com/2'])
+        self.assertEqual(second['scraped_contents'][0].rank, (1, 1))
+        self.assertEqual(len(first['scraped_contents']), 2)
+
+    def test_search_branch_respects_max_urls(self):
+        self._setup_branch({'q1': [f'http://site{i}.com/{i}' for i in range(5)]})
+
+        result = self._run_branch('q1', UrlClaims(limit=3))
+
+        self.assertEqual(len(self.scraped), 3)
+        self.assertEqual([site.url for site in result['scraped_contents']],
+                         ['http://site0.com/0', 'http://site1.com/1', 'http://site2.com/2'])
+
+    def test_stream_progress_reports_search_branch_nodes(self):
+        with patch.dict(os.environ, {'CORPUS_DISABLED': '1'}):
+            self.agent = DeepSearchAgent(FakeModel(), profile=get_profile('fast'))
+        self._setup_branch({'topic': ['http://site0.com/0', 'http://site1.com/1']})
+
+        async def collect():
+            state = {'topic': 'topic', 'session_id': 'chat', 'deadline': None, 'time_budget': None}
+            return [event async for event in stream_progress(self.agent.create_graph(), state)]
+        events = asyncio.run(collect())
+
+        nodes = [node for kind, node, _ in events if kind == 'node']
+        self.assertIn('execute_search', nodes)
+        self.assertEqual(nodes.count('scrape_page'), 2)
+        self.assertEqual(nodes[-1], 'generate_final')
+        scraped = [update['scraped_contents'][0].url for kind, node, update in events if node == 'scrape_page']
+        self.assertEqual(sorted(scraped), ['http://site0.com/0', 'http://site1.com/1'])
+    def test_summary_prompt_fits_with_source_list(self):
+        # Long URLs make the appended source list a sizeable share of the window
+        pages = [
+            Website(url=f'http://example.com/{i}/' + 'segment/' * 40, title=str(i), content='Relevant words here. ' * 400)
+            for i in range(8)
+        ]
+        state = {
+            'topic': 'topic',
+            'refined_topic': {'refined_query': 'relevant words', 'understanding': 'understanding'},
+            'scraped_contents': pages
+        }
+
+        prompt = self.agent._final_prompt(state)
+
+        assembler = self.agent.context_assembler
+        limit = int(assembler.context_window * (1 - assembler.safety_margin)) - assembler.output_reserve
+        self.assertLessEqual(count_tokens(prompt, assembler.encoding_name), limit)
+        self.assertIn(pages[0].url, prompt)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,10 +3,17 @@ from flask import json
 from app import create_app
 from app.extensions import db
 from flask_jwt_extended import create_access_token
-from datetime import datetime
+from datetime import datetime, timedelta
 import bcrypt
 import mongomock
-from unittest.mock import patch
+from app.models.job import Job
+from app.services.job_service import fail_interrupted_jobs
+from unittest.mock import patch, AsyncMock
+import time
+
+async def _aiter(items):
+    for item in items:
+        yield item
 
 class TestAIRoutes(unittest.TestCase):
     def setUp(self):
@@ -41,8 +48,7 @@ class TestAIRoutes(unittest.TestCase):
 
     @patch('app.services.ai_service.OllamaModel')
     def test_chat_endpoint(self, mock_model):
-        mock_instance = mock_model.return_value
-        mock_instance._run.return_value = "Mocked response"
+        mock_model._get_model.return_value._run.return_value = "Mocked response"
         headers = {'Authorization': f'Bearer {self.access_token}'}
         response = self.client.post('/ai/chat', headers=headers, json={
             'message': 'Hello',
@@ -53,14 +59,52 @@ class TestAIRoutes(unittest.TestCase):
         messages = db.db.messages.find({'chat_id': str(self.chat_id)})
         self.assertEqual(len(list(messages)), 2)
 
+    @patch('app.services.ai_service.OllamaModel')
+    def test_chat_stream(self, mock_model):
+        mock_model._get_model.return_value._stream.return_value = iter(["Mocked ", "response"])
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.post('/ai/chat', headers=headers, json={
+            'message': 'Hello',
+            'chat_id': str(self.chat_id),
+            'stream': True
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        body = response.get_data(as_text=True)
+        self.assertEqual(body.count('event: token'), 2)
+        self.assertIn('event: done', body)
+        message = db.db.messages.find_one({'chat_id': str(self.chat_id), 'role': 'assistant'})
+        self.assertEqual(message['content'], "Mocked response")
+
+    @patch('app.services.ai_service.OllamaModel')
+    def test_chat_stream_error_midway(self, mock_model):
+        def broken_stream(input):
+            yield "Mocked "
+            raise RuntimeError("model went away")
+        mock_model._get_model.return_value._stream.side_effect = broken_stream
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.post('/ai/chat', headers=headers, json={
+            'message': 'Hello',
+            'chat_id': str(self.chat_id),
+            'stream': True
+        })
+        body = response.get_data(as_text=True)
+        self.assertEqual(body.count('event: token'), 1)
+        self.assertIn('event: error', body)
+        self.assertNotIn('event: done', body)
+        self.assertNotIn('Sorry', body)
+        message = db.db.messages.find_one({'chat_id': str(self.chat_id), 'role': 'assistant'})
+        self.assertEqual(message['content'], "Mocked ")
+        self.assertTrue(message['metadata']['partial'])
+
     @patch('app.services.ai_service.DeepSearchAgent')
     def test_deep_search(self, mock_agent):
         mock_instance = mock_agent.return_value
-        mock_instance.create_graph.return_value.invoke.return_value = {
-            'final_response': 'Deep results',
+        mock_instance.create_graph.return_value.ainvoke = AsyncMock(return_value={
+            'final_response': {'search_summary': 'Deep results', 'sources': []},
             'questions': ['question1', 'question2'],
             'research_results': {'key': 'value'}  
-        }
+        })
         
         headers = {'Authorization': f'Bearer {self.access_token}'}
         response = self.client.post('/ai/deep-search',
@@ -70,5 +114,134 @@ class TestAIRoutes(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('chat_id', response.json)
 
+    @patch('app.services.ai_service.DeepSearchAgent')
+    def test_deep_search_stream(self, mock_agent):
+        mock_instance = mock_agent.return_value
+        mock_instance.create_graph.return_value.astream.return_value = _aiter([
+            ((), 'updates', {'generate_queries': {'search_queries': ['q1', 'q2']}}),
+            ((), 'custom', {'type': 'token', 'node': 'generate_final', 'content': 'Deep'}),
+            ((), 'updates', {'generate_final': {'final_response': {'search_summary': 'Deep results', 'sources': []}}})
+        ])
+        
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.post('/ai/deep-search/stream',
+                                headers=headers,
+                                json={'query': 'Test topic'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        body = response.get_data(as_text=True)
+        self.assertIn('event: node', body)
+        self.assertIn('event: token', body)
+        self.assertIn('event: done', body)
+        messages = db.db.messages.find({'role': 'assistant'})
+        self.assertEqual(len(list(messages)), 1)
+
+    @patch('app.services.ai_service.DeepSearchAgent')
+    def test_deep_search_stream_profile(self, mock_agent):
+        mock_instance = mock_agent.return_value
+        mock_instance.create_graph.return_value.astream.return_value = _aiter([
+            ((), 'updates', {'generate_final': {'final_response': {'search_summary': 'Fast results', 'sources': []}}})
+        ])
+        
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.post('/ai/deep-search/stream',
+                                headers=headers,
+                                json={'query': 'Test topic', 'profile': 'fast'})
+        
+        self.assertIn('event: done', response.get_data(as_text=True))
+        self.assertEqual(mock_agent.call_args.kwargs['profile'].name, 'fast')
+        message = db.db.messages.find_one({'role': 'assistant'})
+        self.assertEqual(message['metadata']['profile'], 'fast')
+
+    def test_deep_search_unknown_profile(self):
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.post('/ai/deep-search/stream',
+                                headers=headers,
+                                json={'query': 'Test topic', 'profile': 'turbo'})
+        self.assertEqual(response.status_code, 400)
+
+    @patch('app.services.ai_service.DeepSearchAgent')
+    def test_deep_search_stream_partial(self, mock_agent):
+        mock_instance = mock_agent.return_value
+        mock_instance.create_graph.return_value.astream.return_value = _aiter([
+            ((), 'updates', {'generate_final': {'final_response': {
+                'search_summary': 'Partial results', 'sources': [],
+                'partial': True, 'truncated_stages': ['scrape_page']
+            }}})
+        ])
+        
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        before = time.time()
+        response = self.client.post('/ai/deep-search/stream',
+                                headers=headers,
+                                json={'query': 'Test topic', 'timeout': 5})
+        
+        self.assertIn('event: done', response.get_data(as_text=True))
+        initial_state = mock_instance.create_graph.return_value.astream.call_args.args[0]
+        self.assertLessEqual(initial_state['deadline'], before + 6)
+        self.assertEqual(initial_state['time_budget'], 5)
+        message = db.db.messages.find_one({'role': 'assistant'})
+        self.assertTrue(message['metadata']['partial'])
+        self.assertEqual(message['metadata']['truncated_stages'], ['scrape_page'])
+
+    def test_deep_search_invalid_timeout(self):
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.post('/ai/deep-search/stream',
+                                headers=headers,
+                                json={'query': 'Test topic', 'timeout': -1})
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post('/ai/deep-search/stream',
+                                headers=headers,
+                                json={'query': 'Test topic', 'timeout': 86400})
+        self.assertEqual(response.status_code, 400)
+
+    @patch('app.services.ai_service.DeepSearchAgent')
+    def test_deep_search_job(self, mock_agent):
+        mock_instance = mock_agent.return_value
+        mock_instance.create_graph.return_value.astream.return_value = _aiter([
+            ((), 'updates', {'generate_queries': {'search_queries': ['q1', 'q2']}}),
+            ((), 'updates', {'generate_final': {'final_response': {'search_summary': 'Deep results', 'sources': []}}})
+        ])
+        
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.post('/ai/deep-search/jobs',
+                                headers=headers,
+                                json={'query': 'Test topic'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json['job_id']
+        
+        for _ in range(50):
+            status = self.client.get(f'/ai/deep-search/jobs/{job_id}', headers=headers)
+            if status.json['status'] in ('done', 'failed'):
+                break
+            time.sleep(0.1)
+        self.assertEqual(status.json['status'], 'done')
+        self.assertEqual(status.json['progress'], ['generate_queries', 'generate_final'])
+        
+        result = self.client.get(f'/ai/deep-search/jobs/{job_id}/result', headers=headers)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json['results']['search_summary'], 'Deep results')
+
+    def test_fail_interrupted_jobs(self):
+        with self.app.app_context():
+            stale = datetime.now() - timedelta(minutes=10)
+            orphaned = Job.create(str(self.user_id), str(self.chat_id), 'Orphaned topic')
+            Job.set_status(orphaned['_id'], 'running', owner='old-host:1', heartbeat_at=stale)
+            live = Job.create(str(self.user_id), str(self.chat_id), 'Live topic')
+            Job.set_status(live['_id'], 'running', owner='other-host:2', heartbeat_at=stale)
+            Job.heartbeat('other-host:2')
+            queued = Job.create(str(self.user_id), str(self.chat_id), 'Queued topic')
+            done = Job.create(str(self.user_id), str(self.chat_id), 'Done topic')
+            Job.set_status(done['_id'], 'done', heartbeat_at=stale)
+
+            self.assertEqual(fail_interrupted_jobs(), 1)
+            self.assertEqual(Job.get_by_id(orphaned['_id'])['status'], 'failed')
+            # Another worker still beating for its job, and a job just created, are left alone
+            self.assertEqual(Job.get_by_id(live['_id'])['status'], 'running')
+            self.assertEqual(Job.get_by_id(queued['_id'])['status'], 'queued')
+            self.assertEqual(Job.get_by_id(done['_id'])['status'], 'done')
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,60 @@
+import unittest
+from app.AI_Modules.Utils.Chunker import TokenChunker
+from app.AI_Modules.Utils.Tokens import count_tokens, token_offsets
+
+TEXT = ' '.join(f'word{i} sentence number {i} ends here.' for i in range(200))
+
+class TestTokenChunker(unittest.TestCase):
+    def setUp(self):
+        self.chunker = TokenChunker(chunk_size=50, chunk_overlap=10)
+
+    def test_windows_cover_the_text_with_overlap(self):
+        windows = self.chunker.split_text(TEXT)
+        offsets = token_offsets(TEXT)
+
+        self.assertGreater(len(windows), 1)
+        for chunk, start, end in windows:
+            self.assertEqual(TEXT[start:end], chunk)
+            self.assertLessEqual(count_tokens(chunk), 50 + 1)
+        # Each window starts chunk_size - chunk_overlap tokens after the previous one
+        starts = [start for _, start, _ in windows]
+        self.assertEqual(starts[1], offsets[40] + 1)
+        for (_, _, end), (_, next_start, _) in zip(windows, windows[1:]):
+            self.assertLess(next_start, end)
+        self.assertEqual(windows[0][1], 0)
+        self.assertEqual(windows[-1][2], len(TEXT))
+
+    def test_overlap_repeats_the_previous_tail(self):
+        first, second = self.chunker.split_text(TEXT)[:2]
+
+        overlap = TEXT[second[1]:first[2]]
+        self.assertTrue(first[0].endswith(overlap))
+        self.assertTrue(second[0].startswith(overlap))
+        self.assertGreaterEqual(count_tokens(overlap), 8)
+
+    def test_short_and_empty_text(self):
+        self.assertEqual(self.chunker.split_text('  Short text.  '), [('Short text.', 2, 13)])
+        self.assertEqual(self.chunker.split_text(''), [])
+        self.assertEqual(self.chunker.split_text('   '), [])
+
+    def test_documents_keep_metadata_and_offsets(self):
+        documents = list(self.chunker.iter_documents([TEXT, 'Second page.'], [{'source': 'a'}, {'source': 'b'}]))
+
+        first_page = [doc for doc in documents if doc.metadata['source'] == 'a']
+        self.assertEqual([doc.metadata['chunk_index'] for doc in first_page], list(range(len(first_page))))
+        for doc in first_page:
+            self.assertEqual(TEXT[doc.metadata['start_index']:doc.metadata['end_index']], doc.page_content)
+        self.assertEqual(documents[-1].metadata, {'source': 'b', 'chunk_index': 0, 'start_index': 0, 'end_index': 12})
+
+    def test_batches(self):
+        batches = list(self.chunker.iter_batches([TEXT] * 3, batch_size=4))
+
+        self.assertTrue(all(len(batch) == 4 for batch in batches[:-1]))
+        self.assertEqual(sum(len(batch) for batch in batches), 3 * len(self.chunker.split_text(TEXT)))
+
+    def test_overlap_must_be_smaller_than_size(self):
+        with self.assertRaises(ValueError):
+            TokenChunker(chunk_size=10, chunk_overlap=10)
+
+if __name__ == '__main__':
+    unittest.main()
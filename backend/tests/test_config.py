@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 from flask import json
 from app import create_app
 from app.extensions import db
@@ -14,6 +15,10 @@ class TestConfigRoutes(unittest.TestCase):
         self.app.config['MONGO_URI'] = 'mongodb://localhost'
         self.app.config['JWT_SECRET_KEY'] = 'test-secret-key'
         self.client = self.app.test_client()
+        catalog = patch('app.AI_Modules.Utils.Model.get_model_catalog',
+                        return_value={'gpt-4:latest': 4000.0, 'mistral:latest': 4000.0})
+        catalog.start()
+        self.addCleanup(catalog.stop)
         
         with self.app.app_context():
             db.init_app(self.app)
@@ -49,11 +54,69 @@ class TestConfigRoutes(unittest.TestCase):
         user = db.db.users.find_one()
         self.assertEqual(user['providers'], new_config['providers'])
 
+    def test_update_ai_config_unknown_profile(self):
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.put('/config/ai', headers=headers, json={
+            'providers': {'openai': True},
+            'config': {'model': 'gpt-4', 'deep_search_profile': 'fastest'}
+        })
+        self.assertEqual(response.status_code, 400)
+        user = db.db.users.find_one()
+        self.assertEqual(user['config'], {'model': 'default'})
+        
+        response = self.client.put('/config/ai', headers=headers, json={
+            'providers': {'openai': True},
+            'config': {'model': 'gpt-4', 'deep_search_profile': 'fast'}
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_ai_config_invalid_model(self):
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.put('/config/ai', headers=headers, json={
+            'providers': {'openai': True},
+            'config': {'model': 'missing-model'}
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('missing-model', response.json['message'])
+        
+        response = self.client.put('/config/ai', headers=headers, json={
+            'providers': {'openai': True},
+            'config': {'model': 'gpt-4', 'parameters': {'temperature': 0.2, 'max_tokens': 100}}
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('max_tokens', response.json['message'])
+        user = db.db.users.find_one()
+        self.assertEqual(user['config'], {'model': 'default'})
+
+    def test_set_model_parameters(self):
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.post('/config/model', headers=headers, json={
+            'model_name': 'mistral',
+            'parameters': {'temperature': 0.2, 'top_k': 20}
+        })
+        self.assertEqual(response.status_code, 200)
+        user = db.db.users.find_one()
+        self.assertEqual(user['config']['parameters'], {'temperature': 0.2, 'top_k': 20})
+        
+        response = self.client.post('/config/model', headers=headers, json={
+            'model_name': 'mistral',
+            'parameters': {'temprature': 0.2}
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('temprature', response.json['message'])
+
     def test_get_providers(self):
         headers = {'Authorization': f'Bearer {self.access_token}'}
         response = self.client.get('/config/providers', headers=headers)
         self.assertEqual(response.status_code, 200)
         self.assertIn('providers', response.json['data'])
 
+    def test_get_profiles(self):
+        headers = {'Authorization': f'Bearer {self.access_token}'}
+        response = self.client.get('/config/profiles', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('fast', response.json['data']['profiles'])
+        self.assertEqual(response.json['data']['default'], 'balanced')
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch
+import os
+from app.AI_Modules.Utils.ContextAssembler import ContextAssembler, ContextSource, context_window
+from app.AI_Modules.Utils.Tokens import count_tokens
+
+FILLER = 'Unrelated filler sentence about nothing much. '
+
+class FakeModel:
+    def __init__(self, params):
+        self.params = params
+
+class TestContextAssembler(unittest.TestCase):
+    def setUp(self):
+        self.assembler = ContextAssembler(context_window=4096, output_reserve=512, min_source_tokens=32)
+
+    def _used(self, sources):
+        return sum(count_tokens(source.text) + self.assembler.source_overhead for source in sources)
+
+    def test_sources_that_fit_are_kept_whole(self):
+        sources = [ContextSource(text='Short text.', source='a'), ContextSource(text='Other text.', source='b')]
+
+        self.assertEqual(self.assembler.assemble(sources, budget=1000), sources)
+
+    def test_budget_is_split_by_relevance(self):
+        sources = [
+            ContextSource(text=FILLER * 100, source='high', score=3.0),
+            ContextSource(text=FILLER * 100, source='low', score=1.0)
+        ]
+
+        assembled = self.assembler.assemble(sources, budget=800)
+
+        self.assertEqual([source.source for source in assembled], ['high', 'low'])
+        high, low = (count_tokens(source.text) for source in assembled)
+        self.assertGreater(high, 2 * low)
+        self.assertLessEqual(self._used(assembled), 800)
+
+    def test_short_sources_hand_their_share_to_long_ones(self):
+        short = ContextSource(text='A brief note.', source='short', score=1.0)
+        long = ContextSource(text=FILLER * 200, source='long', score=1.0)
+
+        assembled = self.assembler.assemble([short, long], budget=600)
+
+        self.assertEqual(assembled[0], short)
+        # The long source gets everything the short one did not need, not just half of the budget
+        self.assertGreater(count_tokens(assembled[1].text), 500)
+        self.assertLessEqual(self._used(assembled), 600)
+
+    def test_starved_sources_are_dropped(self):
+        sources = [ContextSource(text=FILLER * 50, source=str(i), score=10.0 - i) for i in range(10)]
+
+        assembled = self.assembler.assemble(sources, budget=300)
+
+        self.assertLess(len(assembled), 10)
+        self.assertEqual(assembled[0].source, '0')
+        self.assertLessEqual(self._used(assembled), 300)
+
+    def test_compression_keeps_query_sentences(self):
+        text = (FILLER * 20 + 'Photosynthesis converts sunlight into chemical energy. ' + FILLER * 20 +
+                'Chlorophyll absorbs sunlight for photosynthesis. ' + FILLER * 20)
+        terms = {'photosynthesis', 'sunlight', 'chlorophyll'}
+
+        compressed = self.assembler.compress(text, 40, terms)
+
+        self.assertLessEqual(count_tokens(compressed), 40)
+        self.assertLess(compressed.index('Photosynthesis converts'), compressed.index('Chlorophyll absorbs'))
+
+    def test_compression_without_query_terms_keeps_the_lead(self):
+        text = 'First sentence comes first. ' + FILLER * 50
+
+        compressed = self.assembler.compress(text, 30, set())
+
+        self.assertTrue(compressed.startswith('First sentence comes first.'))
+        self.assertLessEqual(count_tokens(compressed), 30)
+
+    def test_budget_leaves_room_for_prompt_and_answer(self):
+        prompt = 'Answer the question. ' * 10
+
+        budget = self.assembler.budget(prompt)
+
+        self.assertEqual(budget, int(4096 * 0.9) - 512 - count_tokens(prompt))
+
+    @patch.dict(os.environ, {'OLLAMA_NUM_CTX': ''})
+    def test_context_window_defaults_without_num_ctx(self):
+        self.assertEqual(context_window(FakeModel({'num_ctx': 8192})), 8192)
+        self.assertEqual(ContextAssembler.for_model(FakeModel({})).context_window, 2048)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import hashlib
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.AI_Modules.Agent.Agent import DeepSearchAgent
+from app.AI_Modules.Agent.Profiles import get_profile
+from app.AI_Modules.Types.Types import Website
+from app.AI_Modules.Utils.Corpus import WebCorpus
+from app.AI_Modules.Utils.Model import Model
+
+class FakeModel(Model):
+    def __init__(self):
+        self.params = {}
+
+    def _run(self, input):
+        return ''
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.embedded = []
+
+    def _vector(self, text):
+        rng = np.random.default_rng(int(hashlib.md5(text.encode()).hexdigest()[:8], 16))
+        return rng.normal(size=8).tolist()
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+PAGES = [
+    Website(url='http://example.com/a', title='A', content='First page about solar panels. ' * 40),
+    Website(url='http://example.com/b', title='B', content='Second page about wind turbines. ' * 40)
+]
+
+class TestWebCorpus(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.corpus = WebCorpus(os.path.join(self.directory.name, 'corpus.sqlite'))
+        self.embeddings = CountingEmbeddings()
+        with patch.dict(os.environ, {'CORPUS_DISABLED': '1'}):
+            self.agent = DeepSearchAgent(FakeModel(), chunk_size=64, chunk_overlap=8, profile=get_profile('balanced'))
+        self.agent.corpus = self.corpus
+        self.agent._get_embedding_model = lambda: self.embeddings
+
+    def tearDown(self):
+        self.corpus._conn.close()
+        self.directory.cleanup()
+
+    def _build(self, pages):
+        return self.agent.build_knowledge_bases({
+            'scraped_contents': pages,
+            'refined_topic': {'refined_query': 'renewable energy'},
+            'retriever_type': 'vector',
+            'deadline': None,
+            'time_budget': None
+        })
+
+    def test_second_build_reuses_stored_chunks(self):
+        first = self._build(PAGES)
+        embedded = len(self.embeddings.embedded)
+        self.assertGreater(embedded, 0)
+        self.assertEqual(self.corpus.stats()['chunks'], embedded)
+
+        second = self._build(PAGES)
+
+        # Nothing is embedded again, yet the new store holds the same chunks
+        self.assertEqual(len(self.embeddings.embedded), embedded)
+        self.assertEqual(self.corpus.stats()['reused_chunks'], embedded)
+        self.assertEqual(second['vector_retriever'].vector_store.index.ntotal,
+                         first['vector_retriever'].vector_store.index.ntotal)
+
+    def test_changed_page_is_embedded_again(self):
+        self._build(PAGES)
+        embedded = len(self.embeddings.embedded)
+
+        changed = Website(url='http://example.com/a', title='A', content='Rewritten page about batteries. ' * 40)
+        self._build([changed, PAGES[1]])
+
+        new_texts = self.embeddings.embedded[embedded:]
+        self.assertTrue(new_texts)
+        self.assertTrue(all('batteries' in text for text in new_texts))
+
+    def test_build_adds_related_chunks_from_earlier_searches(self):
+        self._build(PAGES[:1])
+
+        result = self._build(PAGES[1:])
+
+        sources = {doc.metadata['source'] for doc in result['vector_retriever'].vector_store.docstore._dict.values()}
+        self.assertEqual(sources, {'http://example.com/a', 'http://example.com/b'})
+
+    def test_search_skips_excluded_urls(self):
+        self._build(PAGES)
+        query = self.embeddings.embed_query('anything')
+
+        results = self.corpus.search('ollama:llama3.2:1b', query, k=50, exclude_urls=['http://example.com/b'])
+
+        self.assertTrue(results)
+        self.assertEqual({doc.metadata['source'] for doc, _ in results}, {'http://example.com/a'})
+
+if __name__ == '__main__':
+    unittest.main()
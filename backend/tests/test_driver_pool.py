@@ -0,0 +1,99 @@
+import unittest
+import threading
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchElementException, TimeoutException
+from app.AI_Modules.Tools.DriverPool import DriverPool
+
+class FakeDriver:
+    def __init__(self, number):
+        self.number = number
+        self.healthy = True
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if not self.healthy:
+            raise InvalidSessionIdException("invalid session id")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+class FakeFactory:
+    def __init__(self):
+        self.drivers = []
+        self.fail = False
+
+    def __call__(self):
+        if self.fail:
+            raise RuntimeError("browser failed to start")
+        driver = FakeDriver(len(self.drivers))
+        self.drivers.append(driver)
+        return driver
+
+class TestDriverPool(unittest.TestCase):
+    def setUp(self):
+        self.factory = FakeFactory()
+        self.pool = DriverPool(self.factory, size=2, max_uses=3, checkout_timeout=1)
+
+    def test_page_errors_keep_the_driver(self):
+        pool = DriverPool(self.factory, size=1, max_uses=10)
+        for error in (NoSuchElementException("no results"), TimeoutException("slow page"), ValueError("parse")):
+            with self.assertRaises(type(error)):
+                with pool.driver():
+                    raise error
+
+        self.assertEqual(len(self.factory.drivers), 1)
+        self.assertFalse(self.factory.drivers[0].quit_called)
+        self.assertEqual(pool.acquire().uses, 3)
+
+    def test_session_errors_recycle_the_driver(self):
+        with self.assertRaises(InvalidSessionIdException):
+            with self.pool.driver() as driver:
+                raise InvalidSessionIdException("invalid session id")
+
+        self.assertTrue(driver.quit_called)
+        with self.pool.driver() as replacement:
+            self.assertIsNot(replacement, driver)
+
+    def test_recycled_after_max_uses(self):
+        for _ in range(3):
+            with self.pool.driver() as driver:
+                pass
+
+        self.assertTrue(driver.quit_called)
+        with self.pool.driver() as replacement:
+            self.assertIsNot(replacement, driver)
+
+    def test_unhealthy_idle_driver_is_replaced(self):
+        with self.pool.driver() as driver:
+            pass
+        driver.healthy = False
+
+        with self.pool.driver() as replacement:
+            self.assertIsNot(replacement, driver)
+        self.assertTrue(driver.quit_called)
+
+    def test_checkout_waits_for_a_free_driver(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire(timeout=0.1)
+
+        threading.Timer(0.1, self.pool.release, args=(first,)).start()
+        self.assertIs(self.pool.acquire(timeout=1), first)
+        self.pool.release(first)
+        self.pool.release(second)
+        self.assertEqual(len(self.factory.drivers), 2)
+
+    def test_factory_failure_frees_the_slot(self):
+        self.factory.fail = True
+        with self.assertRaises(RuntimeError):
+            self.pool.acquire()
+
+        self.factory.fail = False
+        self.pool.acquire()
+        self.pool.acquire()
+        self.assertEqual(len(self.factory.drivers), 2)
+
+if __name__ == '__main__':
+    unittest.main()
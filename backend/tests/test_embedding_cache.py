@@ -0,0 +1,33 @@
+import unittest
+from langchain_core.embeddings import Embeddings
+from app.AI_Modules.Utils.EmbeddingCache import CachedEmbeddings
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self, dim):
+        self.dim = dim
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(text))] * self.dim for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+class TestCachedEmbeddings(unittest.TestCase):
+    def test_memory_tier_is_bounded_by_size(self):
+        underlying = CountingEmbeddings(dim=256)
+        # 1 KB vectors in a 10 KB tier
+        cache = CachedEmbeddings(underlying, 'fake', path=None, max_memory_mb=10 / 1024)
+
+        cache.embed_documents([f'text {i}' for i in range(25)])
+
+        self.assertEqual(len(cache._memory), 10)
+        self.assertEqual(cache._memory_bytes, 10 * 1024)
+        cache.embed_query('text 24')
+        self.assertEqual(underlying.calls, 25)
+        cache.embed_query('text 0')
+        self.assertEqual(underlying.calls, 26)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from langchain_core.embeddings import Embeddings
+from app.AI_Modules.Utils.EntityIndex import EntityIndex
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+class TestEntityIndex(unittest.TestCase):
+    def test_pending_vectors_are_bounded(self):
+        embeddings = CountingEmbeddings()
+        index = EntityIndex(embeddings, max_pending=4)
+
+        index.embed([f'entity {i}' for i in range(6)])
+        self.assertEqual(len(index._pending), 6)
+        index.canonicalize(['entity 5', 'other'])
+
+        self.assertEqual(len(index._pending), 4)
+        self.assertIn('entity 5', index._pending)
+        self.assertNotIn('entity 0', index._pending)
+
+    def test_add_keeps_pending_vector(self):
+        embeddings = CountingEmbeddings()
+        index = EntityIndex(embeddings, max_pending=2)
+
+        index.embed(['alpha', 'beta'])
+        index.add('alpha')
+
+        self.assertEqual(embeddings.embedded, ['alpha', 'beta'])
+        self.assertEqual(list(index._pending), ['beta'])
+
+if __name__ == '__main__':
+    unittest.main()
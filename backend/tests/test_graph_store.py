@@ -0,0 +1,109 @@
+import unittest
+import tempfile
+import random
+from collections import defaultdict
+from app.AI_Modules.Utils.GraphStore import GraphStore, Postings
+
+class ReferenceGraph:
+    """Adjacency dict with the same semantics: undirected, no self loops, repeated edges sum their weights"""
+
+    def __init__(self):
+        self.adjacency = defaultdict(dict)
+
+    def add_edge(self, u, v, weight):
+        if u == v:
+            return
+        self.adjacency[u][v] = self.adjacency[u].get(v, 0.0) + weight
+        self.adjacency[v][u] = self.adjacency[v].get(u, 0.0) + weight
+
+    def neighbors(self, nodes):
+        return sorted({neighbor for node in nodes for neighbor in self.adjacency.get(node, {})})
+
+class TestGraphStore(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(7)
+        self.store = GraphStore()
+        self.reference = ReferenceGraph()
+        for i in range(40):
+            self.store.add_node(f'entity {i}')
+
+    def _add_random_edges(self, count):
+        for _ in range(count):
+            u, v = self.rng.randrange(40), self.rng.randrange(40)
+            weight = self.rng.choice([1.0, 0.5, 0.25])
+            self.store.add_edge(u, v, weight)
+            self.reference.add_edge(u, v, weight)
+
+    def _assert_matches_reference(self, store):
+        for node in range(40):
+            self.assertEqual(store.neighbors([node]).tolist(), self.reference.neighbors([node]))
+            for neighbor, weight in self.reference.adjacency.get(node, {}).items():
+                self.assertAlmostEqual(store.weight(node, neighbor), weight, places=5)
+        self.assertEqual(store.neighbors([0, 5, 9]).tolist(), self.reference.neighbors([0, 5, 9]))
+        self.assertEqual(store.degree().tolist(), [len(self.reference.adjacency.get(node, {})) for node in range(40)])
+        self.assertEqual(store.number_of_edges(), sum(len(n) for n in self.reference.adjacency.values()) // 2)
+
+    def test_neighbors_match_across_compactions(self):
+        self._add_random_edges(100)
+        self._assert_matches_reference(self.store)
+
+        # New edges buffer as COO on top of the compacted CSR, repeating some of the compacted ones
+        self._add_random_edges(100)
+        self.assertTrue(self.store._dirty)
+        self._assert_matches_reference(self.store)
+
+    def test_new_nodes_after_compaction(self):
+        self._add_random_edges(50)
+        self.store.number_of_edges()
+
+        late = self.store.add_node('late entity')
+        self.store.add_edge(late, 3, 2.0)
+        self.reference.add_edge(late, 3, 2.0)
+
+        self.assertEqual(self.store.neighbors([late]).tolist(), [3])
+        self.assertIn(late, self.store.neighbors([3]).tolist())
+        self.assertEqual(self.store.weight(3, late), 2.0)
+        self.assertEqual(self.store.add_node('late entity'), late)
+
+    def test_edges_lists_each_edge_once(self):
+        self._add_random_edges(60)
+
+        u, v, weights = self.store.edges()
+
+        self.assertTrue((u < v).all())
+        self.assertEqual(len(u), self.store.number_of_edges())
+        subset = {0, 1, 2, 3, 4, 5}
+        u, v, _ = self.store.edges(subset)
+        self.assertTrue(set(u.tolist()) <= subset and set(v.tolist()) <= subset)
+
+    def test_save_and_memory_mapped_load(self):
+        self._add_random_edges(80)
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.store.save(directory)
+            loaded = GraphStore.load(directory)
+
+            self.assertEqual(loaded.names, self.store.names)
+            self._assert_matches_reference(loaded)
+            # A memory-mapped graph still accepts edges, which compact into new in-memory arrays
+            loaded.add_edge(0, 39, 1.0)
+            self.reference.add_edge(0, 39, 1.0)
+            self._assert_matches_reference(loaded)
+
+class TestPostings(unittest.TestCase):
+    def test_union_deduplicates_across_compactions(self):
+        postings = Postings()
+        postings.add(0, 5)
+        postings.add(0, 2)
+        postings.add(2, 5)
+        self.assertEqual(postings.get(0).tolist(), [2, 5])
+
+        postings.add(0, 2)
+        postings.add(1, 7)
+
+        self.assertEqual(postings.get(0).tolist(), [2, 5])
+        self.assertEqual(postings.union([0, 1, 2]).tolist(), [2, 5, 7])
+        self.assertEqual(postings.get(9).tolist(), [])
+
+if __name__ == '__main__':
+    unittest.main()
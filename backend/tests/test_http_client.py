@@ -0,0 +1,172 @@
+import unittest
+import asyncio
+import threading
+import time
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.AI_Modules.Tools.HttpClient import HttpClient, AsyncHttpClient
+
+LARGE_BODY = 1024 * 1024
+# Bodies are read in 64 KB chunks and the cap is checked after each one
+CHUNK = 64 * 1024
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves /flaky with 503 until its failures are used up, /slow after a delay and /large past the body caps"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            fail = self.path == '/flaky' and server.failures > 0
+            if fail:
+                server.failures -= 1
+        if fail:
+            self._send(503, b'unavailable')
+        elif self.path == '/slow':
+            time.sleep(1)
+            self._send(200, b'late')
+        elif self.path == '/large':
+            self._send(200, b'x' * LARGE_BODY)
+        else:
+            self._send(200, b'ok')
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+class HttpServerTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        cls.server.lock = threading.Lock()
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.failures = 0
+
+class TestHttpClient(HttpServerTestCase):
+    def test_retries_retryable_status(self):
+        self.server.failures = 2
+        client = HttpClient(max_retries=2, backoff_factor=0)
+
+        response = client.get(f'{self.base}/flaky')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(self.server.requests, ['/flaky'] * 3)
+        self.assertEqual(set(response.timings), {'dns', 'connect', 'ttfb', 'download', 'total'})
+
+    def test_gives_up_after_max_retries(self):
+        self.server.failures = 5
+        client = HttpClient(max_retries=1, backoff_factor=0)
+
+        response = client.get(f'{self.base}/flaky')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_read_timeout(self):
+        client = HttpClient(max_retries=0)
+
+        started = time.monotonic()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.get(f'{self.base}/slow', timeout=0.2)
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    def test_body_is_capped(self):
+        client = HttpClient(max_bytes=1024)
+
+        response = client.get(f'{self.base}/large')
+
+        self.assertLessEqual(len(response.content), 1024 + CHUNK)
+
+class TestAsyncHttpClient(HttpServerTestCase):
+    def test_retries_retryable_status(self):
+        self.server.failures = 2
+        client = AsyncHttpClient(max_retries=2, backoff_factor=0)
+
+        async def get():
+            try:
+                return await client.get(f'{self.base}/flaky')
+            finally:
+                client.close()
+        response = asyncio.run(get())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(self.server.requests, ['/flaky'] * 3)
+
+    def test_read_timeout(self):
+        client = AsyncHttpClient(max_retries=0)
+
+        async def get():
+            return await client.get(f'{self.base}/slow', timeout=0.2)
+        started = time.monotonic()
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(get())
+        client.close()
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    def test_body_is_capped(self):
+        client = AsyncHttpClient(max_bytes=1024)
+
+        response = asyncio.run(client.get(f'{self.base}/large'))
+        client.close()
+
+        self.assertLessEqual(len(response.content), 1024 + CHUNK)
+
+    def test_session_per_loop_and_closed_loop_cleanup(self):
+        client = AsyncHttpClient()
+
+        async def get():
+            await client.get(f'{self.base}/')
+            return client._session()
+        first = asyncio.run(get())
+        self.assertEqual(len(client._sessions), 1)
+
+        second = asyncio.run(get())
+
+        # The first loop closed, so its session was dropped instead of being reused on the new loop
+        self.assertIsNot(first, second)
+        self.assertEqual(list(client._sessions.values()), [second])
+        self.assertTrue(first.closed)
+        client.close()
+        self.assertTrue(second.closed)
+
+    def test_close_on_running_loop(self):
+        client = AsyncHttpClient()
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(client.get(f'{self.base}/'), loop).result(5)
+            session = client._sessions[loop]
+
+            client.close()
+
+            self.assertTrue(session.closed)
+            self.assertEqual(client._sessions, {})
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+if __name__ == '__main__':
+    unittest.main()
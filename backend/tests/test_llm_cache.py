@@ -0,0 +1,95 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import tempfile
+import os
+from app.AI_Modules.Utils.LLMCache import LLMCache
+from app.AI_Modules.Utils.Model import OllamaModel
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'llm.sqlite')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hit_and_miss(self):
+        cache = LLMCache(self.path)
+        key = cache.key('ollama:mistral', {'temperature': 0}, 'prompt')
+
+        self.assertIsNone(cache.get(key))
+        cache.set(key, 'answer')
+        self.assertEqual(cache.get(key), 'answer')
+
+        stats = cache.stats()
+        self.assertEqual((stats['memory_hits'], stats['disk_hits'], stats['misses']), (1, 0, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_disk_tier_survives_restart(self):
+        cache = LLMCache(self.path)
+        key = cache.key('ollama:mistral', {}, 'prompt')
+        cache.set(key, 'answer')
+
+        reopened = LLMCache(self.path)
+
+        self.assertEqual(reopened.get(key), 'answer')
+        self.assertEqual(reopened.stats()['disk_hits'], 1)
+        # Promoted to the memory tier by the disk hit
+        self.assertEqual(reopened.get(key), 'answer')
+        self.assertEqual(reopened.stats()['memory_hits'], 1)
+
+    def test_key_sensitivity(self):
+        cache = LLMCache(None)
+        base = cache.key('ollama:mistral', {'temperature': 0, 'num_ctx': 4096}, 'prompt')
+
+        self.assertEqual(base, cache.key('ollama:mistral', {'num_ctx': 4096, 'temperature': 0}, 'prompt'))
+        self.assertNotEqual(base, cache.key('ollama:llama3', {'temperature': 0, 'num_ctx': 4096}, 'prompt'))
+        self.assertNotEqual(base, cache.key('ollama:mistral', {'temperature': 0, 'num_ctx': 8192}, 'prompt'))
+        self.assertNotEqual(base, cache.key('ollama:mistral', {'temperature': 0}, 'prompt'))
+        self.assertNotEqual(base, cache.key('ollama:mistral', {'temperature': 0, 'num_ctx': 4096}, 'prompt '))
+
+    def test_expired_entries_miss(self):
+        cache = LLMCache(self.path, ttl=60)
+        key = cache.key('ollama:mistral', {}, 'prompt')
+        with patch('app.AI_Modules.Utils.LLMCache.time.time', return_value=1000.0):
+            cache.set(key, 'answer')
+
+        with patch('app.AI_Modules.Utils.LLMCache.time.time', return_value=1061.0):
+            self.assertIsNone(cache.get(key))
+            self.assertIsNone(LLMCache(self.path, ttl=60).get(key))
+
+    def test_memory_tier_is_bounded(self):
+        cache = LLMCache(None, max_memory_items=2)
+        for prompt in ('a', 'b', 'c'):
+            cache.set(prompt, prompt)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), 'c')
+
+class TestModelCaching(unittest.TestCase):
+    def _model(self, temperature, cache):
+        model = OllamaModel(model='mistral', temperature=temperature, cache=cache)
+        model.model = MagicMock()
+        model.model.invoke.return_value = 'generated'
+        return model
+
+    def test_deterministic_generation_is_cached(self):
+        model = self._model(0, LLMCache(None))
+
+        self.assertEqual(model._run('prompt'), 'generated')
+        self.assertEqual(model._run('prompt'), 'generated')
+        self.assertEqual(model.model.invoke.call_count, 1)
+        model._run('other prompt')
+        self.assertEqual(model.model.invoke.call_count, 2)
+
+    def test_sampled_generation_is_not_cached(self):
+        model = self._model(0.7, LLMCache(None))
+
+        model._run('prompt')
+        model._run('prompt')
+
+        self.assertIsNone(model.cache)
+        self.assertEqual(model.model.invoke.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import patch
+import os
+from app.AI_Modules.Utils.Model import OllamaModel, ConcurrencyLimit, DEFAULT_MODEL
+
+@patch.dict(os.environ, {'LLM_CACHE_DISABLED': '1'})
+@patch('app.AI_Modules.Utils.Model.get_model_catalog', return_value={'mistral:latest': 4000.0})
+class TestModelRegistry(unittest.TestCase):
+    def test_default_model_skips_catalog(self, catalog):
+        model = OllamaModel._get_model()
+
+        self.assertEqual(model.model_name, DEFAULT_MODEL)
+        catalog.assert_not_called()
+
+    def test_configured_model_is_validated(self, catalog):
+        with self.assertRaises(ValueError):
+            OllamaModel._get_model('ollama', {'model': 'missing-model'})
+
+        model = OllamaModel._get_model('ollama', {'model': 'mistral'})
+        self.assertEqual(model.model_name, 'mistral')
+        self.assertIs(OllamaModel._get_model('ollama', {'model': 'mistral'}), model)
+
+    def test_unknown_parameters_are_rejected(self, catalog):
+        with self.assertRaises(ValueError) as raised:
+            OllamaModel._get_model('ollama', {'model': 'mistral', 'parameters': {'max_tokens': 100}})
+        self.assertIn('max_tokens', str(raised.exception))
+
+    def test_context_window_only_set_when_configured(self, catalog):
+        with patch.dict(os.environ, {'OLLAMA_NUM_CTX': ''}):
+            model = OllamaModel._get_model('ollama', {'model': 'mistral', 'parameters': {'top_k': 11}})
+        self.assertNotIn('num_ctx', model.params)
+
+        with patch.dict(os.environ, {'OLLAMA_NUM_CTX': '4096'}):
+            model = OllamaModel._get_model('ollama', {'model': 'mistral', 'parameters': {'top_k': 12}})
+        self.assertEqual(model.params['num_ctx'], 4096)
+
+class TestConcurrencyLimit(unittest.TestCase):
+    def test_acquire_timeout(self):
+        limit = ConcurrencyLimit(1)
+        self.assertTrue(limit.acquire())
+
+        self.assertFalse(limit.acquire(timeout=0.05))
+        limit.release()
+        # The timed out waiter left the queue, so the freed slot is available again
+        self.assertTrue(limit.acquire(timeout=0))
+        limit.release()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import asyncio
+import threading
+import tempfile
+import os
+import time
+from app.AI_Modules.Tools.PageCache import PageCache
+from app.AI_Modules.Tools.HttpClient import AsyncResponse
+from app.AI_Modules.Tools.Scraper import Scrapy
+
+TIMINGS = {'dns': 0.0, 'connect': 0.0, 'ttfb': 0.0, 'download': 0.0, 'total': 0.0}
+
+def _response(status_code, body=b'', headers=None):
+    return AsyncResponse('http://example.com/page', status_code, headers or {}, body, dict(TIMINGS))
+
+class FakeClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers or {})
+        return self.responses.pop(0)
+
+class FakeAsyncClient(FakeClient):
+    async def get(self, url, headers=None, timeout=None):
+        return FakeClient.get(self, url, headers, timeout)
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'pages.sqlite')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _scrape(self, cache, client):
+        scraper = Scrapy(base_url='http://example.com', model=None, client=client, page_cache=cache)
+        scraper.dismantle_webpage('http://example.com/page')
+        return scraper.scraped_page[0]
+
+    def test_not_modified_reuses_cached_page(self):
+        cache = PageCache(self.path)
+        body = b'<html><title>Page</title><body><main>First version</main></body></html>'
+        client = FakeClient([
+            _response(200, body, {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}),
+            _response(304)
+        ])
+
+        first = self._scrape(cache, client)
+        second = self._scrape(cache, client)
+
+        self.assertNotIn('If-None-Match', client.requests[0])
+        self.assertEqual(client.requests[1]['If-None-Match'], '"v1"')
+        self.assertEqual(client.requests[1]['If-Modified-Since'], 'Mon, 01 Jan 2024 00:00:00 GMT')
+        self.assertEqual(second['content'], first['content'])
+        self.assertIn('First version', second['content'])
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_async_scrape_uses_cache_off_the_event_loop(self):
+        cache = PageCache(self.path)
+        cache.put('http://example.com/page', 'Page', 'Cached text', [], '"v1"', None)
+        client = FakeAsyncClient([_response(304)])
+        scraper = Scrapy(base_url='http://example.com', model=None, page_cache=cache, async_client=client)
+        loop_threads = []
+        get = cache.get
+        def recording_get(url):
+            loop_threads.append(threading.current_thread())
+            return get(url)
+        cache.get = recording_get
+
+        async def scrape():
+            await scraper.adismantle_webpage('http://example.com/page')
+            return threading.current_thread()
+        loop_thread = asyncio.run(scrape())
+
+        self.assertEqual(client.requests[0]['If-None-Match'], '"v1"')
+        self.assertEqual(scraper.scraped_page[0]['content'], 'Cached text')
+        self.assertNotIn(loop_thread, loop_threads)
+
+    def test_changed_page_replaces_entry(self):
+        cache = PageCache(self.path)
+        client = FakeClient([
+            _response(200, b'<html><body><main>Old</main></body></html>', {'ETag': '"v1"'}),
+            _response(200, b'<html><body><main>New</main></body></html>', {'ETag': '"v2"'})
+        ])
+
+        self._scrape(cache, client)
+        second = self._scrape(cache, client)
+
+        self.assertIn('New', second['content'])
+        self.assertEqual(cache.get('http://example.com/page')['etag'], '"v2"')
+
+    def test_page_without_validators_is_not_cached(self):
+        cache = PageCache(self.path)
+        client = FakeClient([_response(200, b'<html><body><main>Text</main></body></html>')])
+
+        self._scrape(cache, client)
+
+        self.assertIsNone(cache.get('http://example.com/page'))
+        self.assertEqual(cache.stats()['pages'], 0)
+
+    def test_evicts_least_recently_used_by_size(self):
+        cache = PageCache(self.path, max_bytes=250)
+        cache.put('http://example.com/a', '', 'a' * 100, [], '"etag"', None)
+        time.sleep(0.01)
+        cache.put('http://example.com/b', '', 'b' * 100, [], '"etag"', None)
+        time.sleep(0.01)
+        # Revalidating a moves it to the recent end, so b is the one evicted once c overflows the budget
+        cache.touch('http://example.com/a')
+        cache.put('http://example.com/c', '', 'c' * 100, [], '"etag"', None)
+
+        self.assertIsNotNone(cache.get('http://example.com/a'))
+        self.assertIsNone(cache.get('http://example.com/b'))
+        self.assertIsNotNone(cache.get('http://example.com/c'))
+        self.assertLessEqual(cache.stats()['bytes'], 250)
+
+    def test_stats_count_every_lookup(self):
+        cache = PageCache(self.path)
+        cache.put('http://example.com/a', 'A', 'content', [], '"etag"', None)
+
+        cache.get('http://example.com/a')
+        cache.touch('http://example.com/a')
+        cache.get('http://example.com/missing')
+        cache.get('http://example.com/other')
+
+        stats = cache.stats()
+        self.assertEqual((stats['lookups'], stats['hits'], stats['misses']), (3, 1, 2))
+        self.assertAlmostEqual(stats['hit_rate'], 1 / 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import hashlib
+import os
+import time
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+from app.AI_Modules.Utils import Retriever
+from langchain_core.documents import Document
+from app.AI_Modules.Utils.Retriever import FaissRetriever, GraphRetriever, namespace_path, prune_namespaces
+
+class FakeEmbeddings(Embeddings):
+    def _vector(self, text):
+        rng = np.random.default_rng(int(hashlib.md5(text.encode()).hexdigest()[:8], 16))
+        return rng.normal(size=8).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+class TestFaissRetriever(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.embeddings = FakeEmbeddings()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_store_saved_by_baseline_save_local(self):
+        # The original retriever called save_local(persist_directory), i.e. FAISS's default index name
+        FAISS.from_texts(['alpha', 'beta', 'gamma'], self.embeddings).save_local(self.directory.name)
+
+        retriever = FaissRetriever(self.embeddings, index_name="user_query_index", persist_directory=self.directory.name)
+        retriever.load()
+
+        self.assertEqual(retriever.query('beta', k=1)[0].page_content, 'beta')
+
+    def test_load_segments(self):
+        retriever = FaissRetriever(self.embeddings, persist_directory=self.directory.name, namespace='chat-1')
+        retriever.ingest(['alpha', 'beta'])
+        retriever.ingest(['gamma'])
+
+        loaded = FaissRetriever(self.embeddings, persist_directory=self.directory.name, namespace='chat-1')
+        loaded.load()
+
+        self.assertEqual(len(loaded.segments), 2)
+        self.assertEqual(loaded.query('gamma', k=1)[0].page_content, 'gamma')
+
+    def test_ingest_after_load_appends_segment(self):
+        retriever = FaissRetriever(self.embeddings, persist_directory=self.directory.name, namespace='chat-1')
+        retriever.ingest(['alpha', 'beta'])
+
+        resumed = FaissRetriever(self.embeddings, persist_directory=self.directory.name, namespace='chat-1')
+        resumed.load()
+        resumed.ingest(['gamma'])
+        self.assertEqual(resumed.query('alpha', k=1)[0].page_content, 'alpha')
+
+        loaded = FaissRetriever(self.embeddings, persist_directory=self.directory.name, namespace='chat-1')
+        loaded.load()
+        self.assertEqual(len(loaded.segments), 2)
+        self.assertEqual(sorted(doc.page_content for doc in loaded.query('alpha', k=3)), ['alpha', 'beta', 'gamma'])
+
+    def test_prune_namespaces(self):
+        old = namespace_path(self.directory.name, 'old')
+        recent = namespace_path(self.directory.name, 'recent')
+        os.makedirs(old)
+        os.makedirs(recent)
+        day_ago = time.time() - 24 * 3600
+        os.utime(old, (day_ago, day_ago))
+        Retriever._pruned_at.pop(self.directory.name, None)
+
+        self.assertEqual(prune_namespaces(self.directory.name, max_age=3600), 1)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))
+        # Throttled until the interval passes
+        os.utime(recent, (day_ago, day_ago))
+        self.assertEqual(prune_namespaces(self.directory.name, max_age=3600), 0)
+
+DOCUMENTS = [
+    Document(page_content='Marie Curie worked with Pierre Curie in Paris on radioactivity.', metadata={'source': 'a'}),
+    Document(page_content='Albert Einstein met Marie Curie at the Solvay Conference in Brussels.', metadata={'source': 'b'}),
+    Document(page_content='Niels Bohr and Albert Einstein debated quantum theory in Brussels.', metadata={'source': 'c'})
+]
+
+# Without the NER model the retriever falls back to capitalized-phrase extraction
+@patch.object(Retriever.AutoTokenizer, 'from_pretrained', side_effect=OSError('offline'))
+class TestGraphRetriever(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'graph')
+        self.embeddings = FakeEmbeddings()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _retriever(self):
+        # A threshold above 1 keeps every entity distinct under the random fake embeddings
+        return GraphRetriever(self.embeddings, similarity_threshold=1.1)
+
+    def _snapshot(self, retriever):
+        return {
+            'nodes': list(retriever.graph.names),
+            'edges': retriever.graph.number_of_edges(),
+            'sources': list(retriever.sources),
+            'documents': [(doc.page_content, doc.metadata) for doc in retriever.documents],
+            'entities': [retriever.document_entities(doc_id) for doc_id in range(len(retriever.documents))],
+            'query': [doc.page_content for doc in retriever.query('Albert Einstein', k=3)]
+        }
+
+    def test_save_load_round_trip(self, _):
+        retriever = self._retriever()
+        retriever.ingest(DOCUMENTS)
+        retriever.save(self.path)
+
+        for mmap in (True, False):
+            loaded = self._retriever()
+            loaded.load(self.path, mmap=mmap)
+            self.assertEqual(self._snapshot(loaded), self._snapshot(retriever))
+            self.assertTrue(np.allclose(loaded.document_matrix, retriever.document_matrix))
+
+    def test_ingest_after_load(self, _):
+        retriever = self._retriever()
+        retriever.ingest(DOCUMENTS[:2])
+        retriever.save(self.path)
+
+        loaded = self._retriever()
+        loaded.load(self.path)
+        loaded.ingest(DOCUMENTS[2:])
+        expected = self._retriever()
+        expected.ingest(DOCUMENTS)
+
+        self.assertEqual(self._snapshot(loaded), self._snapshot(expected))
+        self.assertIn('Niels Bohr', loaded.graph)
+
+if __name__ == '__main__':
+    unittest.main()
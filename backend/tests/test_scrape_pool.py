@@ -0,0 +1,153 @@
+import unittest
+import asyncio
+import threading
+import time
+from app.AI_Modules.Tools.ScrapePool import ScrapePool, get_scrape_pool
+
+class ConcurrencyProbe:
+    """Scrape function that records how many calls overlap, overall and per host"""
+
+    def __init__(self, duration=0.1):
+        self.duration = duration
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+        self.host_running = {}
+        self.host_peak = {}
+        self._lock = threading.Lock()
+
+    def _enter(self, url):
+        host = url.split('/')[2]
+        with self._lock:
+            self.calls.append(url)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.host_running[host] = self.host_running.get(host, 0) + 1
+            self.host_peak[host] = max(self.host_peak.get(host, 0), self.host_running[host])
+        return host
+
+    def _exit(self, host):
+        with self._lock:
+            self.running -= 1
+            self.host_running[host] -= 1
+
+    def __call__(self, url):
+        host = self._enter(url)
+        try:
+            time.sleep(self.duration)
+            return url
+        finally:
+            self._exit(host)
+
+    async def ascrape(self, url):
+        host = self._enter(url)
+        try:
+            await asyncio.sleep(self.duration)
+            return url
+        finally:
+            self._exit(host)
+
+def _run_threads(pool, probe, urls, **kwargs):
+    results = {}
+    def worker(url):
+        results[url] = pool.run(probe, url, **kwargs)
+    threads = [threading.Thread(target=worker, args=(url,)) for url in urls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+class TestScrapePool(unittest.TestCase):
+    def test_global_limit(self):
+        pool = ScrapePool(max_workers=3, per_host_limit=10)
+        probe = ConcurrencyProbe()
+        urls = [f'http://host{i}.com/page' for i in range(9)]
+
+        results = _run_threads(pool, probe, urls)
+
+        self.assertEqual(results, {url: url for url in urls})
+        self.assertEqual(probe.peak, 3)
+
+    def test_per_host_limit(self):
+        pool = ScrapePool(max_workers=8, per_host_limit=2)
+        probe = ConcurrencyProbe()
+        urls = [f'http://www.same.com/{i}' for i in range(5)] + [f'http://same.com/{i}' for i in range(5, 8)]
+
+        results = _run_threads(pool, probe, urls)
+
+        self.assertEqual(len([r for r in results.values() if r]), 8)
+        self.assertEqual(max(probe.host_peak.values()), 2)
+
+    def test_sync_and_async_share_limits(self):
+        pool = ScrapePool(max_workers=4, per_host_limit=10)
+        probe = ConcurrencyProbe()
+        sync_urls = [f'http://sync{i}.com/page' for i in range(6)]
+        async_urls = [f'http://async{i}.com/page' for i in range(6)]
+
+        async def run_async():
+            return await asyncio.gather(*(pool.arun(probe.ascrape, url) for url in async_urls))
+        thread = threading.Thread(target=_run_threads, args=(pool, probe, sync_urls))
+        thread.start()
+        async_results = asyncio.run(run_async())
+        thread.join()
+
+        self.assertEqual(async_results, async_urls)
+        self.assertEqual(len(probe.calls), 12)
+        self.assertLessEqual(probe.peak, 4)
+
+    def test_async_per_host_limit(self):
+        pool = ScrapePool(max_workers=8, per_host_limit=2)
+        probe = ConcurrencyProbe()
+
+        async def run_async():
+            return await asyncio.gather(*(pool.arun(probe.ascrape, f'http://same.com/{i}') for i in range(6)))
+        asyncio.run(run_async())
+
+        self.assertEqual(probe.host_peak['same.com'], 2)
+
+    def test_abandoned_when_global_queue_times_out(self):
+        pool = ScrapePool(max_workers=1, per_host_limit=2)
+        probe = ConcurrencyProbe(duration=0.5)
+        busy = threading.Thread(target=pool.run, args=(probe, 'http://busy.com/page'))
+        busy.start()
+        time.sleep(0.05)
+
+        started = time.monotonic()
+        result = pool.run(probe, 'http://waiting.com/page', queue_timeout=0.1)
+
+        self.assertIsNone(result)
+        self.assertLess(time.monotonic() - started, 0.4)
+        busy.join()
+        self.assertEqual(probe.calls, ['http://busy.com/page'])
+
+    def test_abandoned_when_host_queue_times_out(self):
+        pool = ScrapePool(max_workers=4, per_host_limit=1)
+        probe = ConcurrencyProbe(duration=0.5)
+        busy = threading.Thread(target=pool.run, args=(probe, 'http://same.com/1'))
+        busy.start()
+        time.sleep(0.05)
+
+        result = pool.run(probe, 'http://same.com/2', queue_timeout=0.1)
+        busy.join()
+        time.sleep(0.1)
+
+        self.assertIsNone(result)
+        # The queued scrape was given up on, so it never runs once the host frees up
+        self.assertEqual(probe.calls, ['http://same.com/1'])
+
+    def test_timeout_starts_with_the_scrape(self):
+        pool = ScrapePool(max_workers=2, per_host_limit=2)
+        probe = ConcurrencyProbe(duration=1)
+
+        started = time.monotonic()
+        result = pool.run(probe, 'http://slow.com/page', timeout=0.2)
+
+        self.assertIsNone(result)
+        self.assertLess(time.monotonic() - started, 0.6)
+
+    def test_process_wide_pool(self):
+        self.assertIs(get_scrape_pool(), get_scrape_pool())
+
+if __name__ == '__main__':
+    unittest.main()
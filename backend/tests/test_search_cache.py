@@ -0,0 +1,40 @@
+import unittest
+import tempfile
+from app.AI_Modules.Tools.SearchCache import DiskSearchCache, normalize_query
+
+class TestSearchCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = DiskSearchCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_normalize_folds_case_width_and_whitespace(self):
+        self.assertEqual(normalize_query('  Python\tTutorial '), 'python tutorial')
+        self.assertEqual(normalize_query('ｐｙｔｈｏｎ tutorial'), 'python tutorial')
+
+    def test_punctuation_and_operators_change_the_key(self):
+        queries = [
+            'c tutorial',
+            'c++ tutorial',
+            'c# tutorial',
+            'site:python.org tutorial',
+            'python -snake tutorial',
+            'python snake tutorial',
+            '"python tutorial"',
+            'python tutorial',
+            'python OR tutorial',
+            'python or tutorial'
+        ]
+        keys = {self.cache.key(query, 1, False) for query in queries}
+        self.assertEqual(len(keys), len(queries))
+
+    def test_cached_results_are_not_shared_across_distinct_queries(self):
+        self.cache.set('c++ tutorial', 1, False, [{'title': 'C++', 'link': 'https://cplusplus.com'}])
+        self.assertIsNone(self.cache.get('c tutorial', 1))
+        self.assertIsNone(self.cache.get('c# tutorial', 1))
+        self.assertEqual(self.cache.get('C++   Tutorial', 1)[0]['title'], 'C++')
+
+if __name__ == '__main__':
+    unittest.main()